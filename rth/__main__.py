@@ -0,0 +1,5 @@
+import sys
+
+from rth.cli import main
+
+sys.exit(main())
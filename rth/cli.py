@@ -0,0 +1,281 @@
+import argparse
+import os
+import sys
+from itertools import chain
+
+from rth.version import version
+from rth.virtual_building.paths import MAX_OFFSET
+
+
+FORMATS_EXTENSIONS = {'text': '.txt', 'json': '.json', 'jsonl': '.jsonl', 'store': '.rtht'}
+# formats that can only be written to files
+BINARY_FORMATS = ('store',)
+
+
+#
+# Helpers
+#
+def topology_label(index, name):
+    return str(name) if name is not None else f"#{index}"
+
+
+def file_name(index, name):
+    label = str(name) if name is not None else str(index)
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in label) or str(index)
+
+
+def read_topologies(args):
+    from rth.core.inputs import iter_topologies
+    return chain.from_iterable(iter_topologies(source, args.input_format) for source in args.inputs)
+
+
+def exit_weight(value):
+    name, _, weight = value.rpartition('=')
+    if not name or not weight.isdigit() or int(weight) > MAX_OFFSET:
+        raise argparse.ArgumentTypeError(f"expected NAME=WEIGHT with an int weight between 0 and {MAX_OFFSET}, "
+                                         f"got '{value}'")
+    return name, int(weight)
+
+
+def exits_option(args):
+    if args.exit_weight:
+        return dict(args.exit_weight)
+    return True if args.multiple_exits else None
+
+
+def engine_options(args):
+    """
+    :return: the Dispatcher options given by the arguments of add_engine_options
+    """
+
+    return {'ecmp': args.ecmp, 'tie_break': args.tie_break, 'areas': args.area_size, 'lab': args.lab,
+            'exits': exits_option(args)}
+
+
+def write_result(f, result, fmt):
+    from rth.core.formatters import write_text, json_document, write_json
+
+    if fmt == 'text':
+        write_text(f, result['hops'], result['routing_tables'], result['names'])
+    else:
+        document = json_document(result['hops'], result['routing_tables'], result['names'], result['name'])
+        write_json(f, document, lines=fmt == 'jsonl')
+
+
+#
+# Commands
+#
+def command_run(args):
+    from rth.core.dispatcher import Dispatcher
+
+    failures = 0
+    if args.format in BINARY_FORMATS and not args.output_dir:
+        print(f"rth: the {args.format} format needs --output-dir", file=sys.stderr)
+        return 2
+    if args.per_router and (not args.output_dir or args.format not in ('text', 'json')):
+        print("rth: --per-router needs --output-dir and the text or json format", file=sys.stderr)
+        return 2
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    for result in Dispatcher.execute_many(read_topologies(args), workers=args.workers, **engine_options(args)):
+        label = topology_label(result['index'], result['name'])
+
+        if result['error'] is not None:
+            failures += 1
+            print(f"rth: topology {label}: {result['error']['message']}", file=sys.stderr)
+            continue
+
+        if args.verify:
+            from rth.core.verifier import verify_routing_tables
+            report = verify_routing_tables(result['routing_tables'], workers=args.workers, islands=args.lab)
+            if report:
+                failures += 1
+                for issue in report:
+                    print(f"rth: topology {label}: [{issue.category}] {issue.location}: {issue.message}",
+                          file=sys.stderr)
+                continue
+
+        if args.per_router:
+            from rth.core.router_files import write_router_files
+            report = write_router_files(result['routing_tables'],
+                                        os.path.join(args.output_dir, file_name(result['index'], result['name'])),
+                                        args.format)
+            if args.verbose:
+                print(f"topology {label}: {len(report['written'])} written, {len(report['unchanged'])} unchanged, "
+                      f"{len(report['removed'])} removed")
+        elif args.output_dir:
+            path = os.path.join(args.output_dir,
+                                file_name(result['index'], result['name']) + FORMATS_EXTENSIONS[args.format])
+            if args.format == 'store':
+                from rth.core.table_store import write_table_store
+                write_table_store(result['routing_tables'], path)
+            else:
+                with open(path, encoding="utf-8", mode="w") as f:
+                    write_result(f, result, args.format)
+        else:
+            if args.format == 'text':
+                sys.stdout.write(f"===== TOPOLOGY {label} =====\n")
+            write_result(sys.stdout, result, args.format)
+            sys.stdout.flush()
+
+    return 1 if failures else 0
+
+
+def command_validate(args):
+    from rth.core.validation import validate_topology
+
+    failures = 0
+    for index, topology in enumerate(read_topologies(args)):
+        label = topology_label(index, topology.get('name') if isinstance(topology, dict) else None)
+
+        if not isinstance(topology, dict):
+            failures += 1
+            print(f"rth: topology {label}: not a topology object", file=sys.stderr)
+            continue
+
+        report = validate_topology(topology.get('subnetworks'), topology.get('routers'), topology.get('links'),
+                                   multiple_exits=args.multiple_exits)
+        if report:
+            failures += 1
+            for issue in report:
+                print(f"rth: topology {label}: [{issue.category}] {issue.location}: {issue.message}",
+                      file=sys.stderr)
+        elif args.verbose:
+            print(f"topology {label}: OK")
+
+    return 1 if failures else 0
+
+
+def command_diff(args):
+    from rth.core.diff import RoutingResult, diff_results
+    from rth.core.formatters import write_json
+
+    before = RoutingResult.load(args.before, args.input_format)
+    after = RoutingResult.load(args.after, args.input_format)
+    difference = diff_results(before, after)
+
+    if args.format == 'json':
+        write_json(sys.stdout, difference.to_dict(paths=not args.no_paths))
+    else:
+        difference.write_text(sys.stdout, paths=not args.no_paths)
+    return 1 if difference else 0
+
+
+def command_serve(args):
+    from rth.core.server import QueryServer
+
+    server = QueryServer(args.socket, args.source, poll_interval=args.poll, **engine_options(args))
+    print(f"rth: serving {args.source} on {args.socket}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+    return 0
+
+
+#
+# Entry point
+#
+def build_parser():
+    parser = argparse.ArgumentParser(prog='rth', description="Routing Tables Helper: computes the paths between "
+                                                             "subnetworks and the routing tables of every router.")
+    parser.add_argument('--version', action='version', version=f"rth {version}")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    def add_inputs(command):
+        command.add_argument('inputs', nargs='*', default=['-'], metavar='FILE',
+                             help="topology files (JSON, JSON Lines or YAML); '-' or nothing reads the standard input")
+        command.add_argument('-i', '--input-format', choices=['json', 'yaml'], default=None,
+                             help="format of the inputs, guessed from the extension if not given (JSON for the "
+                                  "standard input). JSON also reads JSON Lines")
+
+    def add_engine_options(command):
+        command.add_argument('--ecmp', action='store_true',
+                             help="keep every equal-cost next hop of the routes (multipath routes)")
+        command.add_argument('--tie-break', choices=['uid', 'gateway_ip', 'hash'], default=None,
+                             help="compute the paths with the breadth-first engine, choosing between equal-cost paths "
+                                  "with this policy; only hash does not depend on the order of the input (uid follows "
+                                  "the order of the routers, gateway_ip the automatically assigned IPs)")
+        command.add_argument('--area-size', type=int, default=None, metavar='N',
+                             help="split the networks in areas of at most N subnetworks, linked by a backbone; "
+                                  "routers only get a summary route to the subnetworks of the other areas")
+        command.add_argument('--lab', action='store_true',
+                             help="accept networks made of several islands, computed apart; islands without a router "
+                                  "connected to internet get no default route")
+        command.add_argument('--multiple-exits', action='store_true',
+                             help="accept several routers connected to internet, the default route of each router "
+                                  "leading to the nearest one")
+        command.add_argument('--exit-weight', type=exit_weight, action='append', default=[], metavar='NAME=WEIGHT',
+                             help="weight of a router connected to internet, added to its distance when choosing the "
+                                  "nearest exit (can be repeated, implies --multiple-exits)")
+
+    run = commands.add_parser('run', help="compute the routing tables of topologies")
+    add_inputs(run)
+    run.add_argument('-f', '--format', choices=sorted(FORMATS_EXTENSIONS), default='text',
+                     help="output format (default: text); store is the binary routing tables store and needs "
+                          "--output-dir")
+    run.add_argument('-o', '--output-dir', default=None,
+                     help="write one file per topology in this directory instead of the standard output")
+    run.add_argument('-w', '--workers', type=int, default=1,
+                     help="number of worker processes (default: 1, in this process)")
+    add_engine_options(run)
+    run.add_argument('--verify', action='store_true',
+                     help="check that the routing tables have no loops nor black holes, and do not output the "
+                          "topologies whose tables fail")
+    run.add_argument('--per-router', action='store_true',
+                     help="write one directory per topology with one file per router; only the files of the routers "
+                          "whose table changed since the last run are written again")
+    run.add_argument('-v', '--verbose', action='store_true', help="with --per-router, print what has been written")
+    run.set_defaults(func=command_run)
+
+    validate = commands.add_parser('validate', help="check topologies and report every error they contain")
+    add_inputs(validate)
+    validate.add_argument('-v', '--verbose', action='store_true', help="also print valid topologies")
+    validate.add_argument('--multiple-exits', action='store_true',
+                          help="accept several routers connected to internet")
+    validate.set_defaults(func=command_validate)
+
+    diff = commands.add_parser('diff', help="compare the routing tables of two results; exits with 1 if they differ")
+    diff.add_argument('before', metavar='BEFORE', help="result document (rth run --format json), topology or snapshot")
+    diff.add_argument('after', metavar='AFTER', help="result document (rth run --format json), topology or snapshot")
+    diff.add_argument('-i', '--input-format', choices=['json', 'yaml'], default=None,
+                      help="format of the inputs, guessed from the extension if not given")
+    diff.add_argument('-f', '--format', choices=['text', 'json'], default='text', help="output format (default: text)")
+    diff.add_argument('--no-paths', action='store_true', help="do not explain the changes with the paths")
+    diff.set_defaults(func=command_diff)
+
+    serve = commands.add_parser('serve', help="answer lookup, path and trace queries on a Unix domain socket")
+    serve.add_argument('source', metavar='FILE', help="topology file (its first topology) or snapshot to serve")
+    serve.add_argument('-s', '--socket', default='rth.sock', help="path of the socket (default: rth.sock)")
+    serve.add_argument('-p', '--poll', type=float, default=1.0,
+                       help="seconds between two checks of the source for changes, 0 disables the reloading "
+                            "(default: 1)")
+    add_engine_options(serve)
+    serve.set_defaults(func=command_serve)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return 2
+
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # the reading end of a pipeline has been closed, nothing left to do
+        return 0
+    except (OSError, ValueError, ImportError) as e:
+        print(f"rth: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
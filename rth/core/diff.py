@@ -0,0 +1,236 @@
+import hashlib
+from collections import namedtuple
+
+
+# `before` and `after` are {'gateway', 'interface'[, 'nexthops']} dicts, None when the route does not exist on that side
+RouteChange = namedtuple('RouteChange', ('cidr', 'before', 'after'))
+
+
+def table_digest(table):
+    """
+    :param table: the routing table of one router, {cidr: {'gateway', 'interface'[, 'nexthops']}, ...}
+    :return: a content hash of the table, independent of the order of its routes and of their equal-cost next hops
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    for cidr in sorted(table):
+        route = table[cidr]
+        nexthops = sorted(f"{hop['gateway']} {hop['interface']}" for hop in route.get('nexthops', ()))
+        digest.update(f"{cidr} {route['gateway']} {route['interface']} [{', '.join(nexthops)}]\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _route_string(route):
+    if route is None:
+        return "none"
+    return " | ".join(f"{hop['gateway']} via {hop['interface']}" for hop in route.get('nexthops', [route]))
+
+
+def _path_string(path):
+    return " > ".join(f"router {router}" for router in path) if path is not None else "none"
+
+
+class RoutingResult:
+    """
+    The routing tables and paths of one execution, everything being referred to by name so that two executions of
+    different topologies can be compared.
+
+    :ivar tables: Format: {router_name: {cidr: {'gateway', 'interface'}, ...}, ...}
+    :ivar paths: Format: {(subnet_name, subnet_name): [router_name, ...], ...}
+    :ivar subnetworks: Format: {subnet_name: cidr, ...}
+    :ivar digests: the digest of the routers' tables, when known (see table_digest). Format: {router_name: digest, ...}
+    """
+
+    def __init__(self, tables, paths=None, subnetworks=None, digests=None):
+        self.tables = {str(router): tables[router] for router in tables}
+        self.paths = paths or {}
+        self.subnetworks = subnetworks or {}
+        self.digests = {str(router): digest for router, digest in (digests or {}).items()}
+
+        self.__through, self.__cidrs_subnets = None, None
+
+    @classmethod
+    def from_dispatcher(cls, dispatcher):
+        names = dispatcher.names()
+        subnets_names, routers_names = names['subnets'], names['routers']
+        paths = {(subnets_names[s], subnets_names[e]): [routers_names[r] for r in dispatcher.hops[(s, e)]]
+                 for s, e in dispatcher.hops}
+        return cls(dispatcher.formatted_raw_routing_tables, paths, dict(zip(subnets_names, names['cidrs'])))
+
+    @classmethod
+    def from_document(cls, document):
+        """
+        :param document: a result document, as written by `rth run --format json` (see formatters.json_document)
+        """
+
+        paths = {(str(hop['from']), str(hop['to'])): [str(router) for router in hop['routers']]
+                 for hop in document.get('hops', ())}
+        return cls(document['routing_tables'], paths, document.get('subnetworks'), document.get('digests'))
+
+    @classmethod
+    def load(cls, path, fmt=None):
+        """
+        Reads a result document, or executes a snapshot or the first topology of a file
+        """
+
+        from rth.core.dispatcher import Dispatcher
+        from rth.core.inputs import iter_topologies
+        from rth.virtual_building.snapshot import SNAPSHOT_MAGIC
+
+        with open(path, 'rb') as f:
+            is_snapshot = f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+        if not is_snapshot:
+            document = next(iter_topologies(path, fmt), None)
+            if isinstance(document, dict) and 'routing_tables' in document:
+                return cls.from_document(document)
+
+        inst = Dispatcher()
+        inst.execute_file(path, fmt)
+        return cls.from_dispatcher(inst)
+
+    #
+    # Getters
+    #
+    def paths_through(self, router, cidr):
+        """
+        :return: the paths going through the router to the subnetwork(s) of the cidr.
+            Format: {(subnet_name, subnet_name): path, ...}
+        """
+
+        if self.__through is None:
+            # built on the first explanation only, one pass over every path
+            self.__through, self.__cidrs_subnets = {}, {}
+            for (start, end), path in self.paths.items():
+                for hop in path:
+                    self.__through.setdefault((hop, end), {})[(start, end)] = path
+            for subnet, subnet_cidr in self.subnetworks.items():
+                self.__cidrs_subnets.setdefault(subnet_cidr, []).append(subnet)
+
+        paths = {}
+        for subnet in self.__cidrs_subnets.get(cidr, ()):
+            paths.update(self.__through.get((router, subnet), {}))
+        return paths
+
+
+class TablesDiff:
+    """
+    The differences between the routing tables of two results.
+
+    :ivar added_routers: routers only in the new result
+    :ivar removed_routers: routers only in the old result
+    :ivar changed: the routes that differ on routers in both results. Format: {router_name: [RouteChange, ...], ...}
+    :ivar unchanged: the number of routers whose table is identical
+    """
+
+    def __init__(self, before, after):
+        self.before, self.after = before, after
+        self.added_routers = [router for router in after.tables if router not in before.tables]
+        self.removed_routers = [router for router in before.tables if router not in after.tables]
+        self.changed = {}
+        self.unchanged = 0
+
+        for router in after.tables:
+            if router not in before.tables:
+                continue
+            old, new = before.tables[router], after.tables[router]
+            # the stored digests spare walking both tables; without them, a plain comparison of the dicts
+            old_digest, new_digest = before.digests.get(router), after.digests.get(router)
+            if old_digest is not None and new_digest is not None:
+                identical = old_digest == new_digest
+            else:
+                identical = old == new
+            if identical:
+                self.unchanged += 1
+                continue
+
+            changes = [RouteChange(cidr, old.get(cidr), new.get(cidr)) for cidr in sorted(old.keys() | new.keys())
+                       if old.get(cidr) != new.get(cidr)]
+            if changes:
+                self.changed[router] = changes
+            else:
+                self.unchanged += 1
+
+    def __bool__(self):
+        return bool(self.added_routers or self.removed_routers or self.changed)
+
+    def explain(self, router, cidr):
+        """
+        :return: the paths to the cidr that went or now go through the router, and changed.
+            Format: {(subnet_name, subnet_name): (path_before or None, path_after or None), ...}
+        """
+
+        pairs = self.before.paths_through(router, cidr).keys() | self.after.paths_through(router, cidr).keys()
+        explanation = {}
+        for pair in sorted(pairs):
+            old, new = self.before.paths.get(pair), self.after.paths.get(pair)
+            if old != new:
+                explanation[pair] = (old, new)
+        return explanation
+
+    #
+    # Outputs
+    #
+    def to_dict(self, paths=True):
+        """
+        :return: a JSON-serialisable dict of the differences
+        """
+
+        changed = {}
+        for router, changes in self.changed.items():
+            changed[router] = []
+            for change in changes:
+                entry = {'route': change.cidr, 'before': change.before, 'after': change.after}
+                if paths:
+                    entry['paths'] = [{'from': start, 'to': end, 'before': old, 'after': new}
+                                      for (start, end), (old, new) in self.explain(router, change.cidr).items()]
+                changed[router].append(entry)
+
+        return {
+            'added_routers': {router: self.after.tables[router] for router in self.added_routers},
+            'removed_routers': self.removed_routers,
+            'changed_routers': changed,
+            'unchanged_routers': self.unchanged
+        }
+
+    def write_text(self, f, paths=True):
+        """
+        Writes the differences in a diff-like text format: `+` added, `-` removed, `~` changed
+
+        :param f: a text stream
+        """
+
+        for router in self.added_routers:
+            f.write(f"+ router {router} ({len(self.after.tables[router])} routes)\n")
+        for router in self.removed_routers:
+            f.write(f"- router {router}\n")
+
+        for router, changes in self.changed.items():
+            f.write(f"~ router {router}\n")
+            for change in changes:
+                if change.before is None:
+                    f.write(f"    + {change.cidr:<18} : {_route_string(change.after)}\n")
+                elif change.after is None:
+                    f.write(f"    - {change.cidr:<18} : {_route_string(change.before)}\n")
+                else:
+                    f.write(f"    ~ {change.cidr:<18} : {_route_string(change.before)} -> "
+                            f"{_route_string(change.after)}\n")
+
+                if paths:
+                    for (start, end), (old, new) in self.explain(router, change.cidr).items():
+                        f.write(f"        {start} to {end}: {_path_string(old)} -> {_path_string(new)}\n")
+
+        f.write(f"{self.unchanged} router(s) unchanged\n")
+
+
+def diff_results(before, after):
+    """
+    Compares two results router by router; identical tables are skipped without being compared route by route, by their
+    digests when both results have them.
+
+    :param before: the old RoutingResult
+    :param after: the new RoutingResult
+    :return: a TablesDiff
+    """
+
+    return TablesDiff(before, after)
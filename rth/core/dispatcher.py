@@ -1,8 +1,11 @@
-from rth.virtual_building.network_creator import NetworkCreator
-from rth.virtual_building.ants import AntsDiscovery
-from rth.virtual_building.routing_tables_generator import RoutingTablesGenerator
-from .errors import WronglyFormedSubnetworksData, WronglyFormedRoutersData, WronglyFormedLinksData
-from nettools.utils.ip_class import FourBytesLiteral
+from os import cpu_count
+
+# the subsystems (the virtual network and its nettools dependency, the engines, asyncio, the process pools, the
+# outputs) are imported where they are used, so importing the dispatcher stays cheap for short-lived programs
+from rth.virtual_building.paths import MAX_OFFSET, TIE_BREAKS
+from .errors import ExecutionError, InvalidTopology, MasterRouterError, UnreachableNetwork
+from .validation import validate_topology
+from .verifier import verify_routing_tables
 
 
 class Dispatcher:
@@ -11,37 +14,384 @@ class Dispatcher:
     We could call that a hub, I call that a good way to handle a complex program.
     """
 
-    __virtual_network_instance = None
-    __executed = None
-
-    subnetworks, routers, links = None, None, None
-    equitemporality = None
-
-    gend_subnetworks, gend_routers, gend_routers_names = None, None, None
-    hops = None
-    routing_tables = None
-    formatted_raw_routing_tables = None
-
     #
     # DUNDERS
     #
-    def __init__(self, debug=False):
-        self.__virtual_network_instance = NetworkCreator()
+    def __init__(self, debug=False, tracer=None, ecmp=False, tie_break=None, areas=None, lab=False, workers=1,
+                 exits=None, k_paths=None, k_paths_sources=None, k_paths_destinations=None):
+        """
+        :param debug: renders the trace of the ants discovery in the console
+        :param tracer: a rth.core.tracing.Tracer receiving the events of the ants discovery
+        :param ecmp: also computes every equal-cost next hop; routes having several of them get a 'nexthops' list
+            of {'gateway', 'interface'} (the route's own gateway first), and the sets are kept in `next_hops`
+        :param tie_break: one of 'uid', 'gateway_ip' or 'hash' (see rth.virtual_building.paths.tie_break_key) to
+            compute the hops and routing tables with the breadth-first path engine, choosing between equal-cost paths
+            with this policy. Only 'hash' makes the result independent of the order of the input dicts: 'uid'
+            follows the order of the routers, and 'gateway_ip' the IPs assigned automatically to the links given
+            without one. None keeps the ants discovery, whose choices follow the discovery order
+        :param areas: splits the network in areas linked by a backbone (see rth.virtual_building.areas), either the
+            maximum number of subnetworks of an area to split it automatically, or the area of each subnetwork
+            ({subnetwork_name: area_name, ...}). Routers get routes to the subnetworks of their own areas and to a
+            summary of each other area, and the hops only cover pairs of subnetworks of a same area. Uses the path
+            engine, with the 'uid' tie-break policy if none is given
+        :param lab: accepts networks made of several islands (connected components), each one with at most one
+            router connected to internet, instead of raising UnreachableNetwork. The islands are computed apart with
+            the path engine ('uid' tie-break policy if none is given), and routers of an island without internet get
+            no default route. The hops only cover pairs of subnetworks of a same island
+        :param workers: with lab, the number of processes computing the islands (see execute_many)
+        :param exits: accepts several routers connected to internet, each router's default route leading to the
+            nearest one. True gives them all the same weight, a dict gives the weight of some of them
+            ({router_name: weight, ...}, ints from 0 to 2**31 - 1, 0 by default): a router then goes to the exit with
+            the lowest weight plus distance, so a heavier exit only attracts the routers close to it. None keeps a
+            single router connected to internet
+        :param k_paths: also computes the k_paths shortest loopless paths of every pair of subnetworks, to provision
+            backup routes, and keeps them in `shortest_paths` (see rth.virtual_building.kpaths.KShortestPaths).
+            Format: {(subnet_uid, subnet_uid): [([router_uid, ...], [subnet_uid, ...]), ...]}, the shortest first,
+            equal costs ordered by the tie-break policy ('uid' if none is given)
+        :param k_paths_sources: the names of the starting subnetworks of the k_paths shortest paths, None for all of
+            them: each pair costs its own searches, so only the needed ones are best computed
+        :param k_paths_destinations: the names of their destination subnetworks, None for all of them
+        """
+
+        if tie_break is not None and tie_break not in TIE_BREAKS:
+            raise ValueError(f"Unknown tie-break policy '{tie_break}', expected one of {', '.join(TIE_BREAKS)}")
+        if areas is not None and ecmp:
+            raise ValueError("Multipath routes are not available with areas")
+        if areas is not None and lab:
+            raise ValueError("Areas are not available in lab mode")
+        if k_paths is not None and (not isinstance(k_paths, int) or k_paths < 1):
+            raise ValueError(f"The number of paths must be a positive int, got {k_paths!r}")
+        if exits is not None and exits is not True:
+            if not isinstance(exits, dict):
+                raise ValueError("The exits must be True or a dict of {router_name: weight}")
+            for name, weight in exits.items():
+                if not isinstance(weight, int) or isinstance(weight, bool) or not 0 <= weight <= MAX_OFFSET:
+                    raise ValueError(f"The weight of the exit '{name}' must be an int between 0 and {MAX_OFFSET}, "
+                                     f"got {weight!r}")
+
+        # every piece of state lives on the instance, so dispatchers can run concurrently in threads
+        self.__virtual_network_instance = None
+        # the path engine of query_hops, with the names of the network: (engine, names, {subnet_name: uid, ...})
+        self.__query_engine = None
+        # the TrafficModel of link_loads, built once per execution
+        self.__traffic_model = None
         self.debug = debug
+        self.tracer = tracer
+        self.ecmp = ecmp
+        self.tie_break = tie_break
+        self.areas = areas
+        self.lab = lab
+        self.workers = workers
+        self.exits = exits
+        self.k_paths = k_paths
+        self.k_paths_sources = k_paths_sources
+        self.k_paths_destinations = k_paths_destinations
         self.__executed = False
 
+        self.subnetworks, self.routers, self.links = None, None, None
+        self.equitemporality = None
+
+        self.gend_subnetworks, self.gend_routers, self.gend_routers_names = None, None, None
+        self.hops = None
+        self.routing_tables = None
+        self.formatted_raw_routing_tables = None
+        self.next_hops = None
+        self.shortest_paths = None
+        self.progress = None
+
+    @property
+    def uses_path_engine(self):
+        return self.tie_break is not None or self.areas is not None or self.lab
+
     #
     # Class execution flow
     #
     def execute(self, subnetworks, routers, links, equitemporality=True):
+        self.__new_virtual_network(equitemporality)
+        self.__executed = False
+
         self.subnetworks = subnetworks
         self.routers = routers
         self.links = links
+        self.hops = None
 
         self.equitemporality = equitemporality
         self.__flow()
         self.__executed = True
 
+    def query_hops(self, subnetworks=None, routers=None, links=None, sources=None, destinations=None,
+                   equitemporality=True, snapshot=None):
+        """
+        Computes the hops of some pairs of subnetworks only, for instance the ones of a new VLAN, without the routing
+        tables nor the hops of the other pairs: one tree per destination, each search stopping as soon as every source
+        is reached (see rth.virtual_building.paths.PathEngine.paths). The paths are the ones of the path engine, with
+        the 'uid' tie-break policy if none is given.
+
+        A topology is checked and built for the query, the instance being left unexecuted. A snapshot (see
+        save_snapshot) is loaded without being checked. Given neither, the network of the last execution, or of the
+        last snapshot queried, is queried again: its path engine is kept between queries, so a query only costs its
+        trees.
+
+        :param sources: the names of the starting subnetworks, None for all of them
+        :param destinations: the names of the destination subnetworks, None for all of them
+        :param snapshot: a rth.virtual_building.snapshot.Snapshot or the path of a snapshot file, instead of a topology
+        :return: the routers crossed for every pair that can be reached. Format:
+            {(start_name, end_name): [router_name, ...], ...}
+        :raises ValueError: for an unknown subnetwork name, or if there is no network to query
+        """
+
+        if subnetworks is not None:
+            self.__new_virtual_network(equitemporality)
+            self.__executed = False
+
+            self.subnetworks = subnetworks
+            self.routers = routers
+            self.links = links
+            self.hops = None
+            self.equitemporality = equitemporality
+
+            self.__checks()
+            self.__build_virtual_network()
+        elif snapshot is not None:
+            self.__executed = False
+            self.subnetworks, self.routers, self.links = None, None, None
+            self.hops = None
+            self.__use_virtual_network(self.__snapshot_network(snapshot))
+        elif self.__query_engine is None and not self.__executed:
+            raise ValueError("No topology nor snapshot given, and no executed network to query")
+
+        if self.__query_engine is None:
+            from rth.virtual_building.paths import PathEngine
+            from .formatters import uid_names
+            inst = self.__virtual_network_instance
+            names = uid_names(inst)
+            engine = PathEngine.from_network_creator(inst, self.tie_break or 'uid')
+            self.__query_engine = (engine, names, {name: uid for uid, name in enumerate(names['subnets'])})
+        engine, names, uids = self.__query_engine
+
+        hops = engine.paths(_subnets_uids(uids, sources), _subnets_uids(uids, destinations))
+        return {(names['subnets'][start], names['subnets'][end]): [names['routers'][router] for router in path]
+                for (start, end), path in hops.items()}
+
+    def execute_snapshot(self, snapshot, equitemporality=None):
+        """
+        Executes the network saved in a snapshot (see save_snapshot), without parsing nor checking it again.
+
+        :param snapshot: a rth.virtual_building.snapshot.Snapshot or the path of a snapshot file
+        :param equitemporality: overrides the equitemporality saved in the snapshot if given
+        """
+
+        self.__executed = False
+        self.subnetworks, self.routers, self.links = None, None, None
+        self.hops = None
+
+        inst = self.__snapshot_network(snapshot)
+        self.equitemporality = inst.equitemporality if equitemporality is None else equitemporality
+        self.__use_virtual_network(inst)
+        self.__discover_hops()
+        self.__calculate_routing_tables()
+        self.__executed = True
+
+    @staticmethod
+    def __snapshot_network(snapshot):
+        from rth.virtual_building.snapshot import Snapshot, load_snapshot
+        if isinstance(snapshot, Snapshot):
+            return snapshot.to_network_creator()
+        with load_snapshot(snapshot) as snapshot_:
+            return snapshot_.to_network_creator()
+
+    def execute_file(self, file_path, fmt=None):
+        """
+        Executes a snapshot file, or the first topology of a topology file (see rth.core.inputs.iter_topologies)
+        """
+
+        from rth.virtual_building.snapshot import SNAPSHOT_MAGIC
+        with open(file_path, 'rb') as f:
+            if f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC:
+                return self.execute_snapshot(file_path)
+
+        from .inputs import iter_topologies
+        topology = next(iter_topologies(file_path, fmt), None)
+        if not isinstance(topology, dict):
+            raise ValueError(f"No topology found in {file_path}")
+        arguments, _ = _topology_arguments(topology)
+        self.execute(*arguments)
+
+    def save_snapshot(self, file_path):
+        """
+        Saves the virtual network built by the last execution in the binary snapshot format, to be executed again
+        later with execute_snapshot
+        """
+
+        if self.__executed:
+            from rth.virtual_building.snapshot import save_snapshot
+            save_snapshot(self.__virtual_network_instance, file_path)
+
+    @classmethod
+    def execute_many(cls, topologies, workers=None, **options):
+        """
+        Executes many independent topologies over a process pool, yielding results as soon as they are done.
+
+        Topologies are pulled from the iterable lazily and at most twice as many as there are workers are in flight
+        at once, so neither the inputs nor the results of the whole batch are ever held in memory.
+        An error in one topology is captured in its result and does not abort the batch, and so is a worker that
+        could not run it or send its result back (a crashed process, a topology that cannot be pickled...).
+
+        :param topologies: an iterable of topologies, either dicts
+            ({"subnetworks": ..., "routers": ..., "links": ..., "equitemporality": bool, "name": ...}, the last two
+            being optional) or (subnetworks, routers, links) tuples
+        :param workers: the number of worker processes, defaults to the number of CPUs. 1 runs in this process.
+        :param options: the options given to every Dispatcher, like ecmp
+        :return: a generator of dicts: {"index": position in the iterable, "name": topology name or None,
+            "routing_tables": formatted_raw_routing_tables, "hops": hops, "names": names by uid,
+            "error": None, or the error as {"type": exception class name, "message": str(exception)}, picklable
+            whatever the exception}
+            The order is the completion order, not the input order.
+        """
+
+        workers = workers or cpu_count() or 1
+        jobs = ((index, topology, options) for index, topology in enumerate(topologies))
+
+        if workers == 1:
+            for job in jobs:
+                yield _execute_topology(job)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # the index of the topology of each running future
+            pending = {}
+            exhausted = False
+
+            while pending or not exhausted:
+                # keeping the pool busy without queuing the whole batch
+                while not exhausted and len(pending) < workers * 2:
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                        continue
+                    try:
+                        pending[pool.submit(_execute_topology, job)] = job[0]
+                    except Exception as e:
+                        # a broken pool refuses every new job
+                        yield _failed_topology(job[0], e)
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = _failed_topology(index, e)
+                    yield result
+
+    async def execute_async(self, subnetworks, routers, links, equitemporality=True, executor=None, batch_size=8,
+                            progress=None, timeout=None):
+        """
+        Asynchronous version of `execute`, for programs running an asyncio event loop.
+
+        Every heavy phase runs in `executor` (the loop default executor if None) and the hops discovery is split
+        in batches of `batch_size` starting subnetworks (destination subnetworks, one tree each, with the path
+        engine), the event loop getting the hand back between each of them. Cancelling the task (or reaching the
+        timeout) stops the execution at the end of the running phase or batch; the instance is then left unexecuted,
+        the results only being assigned to it once the execution completes. With areas or in lab mode, the path
+        engine runs in one phase.
+
+        :param executor: a concurrent.futures executor, or None for the default one
+        :param batch_size: the number of subnetworks processed per hops discovery batch
+        :param progress: an optional callable receiving (pairs done, total pairs) after each batch, also readable
+            from the `progress` attribute
+        :param timeout: maximum number of seconds for the whole execution, raises asyncio.TimeoutError when reached
+        """
+
+        import asyncio
+        flow = self.__async_flow(subnetworks, routers, links, equitemporality, executor, batch_size, progress)
+        if timeout is None:
+            await flow
+        else:
+            await asyncio.wait_for(flow, timeout)
+
+    async def __async_flow(self, subnetworks, routers, links, equitemporality, executor, batch_size, progress):
+        import asyncio
+        loop = asyncio.get_running_loop()
+
+        def run(func, *args):
+            return loop.run_in_executor(executor, func, *args)
+
+        self.__new_virtual_network(equitemporality)
+        self.__executed = False
+
+        self.subnetworks = subnetworks
+        self.routers = routers
+        self.links = links
+        self.hops = None
+        self.equitemporality = equitemporality
+
+        await run(self.__checks)
+        await run(self.__build_virtual_network)
+        await run(self.__check_connectivity)
+
+        def report(done, total):
+            self.progress = (done, total)
+            if progress is not None:
+                progress(done, total)
+
+        # the results stay local until the end: a job still running in the executor after a cancellation cannot
+        # write into the instance
+        subnets_count = len(self.gend_subnetworks)
+        total, done = subnets_count * (subnets_count - 1), 0
+        self.progress = (done, total)
+
+        if self.uses_path_engine and (self.areas is not None or self.lab):
+            # the areas and the islands are generated at once
+            hops, routing_tables, links = await run(self.__paths)
+            report(total, total)
+        elif self.uses_path_engine:
+            generator = await run(self.__trees_generator)
+            destinations = list(generator.engine.destinations())
+            for i in range(0, len(destinations), batch_size):
+                batch = destinations[i:i + batch_size]
+                await run(generator.add_destinations, batch)
+
+                done += len(batch) * (subnets_count - 1)
+                report(done, total)
+
+            hops, routing_tables = await run(generator.result)
+            links = generator.engine.graph.links()
+        else:
+            ants_inst = await run(self.__ants_instance)
+            await run(ants_inst.sweep_network)
+
+            subnets = list(self.gend_subnetworks)
+            for i in range(0, len(subnets), batch_size):
+                batch = subnets[i:i + batch_size]
+                await run(ants_inst.calculate_hops, batch)
+
+                done += len(batch) * (len(subnets) - 1)
+                report(done, total)
+
+            hops, links = ants_inst.hops, ants_inst.links
+            routing_tables = await run(self.__ants_routing_tables, links, hops)
+
+        formatted_tables = await run(self.__formatted_tables, routing_tables)
+        next_hops = await run(self.__add_multipath_routes, formatted_tables) if self.ecmp else self.next_hops
+        shortest_paths = await run(self.__find_shortest_paths) if self.k_paths else self.shortest_paths
+
+        self.hops, self.links, self.routing_tables = hops, links, routing_tables
+        self.formatted_raw_routing_tables = formatted_tables
+        self.next_hops, self.shortest_paths = next_hops, shortest_paths
+        self.__executed = True
+
+    def __new_virtual_network(self, equitemporality):
+        # a fresh virtual network each time, so the same instance can be executed again
+        from rth.virtual_building.network_creator import NetworkCreator
+        self.__virtual_network_instance = NetworkCreator(equitemporality, multiple_exits=self.exits is not None)
+        self.__query_engine = None
+        self.__traffic_model = None
+
     def __flow(self):
         self.__checks()
         self.__build_virtual_network()
@@ -52,34 +402,10 @@ class Dispatcher:
     # Perform all checks about data passed here
     #
     def __checks(self):
-        # Subnetworks checks
-        s = self.subnetworks
-        if not isinstance(s, dict):
-            raise WronglyFormedSubnetworksData()
-        for name in s:
-            v = s[name]
-            try:
-                ip, _ = v.split("/")
-                FourBytesLiteral().set_from_string_literal(ip)
-            except:
-                raise WronglyFormedSubnetworksData()
-
-        r = self.routers
-        if not isinstance(r, dict):
-            raise WronglyFormedRoutersData()
-        for name in r:
-            if r[name] is not None and not isinstance(r[name], bool):
-                raise WronglyFormedRoutersData()
-
-        li = self.links
-        if not isinstance(li, dict):
-            raise WronglyFormedLinksData()
-        for rid in li:
-            if not isinstance(li[rid], dict):
-                raise WronglyFormedLinksData()
-            for subnet in li[rid]:
-                if not isinstance(li[rid][subnet], str) and li[rid][subnet] is not None:
-                    raise WronglyFormedLinksData()
+        report = validate_topology(self.subnetworks, self.routers, self.links, check_master=False,
+                                   multiple_exits=self.exits is not None)
+        if report:
+            raise InvalidTopology.of(report)
 
     #
     # Network Creator
@@ -104,6 +430,12 @@ class Dispatcher:
         for router_name in self.links:
             inst.connect_router_to_networks(router_name, self.links[router_name])
 
+        self.__use_virtual_network(inst)
+
+    def __use_virtual_network(self, inst):
+        self.__virtual_network_instance = inst
+        self.__query_engine = None
+        self.__traffic_model = None
         self.gend_subnetworks = inst.subnetworks
         self.gend_routers = inst.routers
         self.gend_routers_names = inst.routers_names
@@ -111,12 +443,74 @@ class Dispatcher:
     def network_raw_output(self):
         return self.__virtual_network_instance.network_raw_output() if self.__executed else None
 
+    def names(self):
+        """
+        :return: the subnetworks and routers names, indexed by uid. Format: {'subnets': [...], 'routers': [...]}
+        """
+        from .formatters import uid_names
+        return uid_names(self.__virtual_network_instance) if self.__executed else None
+
     #
     # Ants Discovery
     #
+    def __ants_instance(self):
+        from rth.virtual_building.ants import AntsDiscovery
+        return AntsDiscovery(self.gend_subnetworks, self.gend_routers, self.equitemporality, debug=self.debug,
+                             tracer=self.tracer, multiple_exits=self.exits is not None)
+
+    def __exits(self):
+        """
+        :return: the routers connected to internet and their weights, or None without multiple exits. Format:
+            {router_uid: weight, ...}
+        """
+
+        if self.exits is None:
+            return None
+
+        weights = {} if self.exits is True else {str(name): weight for name, weight in self.exits.items()}
+        exits = {}
+        for uid in range(len(self.gend_routers)):
+            name = self.gend_routers_names[uid]
+            if self.gend_routers[uid].internet:
+                exits[uid] = weights.pop(name, 0)
+            elif name in weights:
+                raise ValueError(f"The router '{name}' is given a weight but is not connected to internet")
+        if weights and not self.lab:
+            raise ValueError(f"Weights given to unknown routers: {', '.join(weights)}")
+        if not exits and not self.lab:
+            raise MasterRouterError(True)
+        return exits
+
+    def __check_connectivity(self):
+        """
+        Reports every subnetwork that is not connected to a router connected to internet at once, from the
+        connected components of the network, before any path is searched
+        """
+
+        inst = self.__virtual_network_instance
+        masters = [uid for uid in range(len(self.gend_routers)) if self.gend_routers[uid].internet]
+        if self.lab or not masters or (len(masters) > 1 and self.exits is None):
+            # the islands are accepted, or the master router error is raised by the discovery
+            return
+
+        from rth.virtual_building.components import Components
+        from rth.virtual_building.graph import NetworkGraph
+        components = Components(NetworkGraph.from_network_creator(inst))
+        exit_components = {components.routers[uid] for uid in masters}
+        unreachable = [uid for uid in range(len(self.gend_subnetworks))
+                       if components.subnets[uid] not in exit_components]
+        if unreachable:
+            networks = [self.gend_subnetworks[uid]['instance'] for uid in unreachable]
+            raise UnreachableNetwork(networks[0].name, networks[0].cidr, len(networks),
+                                     [(network.name, network.cidr) for network in networks])
+
     def __discover_hops(self):
 
-        ants_inst = AntsDiscovery(self.gend_subnetworks, self.gend_routers, self.equitemporality, debug=self.debug)
+        self.__check_connectivity()
+        if self.uses_path_engine:
+            return self.__discover_paths()
+
+        ants_inst = self.__ants_instance()
 
         ants_inst.sweep_network()
         ants_inst.calculate_hops()
@@ -124,6 +518,120 @@ class Dispatcher:
         self.links = ants_inst.links
         self.hops = ants_inst.hops
 
+    def __discover_paths(self):
+        self.hops, self.routing_tables, self.links = self.__paths()
+
+    def __paths(self):
+        """
+        The path engine computes the hops and the routing tables at once, from one shortest path tree per destination
+
+        :return: hops, routing_tables, links
+        """
+
+        if self.areas is not None:
+            return self.__discover_areas()
+        if self.lab:
+            return self.__discover_islands()
+
+        generator = self.__trees_generator()
+        hops, routing_tables = generator.generate()
+        return hops, routing_tables, generator.engine.graph.links()
+
+    def __trees_generator(self):
+        from rth.virtual_building.paths import PathEngine
+        from rth.virtual_building.routing_tables_generator import TreesRoutingTablesGenerator
+        inst = self.__virtual_network_instance
+        engine = PathEngine.from_network_creator(inst, self.tie_break)
+        return TreesRoutingTablesGenerator(inst, engine, exits=self.__exits())
+
+    def __discover_islands(self):
+        """
+        Lab mode: the islands cannot share any path, so each one is executed as a topology of its own, in parallel
+
+        :return: hops, routing_tables, links
+        """
+
+        from rth.virtual_building.components import Components
+        from rth.virtual_building.graph import NetworkGraph
+        from rth.virtual_building.paths import PathEngine, tie_break_key
+        from rth.virtual_building.routing_tables_generator import TreesRoutingTablesGenerator
+        from .formatters import uid_names
+        inst = self.__virtual_network_instance
+        graph = NetworkGraph.from_network_creator(inst)
+        components = Components(graph)
+
+        islands = {}
+        for uid in range(graph.subnets_count):
+            islands.setdefault(components.subnets[uid], []).append(uid)
+        if len(islands) <= 1:
+            engine = PathEngine(graph, tie_break_key(self.tie_break or 'uid', inst))
+            hops, routing_tables = TreesRoutingTablesGenerator(inst, engine, require_master=False,
+                                                               exits=self.__exits()).generate()
+            return hops, routing_tables, graph.links()
+
+        names = uid_names(inst)
+        topologies = []
+        for island, subnets in islands.items():
+            routers = [uid for uid in range(graph.routers_count) if components.routers[uid] == island]
+            topologies.append({
+                'subnetworks': {names['subnets'][uid]: names['cidrs'][uid] for uid in subnets},
+                'routers': {names['routers'][uid]: True if self.gend_routers[uid].internet else None
+                            for uid in routers},
+                'links': {names['routers'][uid]: {names['subnets'][subnet]: str(ip) for subnet, ip in
+                                                  self.gend_routers[uid].connected_networks.items()}
+                          for uid in routers},
+                'equitemporality': self.equitemporality
+            })
+
+        subnets_uids = {name: uid for uid, name in enumerate(names['subnets'])}
+        routers_uids = {name: uid for uid, name in enumerate(names['routers'])}
+        hops, routing_tables = {}, [{} for _ in range(graph.routers_count)]
+        # the weights are checked on the whole network, each island only knowing its own routers
+        self.__exits()
+        if isinstance(self.exits, dict) and not set(map(str, self.exits)) <= set(names['routers']):
+            unknown = [str(name) for name in self.exits if str(name) not in names['routers']]
+            raise ValueError(f"Weights given to unknown routers: {', '.join(unknown)}")
+        for result in Dispatcher.execute_many(topologies, workers=self.workers, tie_break=self.tie_break or 'uid',
+                                              lab=True, exits=self.exits):
+            if result['error'] is not None:
+                raise ExecutionError(result['error']['type'], result['error']['message'])
+            island_names = result['names']
+            for (start, end), path in result['hops'].items():
+                hops[(subnets_uids[island_names['subnets'][start]], subnets_uids[island_names['subnets'][end]])] = \
+                    [routers_uids[island_names['routers'][router]] for router in path]
+            for name, table in result['routing_tables'].items():
+                routing_tables[routers_uids[name]] = table
+
+        return dict(sorted(hops.items())), routing_tables, graph.links()
+
+    def __discover_areas(self):
+        """
+        :return: hops, routing_tables, links
+        """
+
+        from rth.virtual_building.areas import Hierarchy, partition_areas
+        from rth.virtual_building.graph import NetworkGraph
+        from rth.virtual_building.paths import tie_break_key
+        from rth.virtual_building.routing_tables_generator import AreasRoutingTablesGenerator
+        inst = self.__virtual_network_instance
+        graph = NetworkGraph.from_network_creator(inst)
+
+        if isinstance(self.areas, int):
+            area_of = partition_areas(graph, self.areas)
+        else:
+            names = [inst.subnetworks[uid]['instance'].name for uid in range(graph.subnets_count)]
+            missing = [name for name in names if name not in self.areas]
+            if missing:
+                raise ValueError(f"No area given for the subnetwork(s) {', '.join(map(str, missing))}")
+            area_of = [self.areas[name] for name in names]
+
+        exits = self.__exits()
+        masters = [uid for uid in range(graph.routers_count) if inst.routers[uid].internet]
+        hierarchy = Hierarchy(graph, area_of, masters)
+        key = tie_break_key(self.tie_break or 'uid', inst)
+        hops, routing_tables = AreasRoutingTablesGenerator(inst, hierarchy, key, exits).generate()
+        return hops, routing_tables, graph.links()
+
     #
     # Routing Tables Generator
     #
@@ -139,22 +647,38 @@ class Dispatcher:
             The results, sent to another process, won't need to be displayed anymore, so raw will be implied.
         """
 
-        if not self.links or self.hops:
+        if not self.links or not self.hops:
             self.__discover_hops()
 
-        rtg_inst = RoutingTablesGenerator(self.__virtual_network_instance, self.gend_subnetworks, self.gend_routers,
-                                          self.links, self.hops, equitemporality=self.equitemporality)
+        if self.uses_path_engine:
+            # already computed along with the hops
+            routing_tables = self.routing_tables
+        else:
+            routing_tables = self.routing_tables = self.__ants_routing_tables(self.links, self.hops)
+
+        self.formatted_raw_routing_tables = self.__formatted_tables(routing_tables)
+
+        if self.ecmp:
+            self.next_hops = self.__add_multipath_routes(self.formatted_raw_routing_tables)
+        if self.k_paths:
+            self.shortest_paths = self.__find_shortest_paths()
+
+    def __ants_routing_tables(self, links, hops):
+        from rth.virtual_building.routing_tables_generator import RoutingTablesGenerator
+        rtg_inst = RoutingTablesGenerator(self.__virtual_network_instance, self.gend_subnetworks,
+                                          self.gend_routers, links, hops,
+                                          equitemporality=self.equitemporality, exits=self.__exits())
 
         # getting routing tables
         routing_tables = []
-        for i in range(len(self.routers)):
+        for i in range(len(self.gend_routers)):
             routing_tables.append(rtg_inst.get_routing_table(i))
+        return routing_tables
 
-        self.routing_tables = routing_tables
-
+    def __formatted_tables(self, routing_tables):
         # formatting them to be displayed
         final = {}
-        for i in range(len(self.routers)):
+        for i in range(len(self.gend_routers)):
             name = self.gend_routers_names[i]
             final[name] = routing_tables[i]
 
@@ -164,7 +688,66 @@ class Dispatcher:
                 final[router][key]['gateway'] = str(final[router][key]['gateway'])
                 final[router][key]['interface'] = str(final[router][key]['interface'])
 
-        self.formatted_raw_routing_tables = final
+        return final
+
+    def __add_multipath_routes(self, formatted_tables):
+        """
+        Finds the equal-cost next hops of every router with one shortest path tree per destination (the default
+        route's tree being rooted at the router connected to internet), and adds them to the formatted routes.
+
+        :return: the sets of next hops, as tuples of router uids, for `next_hops`. Format:
+            {(router_uid, subnet_uid or None): (uid, ...)}, None standing for the default route; routers connected to
+            the destination have no entry.
+        """
+
+        from rth.virtual_building.paths import PathEngine
+        inst = self.__virtual_network_instance
+        engine = PathEngine.from_network_creator(inst, self.tie_break)
+        next_hops = {}
+
+        def add(tree, destination, cidr):
+            for router in range(len(self.gend_routers)):
+                hops = tree.next_hops(router)
+                if not hops:
+                    continue
+                next_hops[(router, destination)] = tuple(next_router for next_router, _ in hops)
+                if len(hops) == 1:
+                    continue
+
+                route = formatted_tables[self.gend_routers_names[router]][cidr]
+                nexthops = [{'gateway': str(inst.get_ip_of_router_on_subnetwork(subnet, next_router)),
+                             'interface': str(inst.get_ip_of_router_on_subnetwork(subnet, router))}
+                            for next_router, subnet in hops]
+                # the gateway chosen for the route stays first
+                nexthops.sort(key=lambda hop: hop['gateway'] != route['gateway'])
+                route['nexthops'] = nexthops
+
+        for subnet in range(len(self.gend_subnetworks)):
+            add(engine.tree(subnet), subnet, self.gend_subnetworks[subnet]['instance'].cidr)
+
+        exits = self.__exits()
+        if exits is None:
+            exits = [uid for uid in range(len(self.gend_routers)) if self.gend_routers[uid].internet]
+        add(engine.tree_to_routers(exits), None, '0.0.0.0/0')
+        return next_hops
+
+    def __find_shortest_paths(self):
+        """
+        The k shortest paths of every pair (or of the given sources and destinations only), each tree of a
+        destination being shared by all the starts
+
+        :return: the paths, for `shortest_paths`
+        """
+
+        from rth.virtual_building.kpaths import KShortestPaths
+        from rth.virtual_building.paths import PathEngine
+        from .formatters import uid_names
+        inst = self.__virtual_network_instance
+        uids = {name: uid for uid, name in enumerate(uid_names(inst)['subnets'])}
+        sources = _subnets_uids(uids, self.k_paths_sources)
+        destinations = _subnets_uids(uids, self.k_paths_destinations)
+        engine = PathEngine.from_network_creator(inst, self.tie_break or 'uid')
+        return KShortestPaths(engine, self.k_paths).all_paths(sources, destinations)
 
     def display_routing_tables(self):
         if self.__executed:
@@ -197,30 +780,123 @@ class Dispatcher:
 
     def output_routing_tables(self, file_path):
         if self.__executed:
+            from .formatters import write_text
             with open(file_path, encoding="utf-8", mode="w") as f:
-                # Hops
-                f.write("----- HOPS -----\n")
-                for tup in self.hops:
-                    s, e = tup
-                    path = self.hops[tup]
-                    string = f"Subnet {self.__virtual_network_instance.uid_to_name('subnet', s)} " \
-                             f"to subnet {self.__virtual_network_instance.uid_to_name('subnet', e)}: "
-
-                    if len(path) == 1:
-                        string += f"router {self.__virtual_network_instance.uid_to_name('router', path[0])}"
-                    else:
-                        for i in range(len(path)):
-                            if i > 0:
-                                string += " > "
-                            string += f"router {self.__virtual_network_instance.uid_to_name('router', path[i])}"
-
-                    f.write(string + '\n')
-
-                # Routing tables
-                f.write("\n\n----- ROUTING TABLES -----\n")
-                for name in self.formatted_raw_routing_tables:
-                    f.write(f"\nRouter {name}\n")
-                    for subnet in self.formatted_raw_routing_tables[name]:
-                        f.write(f"  - {subnet} {''.join([' ' for _ in range(18 - len(subnet))])} : "
-                                f"{self.formatted_raw_routing_tables[name][subnet]['gateway']} "
-                                f"via {self.formatted_raw_routing_tables[name][subnet]['interface']}\n")
+                write_text(f, self.hops, self.formatted_raw_routing_tables, self.names())
+
+    def output_table_store(self, file_path):
+        """
+        Writes the routing tables in the binary columnar format, to be opened with rth.core.table_store.TableStore
+        """
+
+        if self.__executed:
+            from .table_store import write_table_store
+            write_table_store(self.formatted_raw_routing_tables, file_path)
+
+    def verify_routing_tables(self, workers=1):
+        """
+        Checks that, for every destination prefix, the routing tables lead to it without loops nor black holes
+        (see rth.core.verifier.verify_routing_tables). In lab mode, each island is checked towards its own prefixes.
+
+        :return: a ValidationReport, empty (falsy) if the routing tables are consistent
+        """
+
+        if self.__executed:
+            return verify_routing_tables(self.formatted_raw_routing_tables, workers=workers, islands=self.lab)
+
+    def link_loads(self, demands):
+        """
+        Pushes a demand matrix along the routing tables, equal-cost next hops sharing the traffic equally (see
+        rth.core.traffic.TrafficModel). Needs NumPy.
+
+        The model is built at the first call and kept for the next ones, until the instance is executed again: only
+        the first matrix pays for indexing the routing tables.
+
+        :param demands: the traffic from each subnetwork (rows) to each other one (columns), by uid, as a NumPy array
+            or nested lists
+        :return: a rth.core.traffic.LinkLoads, whose hot_spots() gives the most loaded interfaces
+        """
+
+        if self.__executed:
+            if self.__traffic_model is None:
+                from .traffic import TrafficModel
+                self.__traffic_model = TrafficModel(self.formatted_raw_routing_tables, self.names(), self.hops)
+            return self.__traffic_model.loads(demands)
+
+    def output_router_files(self, directory, fmt='text'):
+        """
+        Writes one file per router in the directory, only rewriting the routers whose table changed since the last
+        output (see rth.core.router_files.write_router_files)
+
+        :return: the routers names, by what was done. Format: {'written': [...], 'unchanged': [...], 'removed': [...]}
+        """
+
+        if self.__executed:
+            from .router_files import write_router_files
+            return write_router_files(self.formatted_raw_routing_tables, directory, fmt)
+
+
+#
+# Helpers
+#
+def _subnets_uids(uids, names):
+    """
+    :param uids: the uid of each subnetwork name. Format: {name: uid, ...}
+    :param names: subnetwork names, or None
+    :return: their uids, None for None
+    :raises ValueError: for an unknown name
+    """
+
+    if names is None:
+        return None
+    unknown = [str(name) for name in names if str(name) not in uids]
+    if unknown:
+        raise ValueError(f"Unknown subnetwork(s) {', '.join(unknown)}")
+    return [uids[str(name)] for name in names]
+
+
+#
+# Batch execution
+#
+def _topology_arguments(topology):
+    if isinstance(topology, dict):
+        return (topology['subnetworks'], topology['routers'], topology['links'],
+                topology.get('equitemporality', True)), topology.get('name')
+    return tuple(topology), None
+
+
+def _execute_topology(job):
+    """
+    Process pool worker of Dispatcher.execute_many: executes one topology and returns a picklable result
+
+    :param job: the (index, topology, Dispatcher options) triplet
+    """
+
+    index, topology, options = job
+    result = _failed_topology(index)
+
+    try:
+        arguments, result['name'] = _topology_arguments(topology)
+        inst = Dispatcher(**options)
+        inst.execute(*arguments)
+        result['routing_tables'] = inst.formatted_raw_routing_tables
+        result['hops'] = inst.hops
+        result['names'] = inst.names()
+    except Exception as e:
+        result['error'] = _picklable_error(e)
+
+    return result
+
+
+def _failed_topology(index, error=None):
+    """
+    :return: the result of execute_many for a topology that produced nothing (yet), with the error if given
+    """
+
+    return {'index': index, 'name': None, 'routing_tables': None, 'hops': None, 'names': None,
+            'error': _picklable_error(error) if error is not None else None}
+
+
+def _picklable_error(error):
+    # the exception itself may not be picklable, nor be rebuilt from its pickle
+    return {'type': type(error).__name__, 'message': str(error)}
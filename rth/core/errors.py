@@ -17,6 +17,39 @@ class WronglyFormedLinksData(Exception):
         return "The link data given is wrongly formed or missing information. Please verify said data."
 
 
+class InvalidTopology(Exception):
+
+    def __init__(self, report):
+        self.report = report
+
+    def __str__(self):
+        return f"{len(self.report)} error(s) found in the given data:\n{self.report}"
+
+    @classmethod
+    def of(cls, report):
+        """
+        :return: the InvalidTopology of the category of the first issue, which is also the WronglyFormed*Data
+            exception raised before the reports existed
+        """
+
+        return INVALID_TOPOLOGIES.get(report.issues[0].category, cls)(report) if report else cls(report)
+
+
+class InvalidSubnetworksData(InvalidTopology, WronglyFormedSubnetworksData):
+    pass
+
+
+class InvalidRoutersData(InvalidTopology, WronglyFormedRoutersData):
+    pass
+
+
+class InvalidLinksData(InvalidTopology, WronglyFormedLinksData):
+    pass
+
+
+INVALID_TOPOLOGIES = {'subnetworks': InvalidSubnetworksData, 'routers': InvalidRoutersData, 'links': InvalidLinksData}
+
+
 class MissingDataParameter(Exception):
 
     def __str__(self):
@@ -65,16 +98,45 @@ class NameAlreadyExists(NameError):
         return f"Name '{self.name}' already exists"
 
 
+class SnapshotError(Exception):
+
+    def __init__(self, path, reason):
+        self.path = path
+        self.reason = reason
+
+    def __str__(self):
+        return f"Could not load the snapshot '{self.path}': {self.reason}"
+
+
+class TableStoreError(Exception):
+
+    def __init__(self, path, reason):
+        self.path = path
+        self.reason = reason
+
+    def __str__(self):
+        return f"Could not load the routing tables store '{self.path}': {self.reason}"
+
+
 class UnreachableNetwork(Exception):
 
-    def __init__(self, name, cidr, total):
+    def __init__(self, name, cidr, total, unreachable=None):
+        """
+        :param unreachable: every unreachable subnetwork when they are all known. Format: [(name, cidr), ...]
+        """
+
         self.name = name
         self.cidr = cidr
         self.total = total
+        self.unreachable = unreachable
 
     def __str__(self):
-        return f"The subnetwork '{self.name}' (CIDR {self.cidr}) is unreachable from master router. " \
+        text = f"The subnetwork '{self.name}' (CIDR {self.cidr}) is unreachable from master router. " \
                f"Total unreachable: {self.total}"
+        if self.unreachable and len(self.unreachable) > 1:
+            shown = ', '.join(f"'{name}'" for name, _ in self.unreachable[:10])
+            text += f" ({shown}{', ...' if len(self.unreachable) > 10 else ''})"
+        return text
 
 
 class MasterRouterError(Exception):
@@ -88,3 +150,18 @@ class MasterRouterError(Exception):
 
     def __str__(self):
         return self.text
+
+
+class ExecutionError(Exception):
+
+    def __init__(self, error_type, message):
+        """
+        :param error_type: the name of the exception raised by the execution of a topology (see
+            Dispatcher.execute_many), which only reports its type and message
+        """
+
+        self.error_type = error_type
+        self.message = message
+
+    def __str__(self):
+        return f"{self.error_type}: {self.message}"
@@ -0,0 +1,83 @@
+import json
+
+from rth.core.diff import table_digest
+
+
+def uid_names(network_creator):
+    """
+    :return: the names of the subnetworks and routers, indexed by uid, and the CIDR of the subnetworks.
+        Format: {'subnets': [...], 'routers': [...], 'cidrs': [...]}
+    """
+
+    return {
+        'subnets': [str(network_creator.subnetworks[uid]['instance'].name) for uid in
+                    range(len(network_creator.subnetworks))],
+        'cidrs': [network_creator.subnetworks[uid]['instance'].cidr for uid in
+                  range(len(network_creator.subnetworks))],
+        'routers': [str(network_creator.routers[uid].name) for uid in range(len(network_creator.routers))]
+    }
+
+
+def path_string(path, routers_names):
+    return " > ".join(f"router {routers_names[router]}" for router in path)
+
+
+def write_text(f, hops, routing_tables, names):
+    """
+    Writes hops and routing tables in the text format of Dispatcher.output_routing_tables
+
+    :param f: a text stream
+    :param hops: the hops, {(subnet_uid, subnet_uid): [router_uid, ...], ...}
+    :param routing_tables: the formatted raw routing tables
+    :param names: the names by uid, see uid_names
+    """
+
+    subnets_names, routers_names = names['subnets'], names['routers']
+
+    # Hops
+    f.write("----- HOPS -----\n")
+    for s, e in hops:
+        f.write(f"Subnet {subnets_names[s]} to subnet {subnets_names[e]}: "
+                f"{path_string(hops[(s, e)], routers_names)}\n")
+
+    # Routing tables
+    f.write("\n\n----- ROUTING TABLES -----\n")
+    for name in routing_tables:
+        f.write("\n")
+        write_router_table(f, name, routing_tables[name])
+
+
+def write_router_table(f, name, table):
+    f.write(f"Router {name}\n")
+    for subnet in table:
+        f.write(f"  - {subnet} {' ' * (18 - len(subnet))} : {table[subnet]['gateway']} "
+                f"via {table[subnet]['interface']}\n")
+        # the other equal-cost next hops of a multipath route
+        for hop in table[subnet].get('nexthops', ())[1:]:
+            f.write(f"{' ' * 23} + {hop['gateway']} via {hop['interface']}\n")
+
+
+def json_document(hops, routing_tables, names, name=None):
+    """
+    :return: a JSON-serialisable dict of the subnetworks, hops (by names), routing tables and the digest of each
+        router's table (see diff.table_digest)
+    """
+
+    subnets_names, routers_names = names['subnets'], names['routers']
+
+    return {
+        'name': name,
+        'subnetworks': dict(zip(subnets_names, names.get('cidrs', ()))),
+        'hops': [{'from': subnets_names[s], 'to': subnets_names[e],
+                  'routers': [routers_names[r] for r in hops[(s, e)]]} for s, e in hops],
+        'routing_tables': routing_tables,
+        'digests': {router: table_digest(table) for router, table in routing_tables.items()}
+    }
+
+
+def write_json(f, document, lines=False):
+    if lines:
+        f.write(json.dumps(document, separators=(',', ':')) + '\n')
+    else:
+        json.dump(document, f, indent=2)
+        f.write('\n')
@@ -0,0 +1,128 @@
+import json
+import sys
+
+
+JSON_EXTENSIONS = ('.json', '.jsonl', '.ndjson')
+YAML_EXTENSIONS = ('.yaml', '.yml')
+
+
+def detect_format(path):
+    """
+    :return: 'yaml' for YAML extensions, 'json' otherwise (JSON Lines being read by the JSON reader)
+    """
+
+    return 'yaml' if str(path).lower().endswith(YAML_EXTENSIONS) else 'json'
+
+
+def iter_json_documents(stream, chunk_size=1 << 16):
+    """
+    Incrementally reads JSON documents from a text stream, without loading the whole stream.
+
+    Accepted layouts are one or several top-level values separated by whitespace (which covers JSON Lines), and
+    top-level arrays, whose items are yielded one by one. Only one document is held in memory at a time.
+
+    :param stream: a text stream
+    :param chunk_size: the number of characters read at once
+    :return: a generator of the decoded documents
+    """
+
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    # whether we are iterating over the items of a top-level array
+    in_array = False
+
+    def fill(size=chunk_size):
+        nonlocal buffer, position, eof
+        chunk = stream.read(size)
+        if not chunk:
+            eof = True
+        # the consumed documents are dropped once they are at least half of the buffer, so each character is
+        # copied a bounded number of times
+        if position * 2 >= len(buffer):
+            buffer, position = buffer[position:], 0
+        buffer += chunk
+
+    def skip(separators):
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in separators:
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            fill()
+
+    while True:
+        skip(' \t\r\n,' if in_array else ' \t\r\n')
+        if position >= len(buffer):
+            if in_array:
+                raise ValueError("Unexpected end of input inside a JSON array")
+            return
+
+        if not in_array and buffer[position] == '[':
+            in_array = True
+            position += 1
+            continue
+        if in_array and buffer[position] == ']':
+            in_array = False
+            position += 1
+            continue
+
+        while True:
+            try:
+                document, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # the document is not complete yet: reading as much as what is pending before decoding it again
+                # doubles it each time, so a large document is decoded a logarithmic number of times
+                fill(max(chunk_size, len(buffer) - position))
+                continue
+            # a number could continue in the next chunk
+            if end == len(buffer) and not eof and not isinstance(document, (dict, list, str)):
+                fill()
+                continue
+            break
+
+        position = end
+        yield document
+
+
+def iter_yaml_documents(stream):
+    """
+    Lazily reads the documents of a YAML stream, lists being flattened. Needs PyYAML.
+    """
+
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError("Reading YAML needs PyYAML, install it with `pip install pyyaml`")
+
+    for document in yaml.safe_load_all(stream):
+        if isinstance(document, list):
+            yield from document
+        elif document is not None:
+            yield document
+
+
+def iter_topologies(source, fmt=None):
+    """
+    Reads the topologies of a file or stream, one at a time
+
+    :param source: a path, '-' for the standard input, or an already opened text stream
+    :param fmt: 'json' (also reads JSON Lines), 'yaml', or None to guess it from the path
+    :return: a generator of topology dicts, as accepted by Dispatcher.execute_many
+    """
+
+    if fmt is None:
+        fmt = detect_format(source) if isinstance(source, str) else 'json'
+    reader = iter_yaml_documents if fmt == 'yaml' else iter_json_documents
+
+    if source == '-':
+        yield from reader(sys.stdin)
+    elif isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            yield from reader(f)
+    else:
+        yield from reader(source)
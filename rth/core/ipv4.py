@@ -0,0 +1,120 @@
+# the decimal literals of the bytes (up to three digits, leading zeros included) and of the mask lengths, so the
+# usual literals are parsed by dict lookups instead of checking and converting each part
+_BYTES = {f"{byte:0{width}}": byte for byte in range(256) for width in range(len(str(byte)), 4)}
+_LENGTHS = {str(length): length for length in range(33)}
+
+
+def ip_to_int(literal):
+    """
+    Parses a dotted IPv4 literal
+
+    :param literal: the IPv4, "a.b.c.d"
+    :return: the IPv4 as an int
+    :raises ValueError: if the literal is not a valid IPv4
+    """
+
+    parts = literal.split('.')
+    if len(parts) == 4:
+        try:
+            return _BYTES[parts[0]] << 24 | _BYTES[parts[1]] << 16 | _BYTES[parts[2]] << 8 | _BYTES[parts[3]]
+        except KeyError:
+            pass
+    return _checked_ip_to_int(literal, parts)
+
+
+def _checked_ip_to_int(literal, parts):
+    # the slow path, for the literals the lookups do not know
+    if len(parts) != 4:
+        raise ValueError(f"'{literal}' is not a valid IPv4")
+
+    value = 0
+    for part in parts:
+        if not part.isdigit() or len(part) > 3:
+            raise ValueError(f"'{literal}' is not a valid IPv4")
+        byte = int(part)
+        if byte > 255:
+            raise ValueError(f"'{literal}' is not a valid IPv4")
+        value = (value << 8) | byte
+
+    return value
+
+
+class ParsedIPs(dict):
+    """
+    The ints of IPv4 literals, each literal being parsed once: routing tables repeat the same few gateways and
+    interfaces on every route of a router. Format: {literal: int, ...}
+    """
+
+    def __missing__(self, literal):
+        value = self[literal] = ip_to_int(literal)
+        return value
+
+
+def int_to_ip(value):
+    return f"{value >> 24 & 255}.{value >> 16 & 255}.{value >> 8 & 255}.{value & 255}"
+
+
+def mask_of_length(length):
+    return (0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF
+
+
+def parse_cidr(cidr):
+    """
+    Parses a CIDR
+
+    :param cidr: the CIDR, "a.b.c.d/n"
+    :return: (ip, mask length), the ip being the int of the given address (host bits are kept)
+    :raises ValueError: if the CIDR is malformed
+    """
+
+    if isinstance(cidr, str):
+        ip, _, length = cidr.partition('/')
+        if length in _LENGTHS:
+            return ip_to_int(ip), _LENGTHS[length]
+
+    if not isinstance(cidr, str) or cidr.count('/') != 1:
+        raise ValueError(f"'{cidr}' is not a valid CIDR")
+
+    ip, length = cidr.split('/')
+    if not length.isdigit() or int(length) > 32:
+        raise ValueError(f"'{cidr}' has an invalid mask length")
+
+    return ip_to_int(ip), int(length)
+
+
+def network_bounds(ip, length):
+    """
+    :return: (first address, last address) of the network of length `length` containing `ip`
+    """
+
+    mask = mask_of_length(length)
+    start = ip & mask
+    return start, start | (~mask & 0xFFFFFFFF)
+
+
+def summarize(cidrs):
+    """
+    Covers exactly the addresses of the given networks with as few CIDRs as possible
+
+    :param cidrs: the networks, "a.b.c.d/n"
+    :return: the summary CIDRs, in address order
+    """
+
+    ranges = sorted(network_bounds(*parse_cidr(cidr)) for cidr in cidrs)
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    summary = []
+    for start, end in merged:
+        while start <= end:
+            # the largest block aligned on start that does not go past end
+            length = 32 - ((start & -start).bit_length() - 1) if start else 0
+            while start + (1 << (32 - length)) - 1 > end:
+                length += 1
+            summary.append(f"{int_to_ip(start)}/{length}")
+            start += 1 << (32 - length)
+    return summary
@@ -0,0 +1,126 @@
+import heapq
+
+from .ipv4 import int_to_ip, network_bounds, parse_cidr
+
+
+# the longest prefix planned: a /30 leaves two host addresses, less cannot hold routers
+LONGEST_PREFIX = 30
+
+
+def prefix_for(addresses):
+    """
+    :param addresses: the number of host addresses needed, the routers' interfaces included
+    :return: the length of the smallest prefix holding them, network and broadcast addresses being reserved
+    :raises ValueError: if no prefix can hold them
+    """
+
+    if not isinstance(addresses, int) or isinstance(addresses, bool) or addresses < 1:
+        raise ValueError(f"The number of addresses must be a positive int, got {addresses!r}")
+    length = min(LONGEST_PREFIX, 32 - (addresses + 1).bit_length())
+    if length < 0:
+        raise ValueError(f"No IPv4 network can hold {addresses} addresses")
+    return length
+
+
+class BuddyAllocator:
+    """
+    Allocates aligned blocks of addresses out of pools, the way a buddy allocator does: a free block is split in two
+    halves (buddies) until it has the wanted size, and a released block is merged back with its buddy when the buddy
+    is free too.
+
+    There is one free list per prefix length, so an allocation takes the smallest free block that is large enough
+    (the best fit) after at most 32 steps, whatever the number of blocks: O(log N) for N addresses. Each free list is a
+    heap, so the lowest address is taken first and the plan does not depend on anything else.
+
+    :ivar free: the starts of the free blocks, by prefix length. Format: [[start, ...], ...], each list being a heap
+    """
+
+    def __init__(self, pools):
+        """
+        :param pools: the CIDRs of the pools, which must not overlap
+        :raises ValueError: for a malformed CIDR or overlapping pools
+        """
+
+        self.free = [[] for _ in range(33)]
+        self.__free_blocks = set()
+
+        parsed = sorted((network_bounds(*parse_cidr(pool)), parse_cidr(pool)[1], pool) for pool in pools)
+        for i, ((start, end), length, pool) in enumerate(parsed):
+            if i > 0 and start <= parsed[i - 1][0][1]:
+                raise ValueError(f"The pool {pool} overlaps the pool {parsed[i - 1][2]}")
+            self.__add(start, length)
+
+    def __add(self, start, length):
+        heapq.heappush(self.free[length], start)
+        self.__free_blocks.add((start, length))
+
+    def __take(self, length):
+        # the heaps keep the blocks merged back with their buddy, which are skipped here
+        heap = self.free[length]
+        while heap:
+            start = heapq.heappop(heap)
+            if (start, length) in self.__free_blocks:
+                self.__free_blocks.remove((start, length))
+                return start
+        return None
+
+    def allocate(self, length):
+        """
+        :param length: the prefix length of the block
+        :return: the start of the block
+        :raises ValueError: if there is no room left for it
+        """
+
+        for larger in range(length, -1, -1):
+            start = self.__take(larger)
+            if start is None:
+                continue
+            # the upper halves are given back, until the block has the wanted size
+            while larger < length:
+                larger += 1
+                self.__add(start + (1 << (32 - larger)), larger)
+            return start
+
+        raise ValueError(f"No room left for a /{length} network")
+
+    def release(self, start, length):
+        """
+        Gives a block back, merging it with its buddy as long as the buddy is free too
+        """
+
+        while length > 0:
+            buddy = start ^ (1 << (32 - length))
+            if (buddy, length) not in self.__free_blocks:
+                break
+            self.__free_blocks.remove((buddy, length))
+            start, length = min(start, buddy), length - 1
+        self.__add(start, length)
+
+
+def plan_subnetworks(addresses, pools):
+    """
+    Plans the networks of a topology out of address pools (VLSM): each network gets the smallest prefix holding its
+    addresses, the largest networks being placed first so the pools are not fragmented.
+
+    :param addresses: the number of host addresses needed by each subnetwork, its routers' interfaces included.
+        Format: {NAME: NUMBER, ...}
+    :param pools: the CIDRs of the pools, which must not overlap
+    :return: the subnetworks, in the order of `addresses`, ready to be given to Dispatcher.execute. Format:
+        {NAME: CIDR, ...}
+    :raises ValueError: if a number is invalid, or if the pools are too small (every subnetwork that does not fit
+        being listed)
+    """
+
+    allocator = BuddyAllocator(pools)
+    lengths = {name: prefix_for(number) for name, number in addresses.items()}
+
+    planned, missing = {}, []
+    for name in sorted(lengths, key=lengths.get):
+        try:
+            planned[name] = f"{int_to_ip(allocator.allocate(lengths[name]))}/{lengths[name]}"
+        except ValueError:
+            missing.append(f"{name} (/{lengths[name]})")
+
+    if missing:
+        raise ValueError(f"No room left in the pools for the subnetwork(s) {', '.join(missing)}")
+    return {name: planned[name] for name in addresses}
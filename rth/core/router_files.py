@@ -0,0 +1,125 @@
+import hashlib
+import io
+import json
+import os
+import secrets
+
+from rth.core.diff import table_digest
+from rth.core.formatters import write_router_table, write_json
+
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+ROUTER_FILES_EXTENSIONS = {'text': '.txt', 'json': '.json'}
+
+
+def _safe_name(router):
+    name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(router))
+    if name == str(router) and name not in ('', '.', '..', os.path.splitext(MANIFEST_NAME)[0]):
+        return name
+    # the name had to be changed: a hash of the real one avoids collisions, and is the same on every run
+    return f"{name}-{hashlib.blake2b(str(router).encode('utf-8'), digest_size=4).hexdigest()}"
+
+
+def _atomic_write(path, content):
+    """
+    Writes to a temporary file of the same directory then renames it, so a reader never sees a partial file
+    """
+
+    directory = os.path.dirname(path) or '.'
+    while True:
+        temporary = os.path.join(directory, f".{os.path.basename(path)}.{secrets.token_hex(4)}.tmp")
+        try:
+            # the permissions open() would give, the kernel applying the umask
+            fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            break
+        except FileExistsError:
+            continue
+
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        try:
+            # a replaced file keeps its permissions
+            os.chmod(temporary, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def read_manifest(directory):
+    """
+    :return: the manifest of a directory of router files, or None if there is none (or it cannot be read)
+    """
+
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_router_files(routing_tables, directory, fmt='text'):
+    """
+    Writes one file per router, keeping a manifest of the content hash of every table.
+
+    A router file is only written when its table changed since the previous run (according to the manifest) or when
+    it is missing; files of routers that no longer exist are removed. Every file, manifest included, is replaced by
+    an atomic rename.
+
+    :param routing_tables: the formatted raw routing tables
+    :param directory: the output directory, created if needed
+    :param fmt: 'text' (the format of output_routing_tables) or 'json'
+    :return: the routers names, by what was done. Format: {'written': [...], 'unchanged': [...], 'removed': [...]}
+    """
+
+    if fmt not in ROUTER_FILES_EXTENSIONS:
+        raise ValueError(f"Unknown router files format '{fmt}'")
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory) or {'routers': {}}
+    # files written in another format are all written again
+    previous = manifest['routers'] if manifest.get('format') == fmt else {}
+
+    routers = {}
+    report = {'written': [], 'unchanged': [], 'removed': []}
+
+    for router, table in routing_tables.items():
+        name = str(router)
+        entry = {'file': _safe_name(name) + ROUTER_FILES_EXTENSIONS[fmt], 'digest': table_digest(table)}
+        routers[name] = entry
+
+        if previous.get(name) == entry and os.path.exists(os.path.join(directory, entry['file'])):
+            report['unchanged'].append(name)
+            continue
+
+        content = io.StringIO()
+        if fmt == 'text':
+            write_router_table(content, name, table)
+        else:
+            write_json(content, {'router': name, 'routing_table': table})
+        _atomic_write(os.path.join(directory, entry['file']), content.getvalue())
+        report['written'].append(name)
+
+    current_files = {entry['file'] for entry in routers.values()}
+    for name, entry in manifest['routers'].items():
+        if name not in routers:
+            report['removed'].append(name)
+        if isinstance(entry, dict) and entry.get('file') not in current_files:
+            try:
+                os.unlink(os.path.join(directory, os.path.basename(str(entry.get('file')))))
+            except OSError:
+                pass
+
+    if manifest.get('format') != fmt or manifest['routers'] != routers:
+        content = io.StringIO()
+        write_json(content, {'version': MANIFEST_VERSION, 'format': fmt, 'routers': routers})
+        _atomic_write(os.path.join(directory, MANIFEST_NAME), content.getvalue())
+
+    return report
@@ -0,0 +1,314 @@
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+from rth.core.ipv4 import ip_to_int, parse_cidr, mask_of_length
+
+
+# every message is a JSON document preceded by its size in bytes
+FRAME_HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+#
+# Framing
+#
+def read_frame(sock):
+    """
+    :return: the decoded JSON document, or None if the connection was closed before a new frame
+    """
+
+    header = _read_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    size, = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {size} bytes is over the {MAX_FRAME_SIZE} bytes limit")
+    payload = _read_exactly(sock, size)
+    if payload is None:
+        raise ConnectionError("Connection closed in the middle of a frame")
+    return json.loads(payload.decode('utf-8'))
+
+
+def write_frame(sock, document):
+    payload = json.dumps(document, separators=(',', ':')).encode('utf-8')
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def _read_exactly(sock, size):
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = sock.recv(size - len(chunks))
+        if not chunk:
+            if chunks:
+                raise ConnectionError("Connection closed in the middle of a frame")
+            return None
+        chunks.extend(chunk)
+    return bytes(chunks)
+
+
+class QueryError(Exception):
+
+    def __init__(self, message):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class QueryEngine:
+    """
+    Keeps the result of one execution resident and answers queries on it.
+
+    :ivar source: the file the engine was loaded from
+    :ivar routes: Format: {router_name: {length: {prefix: (cidr, gateway, interface)}, ...}, ...}
+    """
+
+    def __init__(self, dispatcher, source=None):
+        self.source = source
+        self.tables = dispatcher.formatted_raw_routing_tables
+        self.hops = dispatcher.hops
+        names = dispatcher.names()
+        self.subnets_names, self.routers_names = names['subnets'], names['routers']
+
+        self.subnets_uids = {name: uid for uid, name in enumerate(self.subnets_names)}
+
+        # longest prefix match index, and the owner of each interface IP
+        self.routes = {}
+        self.owners = {}
+        for router in self.tables:
+            by_length = {}
+            for cidr, route in self.tables[router].items():
+                prefix, length = parse_cidr(cidr)
+                by_length.setdefault(length, {})[prefix & mask_of_length(length)] = \
+                    (cidr, route['gateway'], route['interface'], route.get('nexthops'))
+                if route['gateway'] == route['interface']:
+                    self.owners[ip_to_int(route['interface'])] = router
+            self.routes[router] = by_length
+
+    @classmethod
+    def load(cls, path, **options):
+        """
+        Executes a topology file (the first topology it contains) or a snapshot
+
+        :param options: the options of the Dispatcher executing it (tie_break, ecmp, areas, lab, exits...)
+        """
+
+        from rth.core.dispatcher import Dispatcher
+
+        inst = Dispatcher(**options)
+        inst.execute_file(path)
+        return cls(inst, path)
+
+    #
+    # Queries
+    #
+    def lookup(self, router, ip):
+        if router not in self.routes:
+            raise QueryError(f"Unknown router '{router}'")
+        try:
+            value = ip_to_int(ip)
+        except (ValueError, AttributeError, TypeError):
+            raise QueryError(f"'{ip}' is not a valid IPv4")
+
+        by_length = self.routes[router]
+        for length in sorted(by_length, reverse=True):
+            route = by_length[length].get(value & mask_of_length(length))
+            if route is not None:
+                result = {'route': route[0], 'gateway': route[1], 'interface': route[2]}
+                if route[3] is not None:
+                    # the equal-cost next hops of a multipath route (ECMP)
+                    result['nexthops'] = route[3]
+                return result
+        return {'route': None, 'gateway': None, 'interface': None}
+
+    def path(self, start, end):
+        for name in (start, end):
+            if name not in self.subnets_uids:
+                raise QueryError(f"Unknown subnetwork '{name}'")
+        if start == end:
+            return {'routers': []}
+        # in lab mode or with areas, the hops only cover the pairs inside an island or an area
+        routers = self.hops.get((self.subnets_uids[start], self.subnets_uids[end]))
+        if routers is None:
+            raise QueryError(f"No path between '{start}' and '{end}'")
+        return {'routers': [self.routers_names[r] for r in routers]}
+
+    def trace(self, router, ip, max_hops=255):
+        """
+        Follows the routing tables from `router` to `ip`, hop by hop
+        """
+
+        hops = []
+        visited = set()
+        while len(hops) < max_hops:
+            result = self.lookup(router, ip)
+            hops.append(dict(result, router=router))
+
+            if result['route'] is None:
+                return {'hops': hops, 'status': 'no_route'}
+            if result['gateway'] == result['interface']:
+                # a connected network, or the default route of the router connected to internet
+                return {'hops': hops, 'status': 'exited' if result['route'].endswith('/0') else 'delivered'}
+
+            visited.add(router)
+            next_router = self.owners.get(ip_to_int(result['gateway']))
+            if next_router is None:
+                # the gateway is outside of the network, this is the exit
+                return {'hops': hops, 'status': 'exited'}
+            if next_router in visited:
+                return {'hops': hops, 'status': 'loop'}
+            router = next_router
+
+        return {'hops': hops, 'status': 'too_many_hops'}
+
+    def answer(self, query):
+        """
+        :param query: {"op": "lookup", "router", "ip"} | {"op": "path", "from", "to"} | {"op": "trace", "router", "ip"}
+        :return: the result, with an "ok" key
+        """
+
+        try:
+            if not isinstance(query, dict):
+                raise QueryError("A query must be an object")
+            op = query.get('op')
+            if op == 'lookup':
+                result = self.lookup(str(query.get('router')), query.get('ip'))
+            elif op == 'path':
+                result = self.path(str(query.get('from')), str(query.get('to')))
+            elif op == 'trace':
+                result = self.trace(str(query.get('router')), query.get('ip'))
+            else:
+                raise QueryError(f"Unknown operation '{op}'")
+        except QueryError as e:
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            # a bug must not drop the connection nor the other queries of a batch
+            return {'ok': False, 'error': f"Could not answer the query: {e!r}"}
+
+        result['ok'] = True
+        return result
+
+
+class QueryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serves the queries of a QueryEngine over a Unix domain socket.
+
+    Each request is a frame (4 bytes big-endian size, then UTF-8 JSON) holding either one query or
+    {"queries": [query, ...]}; the answer is a frame with the result or {"results": [result, ...]}.
+    {"op": "reload"} reloads the source and {"op": "stats"} describes what is loaded.
+
+    When `poll_interval` is set, the source file is watched and reloaded as soon as it changes; a source that fails
+    to load is reported on stderr and the previous one is kept.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, source, poll_interval=1.0, **options):
+        """
+        :param options: the options of the Dispatcher executing the source, at start and at each reload (see
+            QueryEngine.load)
+        """
+
+        self.socket_path = socket_path
+        self.source = source
+        self.poll_interval = poll_interval
+        self.options = options
+        self.engine = QueryEngine.load(source, **options)
+        self.__mtime = self.__source_mtime()
+        self.__stop = threading.Event()
+        self.__reload_lock = threading.Lock()
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, QueryHandler)
+
+    def __source_mtime(self):
+        try:
+            return os.stat(self.source).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self):
+        """
+        :return: True if the source has been reloaded
+        """
+
+        with self.__reload_lock:
+            self.__mtime = self.__source_mtime()
+            try:
+                engine = QueryEngine.load(self.source, **self.options)
+            except Exception as e:
+                print(f"rth serve: could not reload {self.source}: {e}", file=sys.stderr)
+                return False
+            # swapping the reference is atomic, running queries keep the previous engine
+            self.engine = engine
+            return True
+
+    def __watch(self):
+        while not self.__stop.wait(self.poll_interval):
+            if self.__source_mtime() != self.__mtime:
+                self.reload()
+
+    def serve_forever(self, poll_interval=0.5):
+        if self.poll_interval:
+            threading.Thread(target=self.__watch, daemon=True).start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.__stop.set()
+
+    def server_close(self):
+        super().server_close()
+        self.__stop.set()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def answer(self, request):
+        if isinstance(request, dict) and request.get('op') == 'reload':
+            return {'ok': self.reload()}
+        if isinstance(request, dict) and request.get('op') == 'stats':
+            engine = self.engine
+            return {'ok': True, 'source': engine.source, 'subnets': len(engine.subnets_names),
+                    'routers': len(engine.routers_names)}
+
+        engine = self.engine
+        if isinstance(request, dict) and 'queries' in request:
+            if not isinstance(request['queries'], list):
+                return {'ok': False, 'error': "queries must be a list"}
+            return {'ok': True, 'results': [engine.answer(query) for query in request['queries']]}
+        return engine.answer(request)
+
+
+class QueryHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        while True:
+            try:
+                request = read_frame(self.request)
+            except (ValueError, ConnectionError) as e:
+                try:
+                    write_frame(self.request, {'ok': False, 'error': str(e)})
+                except OSError:
+                    pass
+                return
+            if request is None:
+                return
+            write_frame(self.request, self.server.answer(request))
+
+
+def query(socket_path, request):
+    """
+    Sends one request to a running server and returns its answer
+
+    :param request: a query, {"queries": [...]} for a batch, or {"op": "reload"} / {"op": "stats"}
+    """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        write_frame(sock, request)
+        return read_frame(sock)
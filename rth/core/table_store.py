@@ -0,0 +1,261 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from rth.core.errors import TableStoreError
+from rth.core.ipv4 import ip_to_int, int_to_ip, parse_cidr, mask_of_length
+
+
+STORE_MAGIC = b'RTHTABL\0'
+STORE_VERSION = 2
+
+# magic, version, routers count, routes count, names size
+HEADER = struct.Struct('<8sIIIQ')
+
+# every column, in file order, with its array typecode
+COLUMNS = (
+    ('router_order', 'I'),
+    ('name_offsets', 'Q'),
+    ('route_offsets', 'Q'),
+    ('prefixes', 'I'),
+    ('lengths', 'B'),
+    ('gateways', 'I'),
+    ('interfaces', 'I'),
+    ('nexthop_offsets', 'Q'),
+    ('nexthop_gateways', 'I'),
+    ('nexthop_interfaces', 'I'),
+    ('names', 'B'),
+)
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _route_key(cidr):
+    prefix, length = parse_cidr(cidr)
+    return prefix & mask_of_length(length), length
+
+
+def write_table_store(routing_tables, path):
+    """
+    Writes routing tables in the columnar binary format read by TableStore.
+
+    Routers are stored in the order of their names (UTF-8 bytes), each with its routes sorted by (prefix, length) in
+    four columns: prefix, prefix length, gateway and interface, all as ints. A router's routes are
+    `[route_offsets[i], route_offsets[i + 1])` in every column, and `router_order[i]` is the position of the router in
+    the given tables. The equal-cost next hops of route j (ECMP) are `[nexthop_offsets[j], nexthop_offsets[j + 1])`
+    in the nexthop columns, empty for a single next hop. Columns are 8-byte aligned little-endian arrays, usable in
+    place once memory-mapped.
+
+    :param routing_tables: the formatted raw routing tables, {router_name: {cidr: {'gateway', 'interface'[,
+        'nexthops']}}}
+    :param path: where to write the store
+    """
+
+    names = sorted(((str(name).encode('utf-8'), i, name) for i, name in enumerate(routing_tables)))
+
+    data = {column: array(typecode) for column, typecode in COLUMNS if typecode != 'B' or column == 'lengths'}
+    data['names'] = bytearray()
+    data['name_offsets'].append(0)
+    data['route_offsets'].append(0)
+    data['nexthop_offsets'].append(0)
+
+    for encoded, position, name in names:
+        data['router_order'].append(position)
+        data['names'].extend(encoded)
+        data['name_offsets'].append(len(data['names']))
+
+        table = routing_tables[name]
+        for (prefix, length), cidr in sorted((_route_key(cidr), cidr) for cidr in table):
+            data['prefixes'].append(prefix)
+            data['lengths'].append(length)
+            data['gateways'].append(ip_to_int(str(table[cidr]['gateway'])))
+            data['interfaces'].append(ip_to_int(str(table[cidr]['interface'])))
+            for hop in table[cidr].get('nexthops', ()):
+                data['nexthop_gateways'].append(ip_to_int(str(hop['gateway'])))
+                data['nexthop_interfaces'].append(ip_to_int(str(hop['interface'])))
+            data['nexthop_offsets'].append(len(data['nexthop_gateways']))
+        data['route_offsets'].append(len(data['prefixes']))
+
+    offset = _align(HEADER.size + 16 * len(COLUMNS))
+    layout = []
+    for column, _ in COLUMNS:
+        values = data[column]
+        size = len(values) * values.itemsize if isinstance(values, array) else len(values)
+        layout.append((offset, size))
+        offset = _align(offset + size)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(STORE_MAGIC, STORE_VERSION, len(names), len(data['prefixes']), len(data['names'])))
+        for section in layout:
+            f.write(struct.pack('<QQ', *section))
+
+        for (column, _), (offset, size) in zip(COLUMNS, layout):
+            f.write(b'\0' * (offset - f.tell()))
+            values = data[column]
+            if isinstance(values, array) and sys.byteorder != 'little':
+                values = array(values.typecode, values)
+                values.byteswap()
+            f.write(bytes(values))
+
+
+class TableStore:
+    """
+    Read-only, memory-mapped access to a routing tables store written by write_table_store.
+
+    Nothing is loaded when opening: routers are found by a binary search over the mapped names and routes are read
+    straight from the mapped columns, so only the looked-up tables ever become Python objects.
+
+    :ivar routers_count: the number of routers in the store
+    :ivar routes_count: the total number of routes
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__file = open(path, 'rb')
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.__file.close()
+            raise TableStoreError(path, "empty file")
+        self.__view = memoryview(self.__map)
+        self.__columns = []
+
+        try:
+            self.__read()
+        except Exception:
+            self.close()
+            raise
+
+    def __read(self):
+        view = self.__view
+        if len(view) < HEADER.size + 16 * len(COLUMNS):
+            raise TableStoreError(self.path, "truncated header")
+
+        magic, version, routers, routes, _ = HEADER.unpack_from(view, 0)
+        if magic != STORE_MAGIC:
+            raise TableStoreError(self.path, "not a RTH routing tables store")
+        if version != STORE_VERSION:
+            raise TableStoreError(self.path, f"unsupported version {version} (expected {STORE_VERSION})")
+
+        self.routers_count, self.routes_count = routers, routes
+
+        for i, (column, typecode) in enumerate(COLUMNS):
+            offset, size = struct.unpack_from('<QQ', view, HEADER.size + i * 16)
+            if offset + size > len(view):
+                raise TableStoreError(self.path, f"truncated column {column}")
+            values = view[offset:offset + size].cast(typecode)
+            if typecode != 'B' and sys.byteorder != 'little':
+                values = array(typecode, values.tobytes())
+                values.byteswap()
+            self.__columns.append(values)
+            setattr(self, column, values)
+
+    #
+    # Getters
+    #
+    def __name_at(self, index):
+        return bytes(self.names[self.name_offsets[index]:self.name_offsets[index + 1]])
+
+    def index_of(self, router_name):
+        """
+        :return: the index of the router in the store, or None if it is not in it
+        """
+
+        target = str(router_name).encode('utf-8')
+        low, high = 0, self.routers_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.__name_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.routers_count and self.__name_at(low) == target:
+            return low
+        return None
+
+    def routers(self):
+        """
+        :return: a generator of the routers names, in the store order
+        """
+
+        for index in range(self.routers_count):
+            yield self.__name_at(index).decode('utf-8')
+
+    def __range_of(self, router_name):
+        index = self.index_of(router_name)
+        if index is None:
+            raise KeyError(router_name)
+        return self.route_offsets[index], self.route_offsets[index + 1]
+
+    def routes(self, router_name):
+        """
+        :return: a generator of the (prefix, length, gateway, interface) routes of the router, as ints
+        :raises KeyError: if the router is not in the store
+        """
+
+        start, end = self.__range_of(router_name)
+        for i in range(start, end):
+            yield self.prefixes[i], self.lengths[i], self.gateways[i], self.interfaces[i]
+
+    def table(self, router_name):
+        """
+        :return: the table of the router, in the format of Dispatcher.formatted_raw_routing_tables
+        :raises KeyError: if the router is not in the store
+        """
+
+        start, end = self.__range_of(router_name)
+        table = {}
+        for i in range(start, end):
+            route = {'gateway': int_to_ip(self.gateways[i]), 'interface': int_to_ip(self.interfaces[i])}
+            hops = range(self.nexthop_offsets[i], self.nexthop_offsets[i + 1])
+            if hops:
+                route['nexthops'] = [{'gateway': int_to_ip(self.nexthop_gateways[j]),
+                                      'interface': int_to_ip(self.nexthop_interfaces[j])} for j in hops]
+            table[f"{int_to_ip(self.prefixes[i])}/{self.lengths[i]}"] = route
+        return table
+
+    def lookup(self, router_name, ip):
+        """
+        Longest prefix match of `ip` in the table of the router
+
+        :param ip: an IPv4, as a literal or an int
+        :return: (cidr, gateway, interface) literals, or None if no route matches
+        :raises KeyError: if the router is not in the store
+        """
+
+        value = ip_to_int(ip) if isinstance(ip, str) else ip
+        start, end = self.__range_of(router_name)
+
+        # one binary search per prefix length, longest first; routes sharing a prefix are contiguous
+        for length in range(32, -1, -1):
+            prefix = value & mask_of_length(length)
+            i = bisect_left(self.prefixes, prefix, start, end)
+            while i < end and self.prefixes[i] == prefix:
+                if self.lengths[i] == length:
+                    return (f"{int_to_ip(prefix)}/{length}", int_to_ip(self.gateways[i]),
+                            int_to_ip(self.interfaces[i]))
+                i += 1
+
+        return None
+
+    #
+    # Closing
+    #
+    def close(self):
+        for values in self.__columns:
+            if isinstance(values, memoryview):
+                values.release()
+        self.__columns = []
+        self.__view.release()
+        self.__map.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
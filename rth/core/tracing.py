@@ -0,0 +1,135 @@
+from collections import deque
+
+
+#
+# Events emitted by the ants process
+#
+PROCESS_START = 'process_start'
+ROUND_START = 'round_start'
+HOP_PHASE = 'hop_phase'
+ANT_OPTIONS = 'ant_options'
+ANT_MOVED = 'ant_moved'
+ANT_DEAD = 'ant_dead'
+ANT_BORN = 'ant_born'
+ANT_OBJECTIVE = 'ant_objective'
+CLEANUP = 'cleanup'
+ROUND_END = 'round_end'
+PROCESS_END = 'process_end'
+PAIR_DONE = 'pair_done'
+
+DEATH_REASONS = {
+    'exhausted': "Already seen everything from this node",
+    'dead_end': "Found a dead end",
+    'split': "Found multiple possible paths. Giving birth to:",
+}
+
+
+class Tracer:
+    """
+    Base class of every trace sink.
+
+    The ants process only calls `emit` when a tracer is attached, so an untraced run never builds a single event.
+    Events are a name (see the constants of this module) and a small dict of plain values: no formatting is done
+    while tracing, it is deferred to `replay`.
+    """
+
+    def emit(self, event, data):
+        raise NotImplementedError
+
+
+class RingBufferTracer(Tracer):
+    """
+    Keeps the last `capacity` events in memory. Recording is a single deque append, so it can stay attached on
+    real topologies; older events are silently dropped once the buffer is full.
+
+    :ivar events: The recorded events. Format: deque([(event, data), ...])
+    """
+
+    def __init__(self, capacity=4096):
+        self.events = deque(maxlen=capacity)
+
+    def emit(self, event, data):
+        self.events.append((event, data))
+
+    def clear(self):
+        self.events.clear()
+
+    def replay(self, write=None):
+        replay(self.events, write)
+
+
+class ConsoleTracer(Tracer):
+    """
+    Renders every event as soon as it is emitted, in the box-drawing format used by `debug=True`.
+    """
+
+    def __init__(self, write=None):
+        self.write = write
+
+    def emit(self, event, data):
+        write = self.write or print
+        for line in render_event(event, data):
+            write(line)
+
+
+#
+# Rendering
+#
+def render_event(event, data):
+    """
+    Turns one event into the lines of the box-drawing debug output
+
+    :param event: the event name
+    :param data: the event data
+    :return: a list of lines, empty for unknown events
+    """
+
+    if event == PROCESS_START:
+        return ["----- PROCESS START -----"]
+    elif event == ROUND_START:
+        return ["┌────────────────────────────────────────────",
+                f"│ Starting new round: {data['ants']} ants alive",
+                f"│ Current visited state: {data['subnets']} subnetworks, {data['routers']} routers"]
+    elif event == HOP_PHASE:
+        kind = "subnetwork" if data['hop'] == 'subnet' else "router"
+        return ["├──────────────────────────────────────────",
+                f"│ Commencing hop to next {kind}. Activated {data['activated']} ants "
+                f"({data['ants']} ants in total).",
+                "│ Status:"]
+    elif event == ANT_OPTIONS:
+        return [f"│  └ {data['ant']}: {data['options']}"]
+    elif event == ANT_MOVED:
+        kind = "network" if data['hop'] == 'subnet' else "router"
+        return [f"│    » ALIVE | Discovered {kind} {data['pos']}"]
+    elif event == ANT_DEAD:
+        return [f"│    » DEAD | {DEATH_REASONS[data['reason']]}"]
+    elif event == ANT_BORN:
+        return [f"│      » {data['ant']} : discovered {data['pos']}"]
+    elif event == ANT_OBJECTIVE:
+        return [f"│    » OBJECTIVE | Reached through routers {data['path']}"]
+    elif event == CLEANUP:
+        return ["├──────────────────────────────────────────",
+                f"│ Removing dead ants. Total ants: {data['ants']}"]
+    elif event == ROUND_END:
+        return [f"│ Ants remaining : {data['ants']}",
+                "└──────────────────────────────────────────"]
+    elif event == PROCESS_END:
+        return [f"Final state: {data['subnets']} subnetworks, {data['routers']} routers visited",
+                "----- PROCESS END -----"]
+    elif event == PAIR_DONE:
+        return [f"matrix {list(data['pair'])}: {data['paths']}"]
+    return []
+
+
+def replay(events, write=None):
+    """
+    Replays recorded events into the box-drawing debug output
+
+    :param events: an iterable of (event, data) couples, as recorded by RingBufferTracer
+    :param write: the function receiving each line, print if not given
+    """
+
+    write = write or print
+    for event, data in events:
+        for line in render_event(event, data):
+            write(line)
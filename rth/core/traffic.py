@@ -0,0 +1,254 @@
+from rth.core.verifier import ForwardingIndex
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Computing link loads needs NumPy, install it with `pip install numpy`")
+    return numpy
+
+
+class TrafficModel:
+    """
+    The forwarding structure of a network, read from its routing tables, along which demand matrices are pushed.
+
+    Building it resolves the route of every router towards every subnetwork once (longest prefix match, so summary
+    routes are followed too). The traffic entering a subnetwork's router is then forwarded by levels, a router's level
+    being its number of forwarding steps before the destination at most: when a level is processed, everything its
+    routers will ever receive has arrived. Each level is a single vectorized NumPy pass over all the destinations at
+    once, so a demand matrix costs as many passes as the longest path, whatever the number of flows. Equal-cost next
+    hops ('nexthops' of ECMP routes) get an equal share of the traffic.
+
+    :ivar interfaces: the interfaces of the routers, as found in their connected routes. Format:
+        [(router_uid, subnet_uid), ...]
+    """
+
+    def __init__(self, routing_tables, names, hops=None):
+        """
+        :param routing_tables: the formatted raw routing tables
+        :param names: the names by uid, see rth.core.formatters.uid_names
+        :param hops: the hops, whose first router is the one the traffic of a pair enters; without them (or for the
+            pairs they do not cover, like the ones of different areas) it enters the router of the starting
+            subnetwork that is the closest to the destination
+        """
+
+        np = _numpy()
+        self.names = names
+        routers, cidrs = names['routers'], names['cidrs']
+        routers_count, subnets_count = len(routers), len(cidrs)
+        subnets_uids = {cidr: uid for uid, cidr in enumerate(cidrs)}
+
+        index = ForwardingIndex(routing_tables)
+        self.interfaces = []
+        # {interface ip: index}, {(router_uid, subnet_uid): index}
+        by_ip, by_connection = {}, {}
+        for router, name in enumerate(routers):
+            for cidr, route in routing_tables[name].items():
+                if route['gateway'] == route['interface'] and cidr in subnets_uids:
+                    by_ip[index.ips[route['interface']]] = by_connection[(router, subnets_uids[cidr])] = \
+                        len(self.interfaces)
+                    self.interfaces.append((router, subnets_uids[cidr]))
+
+        # [(level, router, destination, next router, share, out interface, in interface), ...]
+        edges, deliveries, drops = [], [], []
+        levels = np.zeros((routers_count, subnets_count), dtype=np.int64)
+
+        for destination, cidr in enumerate(cidrs):
+            steps = [self.__steps(routing_tables, index, by_ip, name, cidr) for name in routers]
+            level = self.__levels(steps, cidr)
+            levels[:, destination] = level
+
+            for router, routes in enumerate(steps):
+                if routes is None:
+                    drops.append((router, destination))
+                elif isinstance(routes, int):
+                    deliveries.append((router, destination, routes))
+                else:
+                    share = 1 / len(routes)
+                    edges.extend((level[router], router, destination, self.interfaces[in_interface][0], share,
+                                  out_interface, in_interface) for out_interface, in_interface in routes)
+
+        # the highest levels first, each level being a contiguous slice
+        edges.sort(key=lambda edge: -edge[0])
+        columns = list(zip(*edges)) if edges else [()] * 7
+        self.__level, self.__source, self.__destination, self.__next, self.__share, self.__out, self.__in = (
+            np.array(column, dtype=np.float64 if i == 4 else np.int64) for i, column in enumerate(columns))
+        bounds = np.flatnonzero(np.diff(self.__level)) + 1 if edges else []
+        self.__slices = list(zip([0, *bounds], [*bounds, len(edges)])) if edges else []
+
+        self.__deliveries = np.array(deliveries, dtype=np.int64).reshape(-1, 3)
+        self.__drops = np.array(drops, dtype=np.int64).reshape(-1, 2)
+
+        # the router (and its interface) each pair enters, -1 if the traffic cannot be routed
+        self.__entry = np.full((subnets_count, subnets_count), -1, dtype=np.int64)
+        self.__entry_interface = np.full((subnets_count, subnets_count), -1, dtype=np.int64)
+        for start in range(subnets_count):
+            candidates = [r for r in range(routers_count) if (r, start) in by_connection]
+            for end in range(subnets_count):
+                if start == end:
+                    continue
+                path = hops.get((start, end)) if hops else None
+                if path and isinstance(path[0], list):
+                    # all the paths of a discovery without equitemporality
+                    path = path[0]
+                if path:
+                    router = path[0]
+                else:
+                    routed = [r for r in candidates if levels[r, end] > 0]
+                    router = min(routed, key=lambda r: (levels[r, end], r)) if routed else None
+                if router is not None and (router, start) in by_connection:
+                    self.__entry[start, end] = router
+                    self.__entry_interface[start, end] = by_connection[(router, start)]
+
+        self.__pairs = np.nonzero(self.__entry >= 0)
+        self.routers_count, self.subnets_count = routers_count, subnets_count
+
+    @staticmethod
+    def __steps(routing_tables, index, by_ip, name, cidr):
+        """
+        :return: the interface index delivering the destination, the (out interface, in interface) of each next
+            hop, or None if the router drops the traffic
+        """
+
+        route = index.route(name, cidr)
+        if route is None:
+            return None
+        route_cidr, gateway, interface = route
+        if gateway == interface:
+            return by_ip.get(interface) if route_cidr == cidr else None
+
+        nexthops = routing_tables[name][route_cidr].get('nexthops')
+        if nexthops is None:
+            routes = [(by_ip.get(interface), by_ip.get(gateway))]
+        else:
+            routes = [(by_ip.get(index.ips[hop['interface']]), by_ip.get(index.ips[hop['gateway']]))
+                      for hop in nexthops]
+        if any(out_interface is None or in_interface is None for out_interface, in_interface in routes):
+            return None
+        return routes
+
+    def __levels(self, steps, cidr):
+        """
+        :return: the level of each router towards the destination, 0 if it drops the traffic
+        :raises ValueError: if the routing tables loop
+        """
+
+        level = [None] * len(steps)
+        for start in range(len(steps)):
+            stack = [start]
+            on_stack = set()
+            while stack:
+                router = stack[-1]
+                if level[router] is not None:
+                    stack.pop()
+                    continue
+                routes = steps[router]
+                if routes is None or isinstance(routes, int):
+                    level[router] = 0 if routes is None else 1
+                    stack.pop()
+                    continue
+
+                following = [self.interfaces[in_interface][0] for _, in_interface in routes]
+                pending = [r for r in following if level[r] is None]
+                if pending:
+                    if router in on_stack:
+                        raise ValueError(f"The routing tables loop towards {cidr}, see verify_routing_tables")
+                    on_stack.add(router)
+                    stack.extend(pending)
+                    continue
+
+                on_stack.discard(router)
+                level[router] = 1 + max(level[r] for r in following)
+                stack.pop()
+        return level
+
+    def loads(self, demands):
+        """
+        :param demands: the traffic from each subnetwork (rows) to each other one (columns), by uid, as a NumPy array
+            or nested lists; the diagonal is ignored
+        :return: a LinkLoads
+        """
+
+        np = _numpy()
+        demands = np.asarray(demands, dtype=np.float64)
+        if demands.shape != (self.subnets_count, self.subnets_count):
+            raise ValueError(f"The demand matrix must be {self.subnets_count}x{self.subnets_count}, "
+                             f"got {'x'.join(map(str, demands.shape))}")
+
+        load = np.zeros((self.routers_count, self.subnets_count))
+        sent, received = np.zeros(len(self.interfaces)), np.zeros(len(self.interfaces))
+
+        starts, ends = self.__pairs
+        values = demands[starts, ends]
+        np.add.at(load, (self.__entry[starts, ends], ends), values)
+        np.add.at(received, self.__entry_interface[starts, ends], values)
+        unrouted = demands.sum() - np.trace(demands) - values.sum()
+
+        for start, stop in self.__slices:
+            sources, destinations = self.__source[start:stop], self.__destination[start:stop]
+            flow = load[sources, destinations] * self.__share[start:stop]
+            np.add.at(load, (self.__next[start:stop], destinations), flow)
+            np.add.at(sent, self.__out[start:stop], flow)
+            np.add.at(received, self.__in[start:stop], flow)
+
+        routers, destinations, interfaces = self.__deliveries.T
+        np.add.at(sent, interfaces, load[routers, destinations])
+        routers, destinations = self.__drops.T
+        dropped = unrouted + load[routers, destinations].sum()
+
+        return LinkLoads(self.names, self.interfaces, load.sum(axis=1), sent, received, float(dropped))
+
+
+class LinkLoads:
+    """
+    The traffic of a demand matrix on every router and interface, in the unit of the demands.
+
+    :ivar routers: the traffic going through each router, by router uid
+    :ivar interfaces: Format: [(router_uid, subnet_uid), ...]
+    :ivar sent: the traffic sent by each interface onto its subnetwork, in the order of `interfaces`
+    :ivar received: the traffic received by each interface from its subnetwork, in the order of `interfaces`
+    :ivar subnets: the traffic carried by each subnetwork, by subnet uid
+    :ivar dropped: the traffic that does not reach its destination (no route, or no router to enter)
+    """
+
+    def __init__(self, names, interfaces, routers, sent, received, dropped):
+        np = _numpy()
+        self.names = names
+        self.interfaces = interfaces
+        self.routers = routers
+        self.sent = sent
+        self.received = received
+        self.dropped = dropped
+
+        self.subnets = np.zeros(len(names['subnets']))
+        if interfaces:
+            np.add.at(self.subnets, np.array([subnet for _, subnet in interfaces]), sent)
+
+    def hot_spots(self, count=10, capacities=None):
+        """
+        :param count: the number of interfaces to report
+        :param capacities: the capacity of the interfaces, either one for all of them or by names
+            ({(router_name, subnet_name): capacity, ...}, interfaces left out not being reported)
+        :return: the most loaded interfaces, by utilisation (the highest of both directions over the capacity) if
+            capacities are given, else by load. Format: [{'router', 'subnet', 'sent', 'received', 'utilisation'},
+            ...], utilisation being None without capacities
+        """
+
+        np = _numpy()
+        load = np.maximum(self.sent, self.received)
+        routers, subnets = self.names['routers'], self.names['subnets']
+
+        if capacities is None:
+            score = load
+        elif isinstance(capacities, dict):
+            capacity = np.array([capacities.get((routers[r], subnets[s]), np.nan) for r, s in self.interfaces])
+            score = np.where(np.isnan(capacity), -np.inf, load / capacity)
+        else:
+            score = load / capacities
+
+        order = np.argsort(-score, kind='stable')[:count]
+        return [{'router': routers[self.interfaces[i][0]], 'subnet': subnets[self.interfaces[i][1]],
+                 'sent': float(self.sent[i]), 'received': float(self.received[i]),
+                 'utilisation': None if capacities is None else float(score[i])}
+                for i in order if score[i] != -np.inf]
@@ -0,0 +1,178 @@
+from collections import namedtuple
+
+from rth.core.ipv4 import ip_to_int, int_to_ip, parse_cidr, network_bounds
+
+
+Issue = namedtuple('Issue', ['category', 'location', 'message'])
+
+
+class ValidationReport:
+    """
+    The result of a validation: every issue found in the given data, in the order they were met.
+
+    :ivar issues: Format: [Issue(category, location, message), ...], category being one of 'subnetworks', 'routers'
+        or 'links'
+    """
+
+    def __init__(self):
+        self.issues = []
+
+    def __bool__(self):
+        return bool(self.issues)
+
+    def __len__(self):
+        return len(self.issues)
+
+    def __iter__(self):
+        return iter(self.issues)
+
+    def add(self, category, location, message):
+        self.issues.append(Issue(category, location, message))
+
+    def by_category(self, category):
+        return [issue for issue in self.issues if issue.category == category]
+
+    def __str__(self):
+        return '\n'.join(f"[{i.category}] {i.location}: {i.message}" for i in self.issues)
+
+
+def validate_topology(subnetworks, routers, links, check_master=True, multiple_exits=False):
+    """
+    Validates the data given to Dispatcher.execute in a single pass over each dict and reports every issue at once,
+    instead of stopping on the first one.
+
+    Addresses are parsed as ints; overlaps are found by sorting the ranges, and IP conflicts through a per-subnetwork
+    index of the attributed addresses, automatic attributions included (they are simulated the way NetworkCreator
+    does them, in the same order).
+
+    :param subnetworks: {NAME: CIDR, ...}
+    :param routers: {NAME: HAS_INTERNET_CONNECTION, ...}
+    :param links: {ROUTER_NAME: {SUBNET_NAME: IP, ...}, ...}
+    :param check_master: also report when there is not exactly one router connected to internet
+    :param multiple_exits: accepts several routers connected to internet, each one connected to any number of
+        subnetworks
+    :return: a ValidationReport, empty (falsy) if the data is valid
+    """
+
+    report = ValidationReport()
+
+    # Subnetworks: {name: (start, end)}
+    bounds = {}
+    subnets_names = set()
+    if not isinstance(subnetworks, dict):
+        report.add('subnetworks', '-', "must be a dict of {name: cidr}")
+    else:
+        for name in subnetworks:
+            key = str(name)
+            if key in subnets_names:
+                report.add('subnetworks', key, "name is used more than once")
+                continue
+            subnets_names.add(key)
+            try:
+                ip, length = parse_cidr(subnetworks[name])
+            except ValueError as e:
+                report.add('subnetworks', key, str(e))
+                continue
+            bounds[key] = network_bounds(ip, length)
+
+        # sorted by start, a range overlaps another if it starts before the furthest end met so far
+        furthest = None
+        for key in sorted(bounds, key=lambda k: bounds[k]):
+            start, end = bounds[key]
+            if furthest is not None and start <= bounds[furthest][1]:
+                report.add('subnetworks', key,
+                           f"range {int_to_ip(start)} - {int_to_ip(end)} is overlapping subnetwork '{furthest}' "
+                           f"({int_to_ip(bounds[furthest][0])} - {int_to_ip(bounds[furthest][1])})")
+            if furthest is None or end > bounds[furthest][1]:
+                furthest = key
+
+    # Routers
+    masters = []
+    routers_names = set()
+    if not isinstance(routers, dict):
+        report.add('routers', '-', "must be a dict of {name: has_internet_connection}")
+    else:
+        for name in routers:
+            key = str(name)
+            if key in routers_names:
+                report.add('routers', key, "name is used more than once")
+            routers_names.add(key)
+
+            if routers[name] is not None and not isinstance(routers[name], bool):
+                report.add('routers', key, "internet connection must be True or None")
+            elif routers[name]:
+                masters.append(key)
+
+        if check_master:
+            if not masters:
+                report.add('routers', '-', "no router is connected to internet")
+            elif len(masters) > 1 and not multiple_exits:
+                report.add('routers', '-', f"only one router can be connected to internet, found {len(masters)}: "
+                                           f"{', '.join(masters)}")
+
+    # Links
+    if not isinstance(links, dict):
+        report.add('links', '-', "must be a dict of {router_name: {subnet_name: ip}}")
+        return report
+
+    # {subnet name: {ip: router name}}
+    attributed = {}
+    # {subnet name: next address to try for automatic attributions}
+    next_auto = {}
+
+    for rname in links:
+        rkey = str(rname)
+        connections = links[rname]
+
+        if isinstance(routers, dict) and rkey not in routers_names:
+            report.add('links', rkey, "unknown router")
+        if not isinstance(connections, dict):
+            report.add('links', rkey, "connections must be a dict of {subnet_name: ip}")
+            continue
+        if rkey in masters and len(connections) > 1 and not multiple_exits:
+            report.add('links', rkey, "the router connected to internet cannot be connected to more than one "
+                                      "subnetwork")
+
+        for sname in connections:
+            skey = str(sname)
+            ip = connections[sname]
+            location = f"{rkey} -> {skey}"
+
+            if ip is not None and not isinstance(ip, str):
+                report.add('links', location, "IP must be a string or None")
+                continue
+            if skey not in bounds:
+                # subnetworks with a malformed CIDR have already been reported
+                if skey not in subnets_names:
+                    report.add('links', location, "unknown subnetwork")
+                continue
+
+            start, end = bounds[skey]
+            used = attributed.setdefault(skey, {})
+
+            if ip is None:
+                candidate = next_auto.get(skey, end - 1)
+                while candidate > start and candidate in used:
+                    candidate -= 1
+                if candidate <= start:
+                    report.add('links', location, "no address left in the subnetwork for an automatic attribution")
+                    continue
+                next_auto[skey] = candidate - 1
+                used[candidate] = rkey
+                continue
+
+            try:
+                value = ip_to_int(ip)
+            except ValueError as e:
+                report.add('links', location, str(e))
+                continue
+
+            if not start < value < end:
+                report.add('links', location, f"IP {ip} is not a host address of the subnetwork "
+                                              f"({int_to_ip(start)} - {int_to_ip(end)})")
+            elif value in used:
+                report.add('links', location, f"IP {ip} is already attributed to router '{used[value]}'")
+            else:
+                used[value] = rkey
+
+    return report
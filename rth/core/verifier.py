@@ -0,0 +1,250 @@
+from collections import Counter
+from os import cpu_count
+
+from rth.core.ipv4 import ParsedIPs, parse_cidr, mask_of_length
+from rth.core.validation import ValidationReport
+
+
+# what happens to a packet sent by a router towards a prefix
+FORWARDED, DELIVERED, NO_ROUTE, UNKNOWN_GATEWAY, LEAVES, LOOP = range(6)
+
+BLACK_HOLES_MESSAGES = {
+    NO_ROUTE: "no route",
+    UNKNOWN_GATEWAY: "the gateway is not the interface of any router",
+    LEAVES: "sent out of the network"
+}
+
+
+class ForwardingIndex:
+    """
+    The routing tables of every router, indexed to find the next hop towards a prefix.
+
+    :ivar routes: Format: {router_name: {length: {prefix: (cidr, gateway, interface)}, ...}, ...}, IPs as ints and
+        longest prefixes first
+    :ivar owners: the router of each interface IP. Format: {ip: router_name, ...}
+    :ivar nexthops: the gateways of the multipath routes, the one of the route first. Format:
+        {(router_name, cidr): (gateway, ...), ...}, IPs as ints
+    :ivar ips: the gateways and interfaces already parsed, see rth.core.ipv4.ParsedIPs
+    """
+
+    def __init__(self, routing_tables):
+        self.routers = [str(router) for router in routing_tables]
+        self.routes, self.owners, self.nexthops = {}, {}, {}
+        self.ips = ParsedIPs()
+        # the destination prefixes already parsed, each one being found on every router
+        self.__prefixes = {}
+
+        for router in routing_tables:
+            by_length = {}
+            for cidr, route in routing_tables[router].items():
+                parsed = self.__prefixes.get(cidr)
+                if parsed is None:
+                    parsed = self.__prefixes[cidr] = parse_cidr(cidr)
+                prefix, length = parsed
+                gateway, interface = self.ips[route['gateway']], self.ips[route['interface']]
+                by_length.setdefault(length, {})[prefix & mask_of_length(length)] = (cidr, gateway, interface)
+                if gateway == interface:
+                    self.owners[interface] = str(router)
+                if 'nexthops' in route:
+                    self.nexthops[(str(router), cidr)] = tuple(self.ips[hop['gateway']] for hop in route['nexthops'])
+            self.routes[str(router)] = dict(sorted(by_length.items(), reverse=True))
+
+    def route(self, router, cidr):
+        """
+        :return: the longest route of the router covering the whole destination prefix, None if there is none.
+            Format: (cidr, gateway, interface)
+        """
+
+        parsed = self.__prefixes.get(cidr)
+        if parsed is None:
+            parsed = self.__prefixes[cidr] = parse_cidr(cidr)
+        prefix, length = parsed
+        for route_length, prefixes in self.routes[router].items():
+            if route_length > length:
+                continue
+            route = prefixes.get(prefix & mask_of_length(route_length))
+            if route is not None:
+                return route
+        return None
+
+    def next_hop(self, router, cidr):
+        """
+        :return: (outcome, next router), the next router being None unless the outcome is FORWARDED. Only the
+            gateway of the route is followed, see next_hops for the multipath routes
+        """
+
+        return self.next_hops(router, cidr)[0]
+
+    def next_hops(self, router, cidr):
+        """
+        :return: the (outcome, next router) of every next hop of the route, several for a multipath route. Format:
+            ((outcome, next router or None), ...)
+        """
+
+        route = self.route(router, cidr)
+        if route is None:
+            return (NO_ROUTE, None),
+
+        route_cidr, gateway, interface = route
+        if gateway == interface:
+            # a connected network (or the exit, for the default route)
+            return ((DELIVERED, None) if route_cidr == cidr else (LEAVES, None)),
+        hops = []
+        for gateway in self.nexthops.get((router, route_cidr), (gateway,)):
+            next_router = self.owners.get(gateway)
+            hops.append((UNKNOWN_GATEWAY, None) if next_router is None else (FORWARDED, next_router))
+        return tuple(hops)
+
+    def verify(self, cidr):
+        """
+        Checks the forwarding graph of a destination prefix. Every next hop of the multipath routes is followed, the
+        graph being walked depth first: each router is visited once, and a next hop leading back to a router of the
+        walk is a loop.
+
+        :return: the problems found. Format: [(category, message), ...], category being 'loop' or 'black_hole'
+        """
+
+        loops = []
+        # {router: the black holes its traffic can end in}, {black hole router: outcome}
+        reached, holes = {}, {}
+        nothing = frozenset()
+
+        for start in self.routers:
+            if start in reached:
+                continue
+
+            # [(router, its next routers left to walk, the black holes found from it), ...]
+            walk, on_walk = [], {}
+
+            def enter(router):
+                on_walk[router] = len(walk)
+                found, next_routers = set(), []
+                for outcome, next_router in self.next_hops(router, cidr):
+                    if outcome == FORWARDED:
+                        next_routers.append(next_router)
+                    elif outcome in BLACK_HOLES_MESSAGES:
+                        holes.setdefault(router, outcome)
+                        found.add(router)
+                walk.append((router, iter(next_routers), found))
+
+            enter(start)
+            while walk:
+                router, next_routers, found = walk[-1]
+                for next_router in next_routers:
+                    if next_router in reached:
+                        found.update(reached[next_router])
+                    elif next_router in on_walk:
+                        cycle = [step[0] for step in walk[on_walk[next_router]:]]
+                        loops.append(('loop', "routers " + " > ".join(cycle + [next_router])))
+                    else:
+                        enter(next_router)
+                        break
+                else:
+                    walk.pop()
+                    del on_walk[router]
+                    reached[router] = frozenset(found) if found else nothing
+                    if walk:
+                        walk[-1][2].update(found)
+
+        affected = Counter(hole for ends in reached.values() for hole in ends)
+        black_holes = [('black_hole', f"router {router}: {BLACK_HOLES_MESSAGES[outcome]}, "
+                                      f"{affected[router]} router(s) affected") for router, outcome in holes.items()]
+        return loops + black_holes
+
+
+#
+# Parallel verification
+#
+_index = None
+
+
+def _initialize_worker(routing_tables):
+    global _index
+    _index = ForwardingIndex(routing_tables)
+
+
+def _verify_prefixes(prefixes):
+    return [(cidr, _index.verify(cidr)) for cidr in prefixes]
+
+
+def routing_islands(routing_tables):
+    """
+    Groups the routers linked by their connected prefixes: routers sharing a subnetwork are on the same island. The
+    default route of the exits is not a subnetwork and does not link them.
+
+    :param routing_tables: the formatted raw routing tables
+    :return: the router names of each island. Format: [[router_name, ...], ...]
+    """
+
+    parents = {router: router for router in routing_tables}
+
+    def root(router):
+        while parents[router] != router:
+            parents[router] = router = parents[parents[router]]
+        return router
+
+    connected = {}
+    for router, table in routing_tables.items():
+        for cidr, route in table.items():
+            if route['gateway'] != route['interface'] or parse_cidr(cidr)[1] == 0:
+                continue
+            other = connected.setdefault(cidr, router)
+            parents[root(router)] = root(other)
+
+    islands = {}
+    for router in routing_tables:
+        islands.setdefault(root(router), []).append(router)
+    return list(islands.values())
+
+
+def verify_routing_tables(routing_tables, prefixes=None, workers=1, chunk_size=64, islands=False):
+    """
+    Certifies that the routing tables are globally consistent: for every destination prefix, following the next hops
+    from any router must end on the router connected to it, without loops nor black holes (no route, a gateway that
+    is no router, or an internal prefix sent out of the network).
+
+    :param routing_tables: the formatted raw routing tables
+    :param prefixes: the destination prefixes to check, defaults to every prefix connected to a router (the default
+        route of the exit included: it must lead to it), so that summaries of several prefixes are not checked
+    :param workers: the number of processes verifying prefixes in parallel, 1 runs in this process and None uses
+        every CPU
+    :param chunk_size: the number of prefixes sent to a process at once
+    :param islands: check each island (see routing_islands) apart, only towards its own prefixes: the tables computed
+        in lab mode do not route to the other islands
+    :return: a ValidationReport of 'loop' and 'black_hole' issues, located by prefix; empty (falsy) if the tables
+        are consistent
+    """
+
+    if islands:
+        report = ValidationReport()
+        for island in routing_islands(routing_tables):
+            tables = {router: routing_tables[router] for router in island}
+            own = None
+            if prefixes is not None:
+                connected = {cidr for table in tables.values() for cidr, route in table.items()
+                             if route['gateway'] == route['interface']}
+                own = [cidr for cidr in prefixes if cidr in connected]
+            report.issues += verify_routing_tables(tables, own, workers, chunk_size).issues
+        return report
+
+    if prefixes is None:
+        prefixes = list(dict.fromkeys(cidr for table in routing_tables.values() for cidr, route in table.items()
+                                      if route['gateway'] == route['interface']))
+    chunks = [prefixes[i:i + chunk_size] for i in range(0, len(prefixes), chunk_size)]
+
+    workers = workers or cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        index = ForwardingIndex(routing_tables)
+        results = ([(cidr, index.verify(cidr)) for cidr in chunk] for chunk in chunks)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker, initargs=(routing_tables,))
+        with pool:
+            results = list(pool.map(_verify_prefixes, chunks))
+
+    report = ValidationReport()
+    for chunk in results:
+        for cidr, issues in chunk:
+            for category, message in issues:
+                report.add(category, cidr, message)
+    return report
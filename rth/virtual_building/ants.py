@@ -1,5 +1,6 @@
 from enum import Enum
 from rth.core.errors import UnreachableNetwork
+from rth.core.tracing import *
 from rth.virtual_building.utils import *
 
 
@@ -139,7 +140,7 @@ class AntsDiscovery:
     #
     # DUNDERS
     #
-    def __init__(self, subnets, routers, equitemporality=True, debug=False):
+    def __init__(self, subnets, routers, equitemporality=True, debug=False, tracer=None, multiple_exits=False):
         # given basics
         self.subnets = subnets
         self.routers = routers
@@ -147,8 +148,12 @@ class AntsDiscovery:
         # made-up basics
         self.hops = {}
         self.links, self.subnets_table = self.prepare_matrix_and_links()
-        self.master_router = get_master_router(self.routers)
+        # with several routers connected to internet, the sweep starts from each of them
+        self.master_routers = get_master_routers(self.routers) if multiple_exits else [get_master_router(self.routers)]
+        self.master_router = self.master_routers[0]
         self.debug = debug
+        # debug is kept as a shortcut for a tracer rendering directly in the console
+        self.tracer = tracer if tracer is not None or not debug else ConsoleTracer()
 
     #
     # Executers
@@ -182,7 +187,7 @@ class AntsDiscovery:
         return links, matrix
 
     @staticmethod
-    def ants_discovery_process(discovery_type, links, subnet_start, subnet_end=None, debug=False):
+    def ants_discovery_process(discovery_type, links, subnet_start, subnet_end=None, debug=False, tracer=None):
         """
         This function is the core of the ants process.
         The labels in comments in the code below all refer to this section:
@@ -200,14 +205,21 @@ class AntsDiscovery:
 
         RESULT: we then return what has to be returned
 
+        Every trace event is guarded by a single `tracer is not None` test and carries only small values, so the
+        untraced process does no formatting at all.
+
         :param discovery_type: either 'sweep' for the sweep or anything else for the matrix process
         :param links: the links
         :param subnet_start: the subnet where the discovery will start
         :param subnet_end: the objective subnet we need to find
-        :param debug: If set to true, prints things in the console to help in debugging
+        :param debug: If set to true and no tracer is given, renders the trace in the console
+        :param tracer: a rth.core.tracing.Tracer receiving the process events
         :return: visited, ants_at_objective : one is to ignore, the 2nd for sweep and the 1st for find
         """
 
+        if tracer is None and debug:
+            tracer = ConsoleTracer()
+
         visited = {"subnets": [], "routers": []}
         routers, subnets = links['routers'], links['subnets']
         ants = []
@@ -242,32 +254,24 @@ class AntsDiscovery:
 
         visit('subnets', subnet_start)
 
-        if debug:
-            print("----- PROCESS START -----")
+        if tracer is not None:
+            tracer.emit(PROCESS_START, {'discovery': discovery_type, 'start': subnet_start, 'end': subnet_end})
 
         # PROCESS
         while len(ants):
 
-            if debug:
-                print(f"┌────────────────────────────────────────────")
-                print(f"│ Starting new round: {len(ants)} ants alive")
-                print(f"│ Current visited state: ", visited)
+            if tracer is not None:
+                tracer.emit(ROUND_START, {'ants': len(ants), 'subnets': len(visited['subnets']),
+                                          'routers': len(visited['routers'])})
 
             # Avoid recursion error
             if len(ants) > 100:
                 raise RecursionError("Too many ants (>100). Aborting to avoid further problems.")
 
             # 1. Hop to next subnets
-            if debug:
-                print(f"├──────────────────────────────────────────")
-                print(f"│ Commencing hop to next subnetwork. Activated {activate_ants()} ants "
-                      f"({len(ants)} ants in total).")
-                print(f"│ Current router pos / history:")
-                for ant in ants:
-                    print(f"│  - {id(ant)}: {ant.router} / {ant.get_history()}")
-                print(f"│ Status:")
-            else:
-                activate_ants()
+            activated = activate_ants()
+            if tracer is not None:
+                tracer.emit(HOP_PHASE, {'hop': 'subnet', 'activated': activated, 'ants': len(ants)})
 
             for ant in ants:
                 if not ant.alive:
@@ -275,14 +279,14 @@ class AntsDiscovery:
 
                 subnets_at_pos = [s_ for s_ in routers[ant.router] if not_visited('subnets', s_)]
 
-                if debug:
-                    print(f"│  └ {id(ant)}: {subnets_at_pos}")
+                if tracer is not None:
+                    tracer.emit(ANT_OPTIONS, {'ant': id(ant), 'options': subnets_at_pos})
 
                 # 1.1: One subnet
                 if len(subnets_at_pos) == 0:
                     ant.kill()
-                    if debug:
-                        print(f"│    » DEAD | Already seen everything from this node")
+                    if tracer is not None:
+                        tracer.emit(ANT_DEAD, {'ant': id(ant), 'reason': 'exhausted'})
                 elif len(subnets_at_pos) == 1:
                     check = ant.check_next_move(subnets_at_pos[0])
 
@@ -292,13 +296,13 @@ class AntsDiscovery:
                             # We can proceed to next subnet
                             ant.move_to(subnets_at_pos[0])
                             visit('subnets', subnets_at_pos[0])
-                            if debug:
-                                print(f"│    » ALIVE | Discovered network {subnets_at_pos[0]}")
+                            if tracer is not None:
+                                tracer.emit(ANT_MOVED, {'ant': id(ant), 'hop': 'subnet', 'pos': subnets_at_pos[0]})
                         elif check is False:
                             # we already went there
                             ant.kill()
-                            if debug:
-                                print(f"│    » DEAD | Found a dead end")
+                            if tracer is not None:
+                                tracer.emit(ANT_DEAD, {'ant': id(ant), 'reason': 'dead_end'})
                         else:
                             raise Exception("Unexpected to happen at anytime")
                     else:
@@ -307,21 +311,27 @@ class AntsDiscovery:
                             # We stock ant history and kill the ant
                             ants_at_objective.append(ant.get_history()['routers'])
                             ant.kill()
+                            if tracer is not None:
+                                tracer.emit(ANT_OBJECTIVE, {'ant': id(ant), 'path': ants_at_objective[-1]})
                         elif check[0] is True and check[1] is False:
                             # We can proceed to next subnet
                             ant.move_to(subnets_at_pos[0])
                             visit('subnets', subnets_at_pos[0])
+                            if tracer is not None:
+                                tracer.emit(ANT_MOVED, {'ant': id(ant), 'hop': 'subnet', 'pos': subnets_at_pos[0]})
                         elif not check[0]:
                             # We went here
                             ant.kill()
+                            if tracer is not None:
+                                tracer.emit(ANT_DEAD, {'ant': id(ant), 'reason': 'dead_end'})
                         else:
                             raise Exception("Unexpected to happen at anytime")
 
                 # 1.2: Several subnets, kills and births
                 else:
                     ant.kill()
-                    if debug:
-                        print(f"│    » DEAD | Found multiple possible paths. Giving birth to:")
+                    if tracer is not None:
+                        tracer.emit(ANT_DEAD, {'ant': id(ant), 'reason': 'split'})
 
                     for subnet_ in subnets_at_pos:
                         if not_visited('subnets', subnet_):
@@ -334,25 +344,21 @@ class AntsDiscovery:
                             new_ant.feed_history("routers", ant.get_history())
                             visit('subnets', subnet_)
 
-                            if debug:
-                                print(f"│      » {id(new_ant)} : discovered {subnet_}")
+                            if tracer is not None:
+                                tracer.emit(ANT_BORN, {'ant': id(new_ant), 'parent': id(ant), 'pos': subnet_})
 
                             if isinstance(new_ant, FindAnt) and new_ant.already_on_objective():
                                 ants_at_objective.append(new_ant.get_history()['routers'])
                                 new_ant.kill()
+                                if tracer is not None:
+                                    tracer.emit(ANT_OBJECTIVE, {'ant': id(new_ant), 'path': ants_at_objective[-1]})
 
                             ants.append(new_ant)
 
             # 2. Hop to next routers
-            if debug:
-                print(f"├──────────────────────────────────────────")
-                print(f"│ Commencing hop to next router. Activated {activate_ants()} ants ({len(ants)} ants in total).")
-                print(f"│ Current subnetwork pos / history:")
-                for ant in ants:
-                    print(f"│  - {id(ant)}: {ant.subnet} / {ant.get_history()}")
-                print(f"│ Status:")
-            else:
-                activate_ants()
+            activated = activate_ants()
+            if tracer is not None:
+                tracer.emit(HOP_PHASE, {'hop': 'router', 'activated': activated, 'ants': len(ants)})
 
             for ant in ants:
                 if not ant.alive:
@@ -360,44 +366,47 @@ class AntsDiscovery:
 
                 routers_at_pos = [r for r in subnets[ant.subnet] if not_visited('routers', r)]
 
-                if debug:
-                    print(f"│  └ {id(ant)}: {routers_at_pos}")
+                if tracer is not None:
+                    tracer.emit(ANT_OPTIONS, {'ant': id(ant), 'options': routers_at_pos})
 
                 # 2.1: One router
                 if len(routers_at_pos) == 0:
                     ant.kill()
-                    if debug:
-                        print(f"│    » DEAD | Already seen everything from this node")
+                    if tracer is not None:
+                        tracer.emit(ANT_DEAD, {'ant': id(ant), 'reason': 'exhausted'})
                 elif len(routers_at_pos) == 1:
                     check = ant.check_next_move(routers_at_pos[0])
                     if discovery_type == 'sweep':
                         if check is True:
                             ant.move_to(routers_at_pos[0])
                             visit('routers', routers_at_pos[0])
-
-                            if debug:
-                                print(f"│    » ALIVE | Discovered router {routers_at_pos[0]}")
+                            if tracer is not None:
+                                tracer.emit(ANT_MOVED, {'ant': id(ant), 'hop': 'router', 'pos': routers_at_pos[0]})
                         elif check is False:
                             ant.kill()
-                            if debug:
-                                print(f"│    » DEAD | Found a dead end")
+                            if tracer is not None:
+                                tracer.emit(ANT_DEAD, {'ant': id(ant), 'reason': 'dead_end'})
                         else:
                             raise Exception("Unexpected to happen at anytime")
                     else:
                         if check[0] is True:
                             ant.move_to(routers_at_pos[0])
                             visit('routers', routers_at_pos[0])
+                            if tracer is not None:
+                                tracer.emit(ANT_MOVED, {'ant': id(ant), 'hop': 'router', 'pos': routers_at_pos[0]})
                         elif check[0] is False:
                             ant.kill()
+                            if tracer is not None:
+                                tracer.emit(ANT_DEAD, {'ant': id(ant), 'reason': 'dead_end'})
                         else:
                             raise Exception("Unexpected to happen at anytime")
 
                 # 2.2: Several routers, kills and births
                 else:
                     ant.kill()
+                    if tracer is not None:
+                        tracer.emit(ANT_DEAD, {'ant': id(ant), 'reason': 'split'})
 
-                    if debug:
-                        print(f"│    » DEAD | Found multiple possible paths. Giving birth to:")
                     for router in routers_at_pos:
                         if not_visited('routers', router):
                             if discovery_type == 'sweep':
@@ -407,30 +416,24 @@ class AntsDiscovery:
                             new_ant.feed_history("subnets", ant.get_history())
 
                             visit('routers', router)
-                            if debug:
-                                print(f"│      » {id(new_ant)} : discovered {router}")
+                            if tracer is not None:
+                                tracer.emit(ANT_BORN, {'ant': id(new_ant), 'parent': id(ant), 'pos': router})
 
                             ants.append(new_ant)
 
             # 3. Cleaning up dead bodies
-            if debug:
-                print(f"├──────────────────────────────────────────")
-                print(f"│ Removing dead ants. Total ants: {len(ants)}")
+            if tracer is not None:
+                tracer.emit(CLEANUP, {'ants': len(ants)})
 
-            for i in reversed(range(len(ants))):
-                if debug:
-                    print(f"│   » {id(ants[i])}: {ants[i].state}")
-                if ants[i].dead:
-                    ants.remove(ants[i])
+            ants = [ant for ant in ants if not ant.dead]
 
-            if debug:
-                print(f"│ Ants remaining : {len(ants)}")
-                print(f"└──────────────────────────────────────────")
+            if tracer is not None:
+                tracer.emit(ROUND_END, {'ants': len(ants)})
 
         # RESULT
-        if debug:
-            print("Final state: ", visited)
-            print("----- PROCESS END -----")
+        if tracer is not None:
+            tracer.emit(PROCESS_END, {'subnets': len(visited['subnets']), 'routers': len(visited['routers']),
+                                      'paths': len(ants_at_objective)})
 
         return visited, ants_at_objective
 
@@ -444,31 +447,44 @@ class AntsDiscovery:
         program will continue
         """
 
-        master = self.master_router
-        subnet_start = list(self.routers[master].connected_networks.keys())[0]
-
-        result, _ = self.ants_discovery_process('sweep', self.links, subnet_start, debug=self.debug)
+        reached = set()
+        for master in self.master_routers:
+            subnet_start = list(self.routers[master].connected_networks.keys())[0]
+            if subnet_start in reached:
+                continue
+            result, _ = self.ants_discovery_process('sweep', self.links, subnet_start, tracer=self.tracer)
+            reached.update(result['subnets'])
 
         for subnet in self.subnets:
-            if subnet not in result['subnets']:
+            if subnet not in reached:
                 inst = self.subnets[subnet]['instance']
-                total = len(self.subnets) - len(result['subnets'])
+                total = len(self.subnets) - len(reached)
                 raise UnreachableNetwork(inst.name, inst.cidr, total)
 
-    def calculate_hops(self):
+    def calculate_hops(self, sources=None):
         """
         We calculate the hops for each matrix entry, and either keep the smallest one if there is
         equitemporality, or stock each hop for further analysis and calculus by another function
+
+        :param sources: if given, only the entries starting from one of these subnets are calculated, so the matrix
+            can be processed in several batches
         """
 
+        tracer = self.tracer
+        if sources is not None:
+            sources = set(sources)
+
         for i in range(len(self.subnets_table)):
             matrix = self.subnets_table[i]
             s, e = matrix
 
-            _, at_objective = self.ants_discovery_process('find', self.links, s, e, debug=self.debug)
+            if sources is not None and s not in sources:
+                continue
+
+            _, at_objective = self.ants_discovery_process('find', self.links, s, e, tracer=tracer)
 
-            if self.debug:
-                print(f"matrix {matrix}: ", at_objective)
+            if tracer is not None:
+                tracer.emit(PAIR_DONE, {'pair': (s, e), 'paths': at_objective})
 
             # If equitemporality is set to False, we take all the paths to calculate later
             if self.equitemporality:
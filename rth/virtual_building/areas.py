@@ -0,0 +1,208 @@
+import heapq
+from array import array
+from collections import deque
+
+from rth.virtual_building.graph import NetworkGraph
+from rth.virtual_building.paths import UNREACHABLE
+
+
+def partition_areas(graph, area_size):
+    """
+    Splits the subnetworks in areas of at most `area_size` subnetworks, each one grown breadth-first from its lowest
+    subnetwork uid, so that the subnetworks of an area are connected through its routers.
+
+    :return: the area of each subnetwork. Format: [area, ...], by subnetwork uid
+    """
+
+    if area_size < 1:
+        raise ValueError(f"The area size must be at least 1, got {area_size}")
+
+    areas = [None] * graph.subnets_count
+    area = 0
+    for seed in range(graph.subnets_count):
+        if areas[seed] is not None:
+            continue
+
+        areas[seed] = area
+        size, frontier = 1, deque([seed])
+        while frontier and size < area_size:
+            for router in graph.routers_of(frontier.popleft()):
+                for subnet in graph.subnets_of(router):
+                    if areas[subnet] is None and size < area_size:
+                        areas[subnet] = area
+                        size += 1
+                        frontier.append(subnet)
+        area += 1
+
+    return areas
+
+
+class Area:
+    """
+    The subgraph of one area: its subnetworks, and every router connected to at least one of them.
+
+    :ivar subnets: the global uids of its subnetworks, the local uid being the index
+    :ivar routers: the global uids of its routers, the local uid being the index
+    :ivar local_routers: Format: {global router uid: local router uid, ...}
+    :ivar graph: the NetworkGraph of the area, in local uids
+    """
+
+    def __init__(self, name, graph, subnets, areas):
+        self.name = name
+        self.subnets = list(subnets)
+        self.routers = sorted({router for subnet in self.subnets for router in graph.routers_of(subnet)})
+        self.local_routers = {router: uid for uid, router in enumerate(self.routers)}
+        local_subnets = {subnet: uid for uid, subnet in enumerate(self.subnets)}
+
+        subnet_offsets, subnet_routers = array('I', [0]), array('I')
+        for subnet in self.subnets:
+            subnet_routers.extend(self.local_routers[router] for router in graph.routers_of(subnet))
+            subnet_offsets.append(len(subnet_routers))
+
+        router_offsets, router_subnets = array('I', [0]), array('I')
+        for router in self.routers:
+            router_subnets.extend(local_subnets[s] for s in graph.subnets_of(router) if areas[s] == name)
+            router_offsets.append(len(router_subnets))
+
+        self.graph = NetworkGraph(subnet_offsets, subnet_routers, router_offsets, router_subnets)
+
+    def distances(self, offsets):
+        """
+        Dijkstra over the routers of the area, each router crossed costing 1
+
+        :param offsets: the starting distance of some routers. Format: {local router uid: distance, ...}
+        :return: array of the distance of each router (local uids), UNREACHABLE if it reaches none of the given ones
+        """
+
+        graph = self.graph
+        distances = array('I', [UNREACHABLE]) * graph.routers_count
+        heap = []
+        for router, distance in offsets.items():
+            if distance < distances[router]:
+                distances[router] = distance
+                heap.append((distance, router))
+        heapq.heapify(heap)
+
+        while heap:
+            distance, router = heapq.heappop(heap)
+            if distance > distances[router]:
+                continue
+            for subnet in graph.subnets_of(router):
+                for neighbour in graph.routers_of(subnet):
+                    if distance + 1 < distances[neighbour]:
+                        distances[neighbour] = distance + 1
+                        heapq.heappush(heap, (distance + 1, neighbour))
+
+        return distances
+
+    def is_connected(self):
+        if not self.routers:
+            return False
+        return UNREACHABLE not in self.distances({0: 0})
+
+
+class Hierarchy:
+    """
+    Areas of a network, linked by a backbone.
+
+    The backbone is made of the border routers, which are connected to subnetworks of several areas, and of the
+    routers connected to internet. Two of them are linked when they share an area, the weight being their distance
+    in it (in routers crossed). Paths leaving an area go to one of its backbone routers, through the backbone then
+    into the area of the destination.
+
+    :ivar areas: the Area of each area name. Format: {name: Area, ...}
+    :ivar area_of: the area name of each subnetwork, by subnetwork uid
+    :ivar backbone: Format: {router_uid: {router_uid: weight, ...}, ...}
+    """
+
+    def __init__(self, graph, area_of, masters=()):
+        self.graph = graph
+        self.area_of = list(area_of)
+
+        subnets = {}
+        for subnet, name in enumerate(self.area_of):
+            subnets.setdefault(name, []).append(subnet)
+        self.areas = {name: Area(name, graph, subnets[name], self.area_of) for name in subnets}
+
+        self.router_areas = [[] for _ in range(graph.routers_count)]
+        for name, area in self.areas.items():
+            for router in area.routers:
+                self.router_areas[router].append(name)
+
+        masters = set(masters)
+        self.backbone = {router: {} for router in range(graph.routers_count)
+                         if len(self.router_areas[router]) > 1 or router in masters}
+        for name, area in self.areas.items():
+            nodes = [router for router in area.routers if router in self.backbone]
+            for router in nodes:
+                distances = area.distances({area.local_routers[router]: 0})
+                for other in nodes:
+                    weight = distances[area.local_routers[other]]
+                    if other != router and weight != UNREACHABLE:
+                        links = self.backbone[router]
+                        links[other] = min(links.get(other, UNREACHABLE), weight)
+
+    def backbone_routers(self, name):
+        return [router for router in self.areas[name].routers if router in self.backbone]
+
+    def backbone_distances(self, targets):
+        """
+        :param targets: backbone routers, or their starting distances. Format: [router_uid, ...] or
+            {router_uid: distance, ...}
+        :return: the distance of every backbone router to the nearest target, through the backbone. Format:
+            {router_uid: distance, ...}, unreachable routers being left out
+        """
+
+        distances = dict(targets) if isinstance(targets, dict) else dict.fromkeys(targets, 0)
+        heap = [(distance, router) for router, distance in distances.items()]
+        heapq.heapify(heap)
+        while heap:
+            distance, router = heapq.heappop(heap)
+            if distance > distances[router]:
+                continue
+            for other, weight in self.backbone[router].items():
+                if distance + weight < distances.get(other, UNREACHABLE):
+                    distances[other] = distance + weight
+                    heapq.heappush(heap, (distance + weight, other))
+        return distances
+
+    def distances_to(self, targets, exclude=None):
+        """
+        :param targets: backbone routers, or their starting distances (see backbone_distances)
+        :param exclude: an area whose distances are not needed
+        :return: the distance of every router to the nearest target, going through backbone routers to leave an
+            area. Format: {area name: array of the distance of each router of the area, in local uids, ...}
+        """
+
+        backbone = self.backbone_distances(targets)
+        return {name: area.distances({area.local_routers[router]: distance for router, distance in backbone.items()
+                                      if router in area.local_routers})
+                for name, area in self.areas.items() if name != exclude}
+
+    def distance(self, router, distances):
+        """
+        :param distances: the result of distances_to
+        :return: the distance of the router to the nearest target
+        """
+
+        return min(distances[name][self.areas[name].local_routers[router]] for name in self.router_areas[router])
+
+    def next_hops(self, router, distances):
+        """
+        :param distances: the result of distances_to
+        :return: the neighbours of the router that are one step closer to the targets. Format:
+            [(next_router_uid, via_subnet_uid), ...], empty if it is a target or cannot reach them
+        """
+
+        distance = self.distance(router, distances)
+        if distance == 0 or distance == UNREACHABLE:
+            return []
+
+        hops = []
+        for name in self.router_areas[router]:
+            area = self.areas[name]
+            for subnet in area.graph.subnets_of(area.local_routers[router]):
+                for neighbour in area.graph.routers_of(subnet):
+                    if distances[name][neighbour] == distance - 1:
+                        hops.append((area.routers[neighbour], area.subnets[subnet]))
+        return hops
@@ -0,0 +1,58 @@
+from array import array
+
+
+class DisjointSet:
+    """
+    Union-find over the integers 0..size-1, with union by size and path halving: any sequence of operations runs in
+    near-linear time.
+    """
+
+    def __init__(self, size):
+        self.parents = array('I', range(size))
+        self.sizes = array('I', [1]) * size
+
+    def find(self, item):
+        parents = self.parents
+        while parents[item] != item:
+            parents[item] = parents[parents[item]]
+            item = parents[item]
+        return item
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return first
+        if self.sizes[first] < self.sizes[second]:
+            first, second = second, first
+        self.parents[second] = first
+        self.sizes[first] += self.sizes[second]
+        return first
+
+
+class Components:
+    """
+    The connected components of a NetworkGraph, numbered in the order of their lowest subnetwork uid. A router
+    connected to no subnetwork is a component of its own, numbered after the others.
+
+    :ivar subnets: the component of each subnetwork, by subnetwork uid
+    :ivar routers: the component of each router, by router uid
+    :ivar count: the number of components
+    """
+
+    def __init__(self, graph):
+        sets = DisjointSet(graph.subnets_count + graph.routers_count)
+        for router in range(graph.routers_count):
+            for subnet in graph.subnets_of(router):
+                sets.union(subnet, graph.subnets_count + router)
+
+        labels = {}
+        self.subnets = array('I', (labels.setdefault(sets.find(s), len(labels)) for s in range(graph.subnets_count)))
+        self.routers = array('I', (labels.setdefault(sets.find(graph.subnets_count + r), len(labels))
+                                   for r in range(graph.routers_count)))
+        self.count = len(labels)
+
+    def subnets_of(self, component):
+        return [uid for uid, label in enumerate(self.subnets) if label == component]
+
+    def routers_of(self, component):
+        return [uid for uid, label in enumerate(self.routers) if label == component]
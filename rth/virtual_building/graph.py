@@ -0,0 +1,58 @@
+from array import array
+
+
+class NetworkGraph:
+    """
+    Compressed sparse rows (CSR) adjacency of the virtual network, which is a bipartite graph of subnetworks and
+    routers.
+
+    The routers of subnetwork `s` are `subnet_routers[subnet_offsets[s]:subnet_offsets[s + 1]]`, and the subnetworks
+    of router `r` are `router_subnets[router_offsets[r]:router_offsets[r + 1]]`, both in connection order.
+    Arrays can be array('I') or memoryviews over a snapshot.
+
+    :ivar subnets_count: number of subnetworks
+    :ivar routers_count: number of routers
+    """
+
+    def __init__(self, subnet_offsets, subnet_routers, router_offsets, router_subnets):
+        self.subnet_offsets = subnet_offsets
+        self.subnet_routers = subnet_routers
+        self.router_offsets = router_offsets
+        self.router_subnets = router_subnets
+
+        self.subnets_count = len(subnet_offsets) - 1
+        self.routers_count = len(router_offsets) - 1
+
+    @classmethod
+    def from_network_creator(cls, network_creator):
+        subnet_offsets, subnet_routers = array('I', [0]), array('I')
+        for uid in range(len(network_creator.subnetworks)):
+            subnet_routers.extend(network_creator.subnetworks[uid]['instance'].routers)
+            subnet_offsets.append(len(subnet_routers))
+
+        router_offsets, router_subnets = array('I', [0]), array('I')
+        for uid in range(len(network_creator.routers)):
+            router_subnets.extend(network_creator.routers[uid].connected_networks)
+            router_offsets.append(len(router_subnets))
+
+        return cls(subnet_offsets, subnet_routers, router_offsets, router_subnets)
+
+    #
+    # Getters
+    #
+    def routers_of(self, subnet):
+        return self.subnet_routers[self.subnet_offsets[subnet]:self.subnet_offsets[subnet + 1]]
+
+    def subnets_of(self, router):
+        return self.router_subnets[self.router_offsets[router]:self.router_offsets[router + 1]]
+
+    def links(self):
+        """
+        :return: the links in the format of AntsDiscovery. Format: {'subnets': {uid: [router_uid, ...], ...},
+            'routers': {uid: [subnet_uid, ...], ...}}
+        """
+
+        return {
+            'subnets': {s: list(self.routers_of(s)) for s in range(self.subnets_count)},
+            'routers': {r: list(self.subnets_of(r)) for r in range(self.routers_count)}
+        }
@@ -0,0 +1,191 @@
+import heapq
+from array import array
+
+from rth.virtual_building.paths import UNREACHABLE
+
+
+class KShortestPaths:
+    """
+    The k shortest loopless paths between subnetworks, with Yen's algorithm: each path after the first one is the best
+    deviation of an already found path at one of its nodes (subnetworks and routers), the nodes before the deviation
+    and the continuations of the paths sharing them being forbidden.
+
+    A path crosses each router and each subnetwork at most once and costs its number of routers, like the hops. Equal
+    costs are ordered by the tie-break key of the engine, router by router, then by the uids of the subnetworks: with
+    a tie-break key, the first path crosses the routers of the tree of the destination. Only the tree of each
+    destination is searched by the engine, and it is shared by every start: the deviations are A* searches guided by
+    its distances, which only explore the routers that can still lead to the destination.
+
+    :ivar k: the maximum number of paths of a pair
+    """
+
+    def __init__(self, engine, k):
+        if k < 1:
+            raise ValueError(f"The number of paths must be at least 1, got {k}")
+
+        self.engine = engine
+        self.graph = engine.graph
+        self.k = k
+        self.key = engine.key if engine.key is not None else lambda router, subnet: router
+        # the distances of the subnetworks of the last tree, shared by its starts
+        self.__distances = (None, None)
+
+    #
+    # Internals
+    #
+    def __label(self, nodes):
+        """
+        :param nodes: a path, alternating subnetworks and routers from a subnetwork
+        :return: its cost and its tie-break keys, in the order of the paths
+        """
+
+        keys = tuple(self.key(nodes[i], nodes[i - 1]) for i in range(1, len(nodes), 2))
+        return len(keys), keys
+
+    def __subnet_distances(self, tree):
+        # the trees derived by ReducedPathEngine only have the distances of the routers
+        if tree.subnet_distances is not None:
+            return tree.subnet_distances
+        if self.__distances[0] is tree:
+            return self.__distances[1]
+
+        graph = self.graph
+        distances = array('I', (min((tree.router_distances[r] for r in graph.routers_of(s)), default=UNREACHABLE)
+                                for s in range(graph.subnets_count)))
+        distances[tree.destination] = 0
+        self.__distances = (tree, distances)
+        return distances
+
+    def __first(self, tree, start):
+        """
+        The best path of the tree in the order of the paths, like the candidates: the router with the lowest key at
+        each step, the lowest subnetwork uid between equal keys (a router joined through several subnetworks)
+        """
+
+        routers = [r for r in self.graph.routers_of(start) if tree.reachable(r)]
+        if not routers:
+            return None
+
+        router = min(routers, key=lambda r: (tree.router_distances[r], self.key(r, start)))
+        nodes = [start, router]
+        hops = tree.next_hops(router)
+        while hops:
+            router, subnet = min(hops, key=lambda hop: (self.key(*hop), hop[1]))
+            nodes.extend((subnet, router))
+            hops = tree.next_hops(router)
+        # the last router is connected to the destination
+        nodes.append(tree.destination)
+        return tuple(nodes)
+
+    def __spur(self, tree, subnet_distances, root, banned_subnets, banned_routers, banned_next):
+        """
+        A* search of the best continuation of the root, from its last node to the destination, avoiding the banned
+        nodes and the banned first steps
+
+        :return: the nodes of the continuation, the last one of the root included, or None
+        """
+
+        graph, key, end = self.graph, self.key, tree.destination
+        spur = root[-1]
+        is_router = len(root) % 2 == 0
+
+        def remaining(node, router):
+            if router:
+                return tree.router_distances[node] - 1
+            return subnet_distances[node]
+
+        if remaining(spur, is_router) >= UNREACHABLE - 1:
+            return None
+
+        # (estimated cost, keys, nodes), a router costing 1 when it is entered
+        heap = [(remaining(spur, is_router), (), (spur,))]
+        settled = set()
+        while heap:
+            estimate, keys, nodes = heapq.heappop(heap)
+            node, router = nodes[-1], (len(nodes) % 2 == 1) == is_router
+            if (node, router) in settled:
+                continue
+            settled.add((node, router))
+            if not router and node == end:
+                return nodes
+
+            cost = estimate - remaining(node, router)
+            neighbours = graph.subnets_of(node) if router else graph.routers_of(node)
+            for neighbour in neighbours:
+                banned = banned_subnets if router else banned_routers
+                if neighbour in banned or (neighbour, not router) in settled or \
+                        (len(nodes) == 1 and neighbour in banned_next):
+                    continue
+                distance = remaining(neighbour, not router)
+                if distance >= UNREACHABLE - 1:
+                    continue
+                if router:
+                    heapq.heappush(heap, (cost + distance, keys, nodes + (neighbour,)))
+                else:
+                    heapq.heappush(heap, (cost + 1 + distance, keys + (key(neighbour, node),), nodes + (neighbour,)))
+        return None
+
+    #
+    # Paths
+    #
+    def paths(self, start, end, tree=None):
+        """
+        :param tree: the tree of `end` (see PathEngine.tree), to share it between several starts
+        :return: at most k paths, the shortest first, empty if `end` cannot be reached from `start`. Format:
+            [([router_uid, ...], [subnet_uid, ...]), ...], the i-th subnetwork linking the i-th and (i + 1)-th routers
+        """
+
+        if start == end:
+            return []
+        tree = tree if tree is not None else self.engine.tree(end)
+        subnet_distances = None
+
+        first = self.__first(tree, start)
+        if first is None:
+            return []
+
+        found, candidates, seen = [first], [], {first}
+        while len(found) < self.k:
+            last = found[-1]
+            for i in range(len(last) - 1):
+                root = last[:i + 1]
+                # the nodes of the root are not crossed again, nor the continuations already taken after it
+                banned_subnets, banned_routers = set(root[:-1:2]), set(root[1:-1:2])
+                banned_next = {path[i + 1] for path in found if path[:i + 1] == root}
+
+                if subnet_distances is None:
+                    subnet_distances = self.__subnet_distances(tree)
+                spur = self.__spur(tree, subnet_distances, root, banned_subnets, banned_routers, banned_next)
+                if spur is not None:
+                    nodes = root + spur[1:]
+                    if nodes not in seen:
+                        seen.add(nodes)
+                        heapq.heappush(candidates, (self.__label(nodes), nodes))
+
+            if not candidates:
+                break
+            found.append(heapq.heappop(candidates)[1])
+
+        return [(list(nodes[1::2]), list(nodes[2:-1:2])) for nodes in found]
+
+    def all_paths(self, sources=None, destinations=None):
+        """
+        :param sources: the starting subnetworks, None for all of them
+        :param destinations: the destination subnetworks, None for all of them
+        :return: the paths of every pair that can be reached, in the order of the uids. Format:
+            {(subnet_uid, subnet_uid): [([router_uid, ...], [subnet_uid, ...]), ...], ...}
+        """
+
+        subnets = range(self.graph.subnets_count)
+        starts = subnets if sources is None else sorted(set(sources))
+        ends = subnets if destinations is None else sorted(set(destinations))
+
+        result = {}
+        for end in ends:
+            tree = self.engine.tree(end)
+            for start in starts:
+                paths = self.paths(start, end, tree)
+                if paths:
+                    result[(start, end)] = paths
+
+        return dict(sorted(result.items()))
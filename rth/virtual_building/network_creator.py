@@ -1,9 +1,12 @@
+from bisect import bisect_left
+
 from nettools.core.ipv4_network import IPv4Network
 from nettools.utils.ip_class import FourBytesLiteral
 from nettools.utils.utils import Utils
 from nettools.utils.errors import IPOffNetworkRangeException
 
 from rth.core.errors import *
+from rth.core.ipv4 import ip_to_int, int_to_ip, network_bounds
 
 
 class NetworkCreator:
@@ -25,26 +28,28 @@ class NetworkCreator:
 
     :ivar subnets_names: Used solely for checking if the name already exists, so under list format.
     :ivar routers_names: Used solely for checking if the name already exists, so under list format.
+    :ivar uids: the uid of each name, so names are found without going through the lists above.
+        Format: {'subnet': {name: uid, ...}, 'router': {name: uid, ...}}
 
     :ivar ranges: Networks ranges. Format: [{'start': start, 'end': end}, ...}
     :ivar equitemporality: Boolean variable to set equitemporality to True or False. If set to false,
         a post-calculus will be executed to choose the fastest route instead of the smallest one.
     """
 
-    subnetworks, routers = None, None
-    subnets_names, routers_names = None, None
-    ranges = None
-    equitemporality = None
-
     #
     # DUNDERS
     #
-    def __init__(self, equitemporality=True):
+    def __init__(self, equitemporality=True, multiple_exits=False):
         self.equitemporality = equitemporality
+        # routers connected to internet may then be connected to several subnetworks
+        self.multiple_exits = multiple_exits
 
         self.subnetworks, self.routers = {}, {}
         self.subnets_names, self.routers_names = [], []
+        self.uids = {'subnet': {}, 'router': {}}
         self.ranges = []
+        # (start, end, uid) of each network, as ints and sorted by start
+        self.sorted_ranges = []
 
     #
     # CLASSES
@@ -58,10 +63,6 @@ class NetworkCreator:
         :ivar routers: The dict of the connected routers. Format: {router_uid: router_ip, ...}
         """
 
-        network_range, addresses, mask_length = {}, 0, 0
-        routers = None
-        uid, name = -1, None
-
         def __init__(self, starting_ip, mask, uid, name=None):
 
             inst_ = IPv4Network().init_from_couple(starting_ip, mask)
@@ -76,6 +77,29 @@ class NetworkCreator:
             self.mask_length = inst_.mask_length
             self.addresses = inst_.addresses
 
+        @classmethod
+        def from_bounds(cls, uid, name, starting_ip, mask_length, start, end):
+            """
+            Builds the network from already computed integer bounds, skipping the IPv4 parsing
+            """
+
+            inst_ = cls.__new__(cls)
+
+            inst_.uid = uid
+            inst_.name = name if name else None
+            inst_.cidr = f"{starting_ip}/{mask_length}"
+
+            inst_.routers = {}
+
+            inst_.network_range = {
+                'start': FourBytesLiteral().set_from_string_literal(int_to_ip(start)),
+                'end': FourBytesLiteral().set_from_string_literal(int_to_ip(end))
+            }
+            inst_.mask_length = mask_length
+            inst_.addresses = max(end - start - 1, 0)
+
+            return inst_
+
         def connect(self, router_uid, router_ip):
             self.routers[router_uid] = router_ip
 
@@ -91,23 +115,23 @@ class NetworkCreator:
         This class can stock informations on the subnets it is connected to.
 
         :ivar connected_networks: The dict of the connected subnets. Format: {net_uid: router_ip, ...}
+        :ivar multiple_connections: if a router connected to internet can be connected to several subnets
         """
 
-        uid, name = -1, None
-        connected_networks, internet = None, False
-
-        def __init__(self, uid, internet=False, name=None, delay=None):
+        def __init__(self, uid, internet=False, name=None, delay=None, equitemporality=True,
+                     multiple_connections=False):
             self.uid = uid
             self.name = name if name else None
             self.internet = internet
-            if not NetworkCreator.equitemporality and delay:
+            self.multiple_connections = multiple_connections
+            if equitemporality and delay:
                 raise NoDelayAllowed()
             else:
                 self.delay = delay
             self.connected_networks = {}
 
         def connect(self, subnet_uid, router_ip):
-            if self.internet and self.connected_networks:
+            if self.internet and self.connected_networks and not self.multiple_connections:
                 raise Exception('Master router cannot accept more than one connection')
 
             self.connected_networks[subnet_uid] = router_ip
@@ -117,6 +141,49 @@ class NetworkCreator:
                 if self.connected_networks[i]['uid'] == subnet_uid:
                     del self.connected_networks[i]
 
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        Rebuilds the environment saved in a rth.virtual_building.snapshot.Snapshot.
+        No check is made: the data was checked when the snapshot was saved.
+        """
+
+        inst = cls(snapshot.equitemporality)
+        subnets_names, routers_names = snapshot.subnets_names(), snapshot.routers_names()
+
+        for uid in range(snapshot.subnets_count):
+            ip, mask_length = snapshot.subnet_ips[uid], snapshot.subnet_masks[uid]
+            start, end = network_bounds(ip, mask_length)
+            network = cls.Network.from_bounds(uid, subnets_names[uid], int_to_ip(ip), mask_length, start, end)
+
+            inst.subnetworks[uid] = {'instance': network, 'range': network.network_range}
+            inst.ranges.append(network.network_range)
+            inst.sorted_ranges.append((start, end, uid))
+            inst.subnets_names.append(subnets_names[uid])
+            inst.uids['subnet'].setdefault(subnets_names[uid], uid)
+        inst.sorted_ranges.sort()
+
+        for uid in range(snapshot.routers_count):
+            router = cls.Router(uid, snapshot.router_flags[uid] & 1 == 1, routers_names[uid],
+                                equitemporality=snapshot.equitemporality)
+            inst.routers[uid] = router
+            inst.routers_names.append(routers_names[uid])
+            inst.uids['router'].setdefault(routers_names[uid], uid)
+
+        # connections, in their original order on both sides
+        graph = snapshot.graph
+        for uid in range(snapshot.subnets_count):
+            network = inst.subnetworks[uid]['instance']
+            for position in range(graph.subnet_offsets[uid], graph.subnet_offsets[uid + 1]):
+                network.routers[graph.subnet_routers[position]] = int_to_ip(snapshot.subnet_router_ips[position])
+        for uid in range(snapshot.routers_count):
+            router = inst.routers[uid]
+            for position in range(graph.router_offsets[uid], graph.router_offsets[uid + 1]):
+                router.connected_networks[graph.router_subnets[position]] = \
+                    int_to_ip(snapshot.router_subnet_ips[position])
+
+        return inst
+
     #
     # Getters
     #
@@ -135,15 +202,7 @@ class NetworkCreator:
     # Converters
     #
     def name_to_uid(self, cat, name):
-        list_ = self.subnets_names if cat == 'subnet' else self.routers_names
-        id_ = 0
-
-        for i in range(len(list_)):
-            if list_[i] == str(name):
-                id_ = i
-                break
-
-        return id_
+        return self.uids['subnet' if cat == 'subnet' else 'router'].get(str(name), 0)
 
     def uid_to_name(self, cat, uid):
         name_ = 0
@@ -165,8 +224,7 @@ class NetworkCreator:
     # Testers
     #
     def is_name_existing(self, type_, name):
-        list_ = self.subnets_names if type_ == 'subnet' else self.routers_names
-        return name in list_
+        return name in self.uids['subnet' if type_ == 'subnet' else 'router']
 
     def router_has_internet_connection(self, router_uid):
         return self.routers[router_uid].internet
@@ -196,43 +254,16 @@ class NetworkCreator:
 
         current = self.Network(ip, mask_length, uid, name)
         current_netr = Utils.netr_to_literal(current.network_range)
+        bounds = (ip_to_int(current_netr['start']), ip_to_int(current_netr['end']), uid)
 
-        if self.ranges:
-            for sid in self.subnetworks:
-                subnet = self.subnetworks[sid]['instance']
-                subnetr = Utils.netr_to_literal(subnet.network_range)
-
-                overlap = False
-                if current.mask_length == subnet.mask_length:
-                    # Masks are equal
-                    if current_netr['start'] == subnetr['start']:
-                        overlap = True
-                else:
-                    if current.mask_length < subnet.mask_length:
-                        # New network mask is bigger, check if the existing subnetwork is inside
-                        big = current_netr['start'].split('.')
-                        small = subnetr['start']
-                    else:
-                        # New network is smaller that existing subnetwork, check if it is inside
-                        small = current_netr['start']
-                        big = subnetr['start'].split('.')
-
-                    if current.mask_length <= 8:
-                        if int(big[0]) <= int(small.split('.')[0]):
-                            overlap = True
-                    elif 8 < current.mask_length <= 16:
-                        if small.startswith(f"{big[0]}") and int(big[1]) <= int(small.split('.')[1]):
-                            overlap = True
-                    elif 16 < current.mask_length <= 24:
-                        if small.startswith(f"{big[0]}.{big[1]}") and int(big[2]) <= int(small.split('.')[2]):
-                            overlap = True
-                    elif 24 < current.mask_length <= 32:
-                        if int(big[3]) <= int(small.split('.')[3]):
-                            overlap = True
-
-                if overlap:
-                    raise OverlappingError(current_netr, subnetr)
+        # the stored ranges never overlap each other, so only the neighbours of the new one need to be checked
+        position = bisect_left(self.sorted_ranges, bounds)
+        for neighbour in self.sorted_ranges[max(position - 1, 0):position + 1]:
+            if neighbour[0] <= bounds[1] and bounds[0] <= neighbour[1]:
+                subnetr = Utils.netr_to_literal(self.subnetworks[neighbour[2]]['range'])
+                raise OverlappingError(current_netr, subnetr)
 
+        self.sorted_ranges.insert(position, bounds)
         self.subnetworks[uid] = {'instance': current, 'range': current.network_range}
 
         # adding to network ranges
@@ -240,6 +271,7 @@ class NetworkCreator:
         # also adding name if defined
         if name:
             self.subnets_names.append(name)
+            self.uids['subnet'].setdefault(name, uid)
 
         return uid
 
@@ -261,9 +293,11 @@ class NetworkCreator:
         else:
             name = f"<Untitled Router#ID:{uid}>"
 
-        inst_ = self.Router(uid, internet_connection, name)
+        inst_ = self.Router(uid, internet_connection, name, equitemporality=self.equitemporality,
+                            multiple_connections=self.multiple_exits)
 
         self.routers_names.append(name)
+        self.uids['router'].setdefault(name, uid)
 
         self.routers[uid] = inst_
 
@@ -0,0 +1,281 @@
+from array import array
+from bisect import bisect_right
+
+from rth.core.ipv4 import ip_to_int
+
+
+UNREACHABLE = 0xFFFFFFFF
+# the largest offset of a root (the weight of an exit), leaving room below UNREACHABLE for the distances added to it
+MAX_OFFSET = UNREACHABLE // 2
+
+# the ways to pick one next hop out of equal-cost ones, see tie_break_key
+TIE_BREAKS = ('uid', 'gateway_ip', 'hash')
+
+
+def tie_break_key(policy, network_creator):
+    """
+    Builds the key used to order equal-cost next hops, the smallest one winning:
+        - 'uid': the lowest router uid, which follows the order of the routers in the input
+        - 'gateway_ip': the lowest IP of the next router on the subnetwork leading to it, which follows the order of
+            the input for the IPs assigned automatically
+        - 'hash': a stable hash of the next router name, so the choice spreads over routers while not depending on
+            any input order
+
+    :param policy: one of TIE_BREAKS
+    :return: a function (router_uid, via_subnet_uid) -> sortable key
+    :raises ValueError: for an unknown policy
+    """
+
+    nc = network_creator
+    if policy == 'uid':
+        return lambda router, subnet: router
+    if policy == 'gateway_ip':
+        ips = {}
+        for subnet in range(len(nc.subnetworks)):
+            network = nc.subnetworks[subnet]['instance']
+            for router in network.routers:
+                ips[(router, subnet)] = ip_to_int(str(network.routers[router]))
+        return lambda router, subnet: ips[(router, subnet)]
+    if policy == 'hash':
+        import hashlib
+        # the name follows the hash, so routers whose hashes collide are still strictly ordered
+        hashes = [hashlib.blake2b(str(nc.routers[r].name).encode('utf-8'), digest_size=8).digest() +
+                  str(nc.routers[r].name).encode('utf-8') for r in range(len(nc.routers))]
+        return lambda router, subnet: hashes[router]
+    raise ValueError(f"Unknown tie-break policy '{policy}', expected one of {', '.join(TIE_BREAKS)}")
+
+
+class ShortestPathTree:
+    """
+    The shortest paths of every router towards one destination, computed by a single breadth-first search going
+    backwards from the destination. Distances are counted in routers, like the hops.
+
+    A router's equal-cost next hops are not stored but derived from `entries` in O(degree): they are the routers
+    of its subnetworks that are one step closer to the destination.
+
+    :ivar destination: the destination subnetwork, or None for a tree rooted at routers
+    :ivar router_distances: array of the number of routers to cross from each router, itself included, to reach the
+        destination (0 for the roots of a tree rooted at routers); UNREACHABLE if it cannot
+    :ivar subnet_distances: array of the distance of the closest routers of each subnetwork
+    :ivar entries: the closest routers of each reached subnetwork. Format: {subnet_uid: [router_uid, ...], ...}
+    :ivar key: the tie-break key ordering equal-cost next hops, None to keep the graph order
+    :ivar exits: for a tree rooted at routers, the roots that are not closer to another root: they have no next hop
+    :ivar partial: the search stopped once some subnetworks were reached (see PathEngine.tree): the routers further
+        than them are left UNREACHABLE, while the paths from these subnetworks are complete
+    """
+
+    def __init__(self, graph, router_distances, subnet_distances, entries, destination=None, key=None, exits=(),
+                 partial=False):
+        self.graph = graph
+        self.key = key
+        self.router_distances = router_distances
+        self.subnet_distances = subnet_distances
+        self.entries = entries
+        self.destination = destination
+        self.exits = exits
+        self.partial = partial
+        # the next hops and the routes already derived, each router being crossed by the paths of many starts
+        self.__next_hops = {}
+        self.__routes = {}
+
+    def reachable(self, router):
+        return self.router_distances[router] != UNREACHABLE
+
+    def next_hops(self, router):
+        """
+        :return: every equal-cost next hop of the router, the preferred one first. Format:
+            ((next_router_uid, via_subnet_uid), ...), empty if the router is connected to the destination, is a root,
+            or cannot reach it
+        """
+
+        hops = self.__next_hops.get(router)
+        if hops is not None:
+            return hops
+
+        distance = self.router_distances[router]
+        if distance == UNREACHABLE or distance == 0 or router in self.exits:
+            hops = ()
+        else:
+            hops = []
+            for subnet in self.graph.subnets_of(router):
+                if self.subnet_distances[subnet] == distance - 1 and subnet in self.entries:
+                    hops.extend((next_router, subnet) for next_router in self.entries[subnet])
+            if self.key is not None and len(hops) > 1:
+                hops.sort(key=lambda hop: self.key(*hop))
+            hops = tuple(hops)
+        self.__next_hops[router] = hops
+        return hops
+
+    def route(self, router):
+        """
+        :return: the routers crossed from the router to the destination, itself included, the preferred next hop
+            being taken at each step. Kept for the paths crossing the router again. Format: (router_uid, ...)
+        """
+
+        routes = self.__routes
+        walk = []
+        while router not in routes:
+            walk.append(router)
+            hops = self.next_hops(router)
+            if not hops:
+                routes[router] = (router,)
+                walk.pop()
+                break
+            router = hops[0][0]
+        route = routes[router]
+        for router in reversed(walk):
+            route = routes[router] = (router,) + route
+        return route
+
+    def path(self, start):
+        """
+        :param start: the starting subnetwork
+        :return: the routers crossed from the starting subnetwork to the destination (the preferred next hop being
+            taken at each step), or None if the destination cannot be reached
+        """
+
+        routers = [r for r in self.graph.routers_of(start) if self.reachable(r)]
+        if not routers:
+            return None
+
+        if self.key is None:
+            router = min(routers, key=lambda r: self.router_distances[r])
+        else:
+            router = min(routers, key=lambda r: (self.router_distances[r], self.key(r, start)))
+        return list(self.route(router))
+
+
+class PathEngine:
+    """
+    Breadth-first shortest paths over a NetworkGraph, one tree per destination.
+
+    Each tree costs O(subnetworks + routers + connections), whatever the number of equal-cost paths.
+
+    :ivar key: the tie-break key (see tie_break_key) given to the trees, None to keep the graph order
+    """
+
+    def __init__(self, graph, key=None):
+        self.graph = graph
+        self.key = key
+
+    @classmethod
+    def from_network_creator(cls, network_creator, tie_break=None):
+        """
+        :param tie_break: one of TIE_BREAKS, or None to keep the order of the connections
+        """
+
+        from rth.virtual_building.graph import NetworkGraph
+        key = tie_break_key(tie_break, network_creator) if tie_break is not None else None
+        return cls(NetworkGraph.from_network_creator(network_creator), key)
+
+    def __search(self, destination=None, roots=None, until=None):
+        graph = self.graph
+        router_distances = array('I', [UNREACHABLE]) * graph.routers_count
+        subnet_distances = array('I', [UNREACHABLE]) * graph.subnets_count
+        entries = {}
+        exits = set()
+
+        def reach_subnets(routers, distance):
+            subnets = []
+            for router in routers:
+                for subnet in graph.subnets_of(router):
+                    if subnet_distances[subnet] == UNREACHABLE:
+                        subnet_distances[subnet] = distance
+                        entries[subnet] = [router]
+                        subnets.append(subnet)
+                    elif subnet_distances[subnet] == distance:
+                        entries[subnet].append(router)
+            return subnets
+
+        # the roots join the search when it reaches their offset, unless they have already been reached
+        starts = {}
+        for router, offset in (roots or {}).items():
+            starts.setdefault(offset, []).append(router)
+        offsets = sorted(starts)
+        last = offsets[-1] if offsets else -1
+
+        if destination is not None:
+            subnet_distances[destination] = 0
+            frontier, distance = [destination], 0
+        else:
+            frontier, distance = [], -1
+
+        # the subnetworks whose paths are needed, the search stops at the end of the level reaching the last of them
+        pending = None if until is None else set(until) - {destination}
+        while (frontier or distance < last) and (pending is None or pending):
+            if not frontier:
+                # nothing to expand until the next roots join: the empty levels are skipped
+                distance = offsets[bisect_right(offsets, distance)] - 1
+            distance += 1
+            routers = []
+            for router in starts.get(distance, ()):
+                if router_distances[router] == UNREACHABLE:
+                    router_distances[router] = distance
+                    exits.add(router)
+                    routers.append(router)
+            for subnet in frontier:
+                for router in graph.routers_of(subnet):
+                    if router_distances[router] == UNREACHABLE:
+                        router_distances[router] = distance
+                        routers.append(router)
+            frontier = reach_subnets(routers, distance)
+            if pending is not None:
+                pending.difference_update(frontier)
+
+        return ShortestPathTree(graph, router_distances, subnet_distances, entries, destination, self.key, exits,
+                                partial=bool(frontier) or distance < last)
+
+    def destinations(self):
+        """
+        :return: the subnetworks uids, in the order their trees are best computed
+        """
+
+        return range(self.graph.subnets_count)
+
+    def tree(self, destination, until=None):
+        """
+        :param until: only the paths from these subnetworks are needed: the search stops as soon as they are all
+            reached, so a tree towards a close destination only explores its neighbourhood
+        :return: the ShortestPathTree of every router towards the destination subnetwork
+        """
+
+        return self.__search(destination=destination, until=until)
+
+    def tree_to_routers(self, roots):
+        """
+        Several roots cost a single search. Roots given with an offset are as far as their offset: a root that is
+        closer to another one is not an exit, and gets the next hops towards it.
+
+        :param roots: the root routers, or their offsets (non-negative ints up to MAX_OFFSET). Format:
+            [router_uid, ...] or {router_uid: offset, ...}
+        :return: the ShortestPathTree of every router towards the nearest of the root routers
+        """
+
+        return self.__search(roots=roots if isinstance(roots, dict) else dict.fromkeys(roots, 0))
+
+    def paths(self, sources=None, destinations=None):
+        """
+        The hops of some pairs of subnetworks only, without computing the others: one tree per destination, each one
+        stopping as soon as every source is reached.
+
+        :param sources: the starting subnetworks, None for all of them
+        :param destinations: the destination subnetworks, None for all of them
+        :return: the path of every pair of a source and a different destination that can be reached, in the order
+            of the uids. Format: {(subnet_uid, subnet_uid): [router_uid, ...], ...}
+        """
+
+        until = None if sources is None else set(sources)
+        starts = range(self.graph.subnets_count) if sources is None else sorted(until)
+        wanted = None if destinations is None else set(destinations)
+
+        paths = {}
+        for destination in self.destinations():
+            if wanted is not None and destination not in wanted:
+                continue
+            tree = self.tree(destination, until)
+            for start in starts:
+                path = tree.path(start) if start != destination else None
+                if path is not None:
+                    paths[(start, destination)] = path
+
+        return dict(sorted(paths.items()))
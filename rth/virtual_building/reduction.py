@@ -0,0 +1,225 @@
+from array import array
+from collections import OrderedDict
+
+from rth.virtual_building.paths import PathEngine, ShortestPathTree, UNREACHABLE
+
+
+class StubTree(ShortestPathTree):
+    """
+    The tree of a stub subnetwork, which has a single router: it is the tree rooted at this router, one router
+    further.
+    """
+
+    def __init__(self, graph, anchor, router, destination, key=None):
+        distances = array('I', (d + 1 if d != UNREACHABLE else UNREACHABLE for d in anchor.router_distances))
+        super().__init__(graph, distances, None, None, destination, key)
+        self.anchor = anchor
+        self.router = router
+
+    def next_hops(self, router):
+        if router == self.router:
+            return ()
+        return self.anchor.next_hops(router)
+
+    def route(self, router):
+        # the routes of the anchor end at the router of the stub, and are shared by every tree derived from it
+        return self.anchor.route(router)
+
+
+class ChainTree(ShortestPathTree):
+    """
+    The tree of a subnetwork of a chain, derived from the trees rooted at both ends of the chain: a router out of the
+    chain goes through the end that gives the shortest path, a router of the chain moves along it.
+
+    :ivar positions: the position in the chain of its routers, ends included. Format: {router_uid: position, ...}
+    """
+
+    def __init__(self, graph, chain, index, anchor_a, anchor_b, destination, key=None):
+        routers, subnets = chain
+        length = len(routers) - 1
+        a, b = routers[0], routers[-1]
+        self.chain = chain
+        self.anchors = (anchor_a, anchor_b)
+        self.__routes = {}
+
+        # along the chain, the destination being between the positions `index` and `index + 1`
+        along = [index - position + 1 if position <= index else position - index for position in range(length + 1)]
+        # from an end, going round through the other end
+        around_a = anchor_b.router_distances[a] + along[-1] if anchor_b.reachable(a) else UNREACHABLE
+        around_b = anchor_a.router_distances[b] + along[0] if anchor_a.reachable(b) else UNREACHABLE
+        along[0], along[-1] = min(along[0], around_a), min(along[-1], around_b)
+        if a == b:
+            along[0] = along[-1] = min(along[0], along[-1])
+        for position in range(1, length):
+            along[position] = min(along[position], position + along[0], length - position + along[-1])
+        self.along = along
+
+        distances = array('I', (d if d < UNREACHABLE else UNREACHABLE for d in
+                                map(min, map(along[0].__add__, anchor_a.router_distances),
+                                    map(along[-1].__add__, anchor_b.router_distances))))
+        self.positions = {}
+        for position, router in enumerate(routers):
+            distances[router] = along[position]
+            self.positions.setdefault(router, position)
+        super().__init__(graph, distances, None, None, destination, key)
+
+    def __ends(self, router):
+        """
+        :return: the anchors, with the end of the chain they are rooted at, through which a router out of the chain
+            has a shortest path. Format: [(anchor, end_router), ...]
+        """
+
+        distance, routers = self.router_distances[router], self.chain[0]
+        return [(anchor, end) for anchor, end, along in zip(self.anchors, (routers[0], routers[-1]),
+                                                            (self.along[0], self.along[-1]))
+                if anchor.reachable(router) and anchor.router_distances[router] + along == distance]
+
+    def next_hops(self, router):
+        distance = self.router_distances[router]
+        if distance == UNREACHABLE or distance == 1:
+            return ()
+
+        routers, subnets = self.chain
+        along, length = self.along, len(routers) - 1
+        hops = []
+        position = self.positions.get(router)
+        if position is None:
+            ends = self.__ends(router)
+            if len(ends) == 1:
+                # already in the order of the key
+                return ends[0][0].next_hops(router)
+            for anchor, _ in ends:
+                hops.extend(anchor.next_hops(router))
+        else:
+            # both ends when the chain is a ring (position 0 is then also the position `length`)
+            for p in ((0, length) if routers[0] == routers[-1] and position == 0 else (position,)):
+                if p > 0 and along[p - 1] == distance - 1:
+                    hops.append((routers[p - 1], subnets[p - 1]))
+                if p < length and along[p + 1] == distance - 1:
+                    hops.append((routers[p + 1], subnets[p]))
+            # an end can also leave the chain, going round through the other end
+            if position == 0 or position == length:
+                anchor, end = (self.anchors[1], along[-1]) if position == 0 else (self.anchors[0], along[0])
+                if anchor.reachable(router) and anchor.router_distances[router] + end == distance:
+                    hops.extend(anchor.next_hops(router))
+
+        hops = list(dict.fromkeys(hops))
+        if self.key is not None and len(hops) > 1:
+            hops.sort(key=lambda hop: self.key(*hop))
+        return tuple(hops)
+
+    def route(self, router):
+        # a router strictly closer through one end keeps on going through it: its route follows the one of the anchor,
+        # shared by every tree of the chain, until the end of the chain
+        route = self.__routes.get(router)
+        if route is None:
+            ends = self.__ends(router) if router not in self.positions and self.reachable(router) else ()
+            if len(ends) == 1:
+                anchor, end = ends[0]
+                route = anchor.route(router)[:-1] + super().route(end)
+            else:
+                route = super().route(router)
+            self.__routes[router] = route
+        return route
+
+
+class ReducedPathEngine(PathEngine):
+    """
+    A PathEngine that does not search the trees of stub subnetworks nor of chains.
+
+    A stub subnetwork has a single router, and a chain is a line of routers each connected to two point-to-point
+    subnetworks (two routers each), between two other routers called its ends. The tree of a stub is the tree of its
+    router, and the tree of a subnetwork of a chain comes from the trees of the chain's ends: those are the only trees
+    searched, so the number of searches follows the number of hub routers instead of the number of subnetworks.
+    The trees are the same as the ones of PathEngine.
+
+    The Dispatcher does not use it: the hops and the routing tables need the next hops of every router and the path
+    of every subnetwork in each tree, and deriving them from the anchors costs more than the search it saves (a hub
+    and spoke network of 1,000 subnetworks builds its tables in about 20s with it, 15s with PathEngine).
+
+    :ivar stubs: the router of each stub subnetwork. Format: {subnet_uid: router_uid, ...}
+    :ivar chains: Format: [([end_a, router, ..., end_b], [subnet_uid, ...]), ...], the i-th subnetwork connecting the
+        i-th and (i + 1)-th routers; both ends are the same router for a ring
+    :ivar chain_of: Format: {subnet_uid: (chain index, position in the chain's subnetworks), ...}
+    """
+
+    def __init__(self, graph, key=None, cache_size=64):
+        super().__init__(graph, key)
+        self.cache_size = cache_size
+        self.__anchors = OrderedDict()
+        self.__reduce()
+
+    def __reduce(self):
+        graph = self.graph
+        self.stubs, self.chains, self.chain_of = {}, [], {}
+
+        point_to_point = set()
+        for subnet in range(graph.subnets_count):
+            routers = graph.routers_of(subnet)
+            if len(routers) == 1:
+                self.stubs[subnet] = routers[0]
+            elif len(routers) == 2:
+                point_to_point.add(subnet)
+
+        def in_chain(router):
+            subnets = graph.subnets_of(router)
+            return len(subnets) == 2 and all(s in point_to_point for s in subnets)
+
+        def other(items, item):
+            return items[1] if items[0] == item else items[0]
+
+        def walk(router, subnet, stop):
+            routers, subnets = [], []
+            while in_chain(router) and router != stop:
+                routers.append(router)
+                subnet = other(graph.subnets_of(router), subnet)
+                subnets.append(subnet)
+                router = other(graph.routers_of(subnet), router)
+            return routers, subnets, router
+
+        for subnet in sorted(point_to_point):
+            if subnet in self.chain_of:
+                continue
+            first, second = graph.routers_of(subnet)
+            forward, forward_subnets, b = walk(second, subnet, first)
+            backward, backward_subnets, a = walk(first, subnet, b)
+
+            chain = ([a] + backward[::-1] + forward + [b], backward_subnets[::-1] + [subnet] + forward_subnets)
+            for index, s in enumerate(chain[1]):
+                self.chain_of[s] = (len(self.chains), index)
+            self.chains.append(chain)
+
+    def anchor(self, router):
+        """
+        :return: the tree rooted at the router, kept among the `cache_size` last used ones
+        """
+
+        tree = self.__anchors.get(router)
+        if tree is None:
+            tree = self.__anchors[router] = self.tree_to_routers([router])
+            if len(self.__anchors) > self.cache_size:
+                self.__anchors.popitem(last=False)
+        else:
+            self.__anchors.move_to_end(router)
+        return tree
+
+    def destinations(self):
+        # the subnetworks sharing an anchor follow each other, so it stays in the cache
+        searched = [s for s in range(self.graph.subnets_count) if s not in self.stubs and s not in self.chain_of]
+        stubs = sorted(self.stubs, key=lambda s: self.stubs[s])
+        chains = sorted(range(len(self.chains)), key=lambda c: (self.chains[c][0][0], self.chains[c][0][-1]))
+        return searched + stubs + [s for c in chains for s in self.chains[c][1]]
+
+    def tree(self, destination, until=None):
+        if until is not None:
+            # a search stopping early explores less than the full trees of the anchors
+            return super().tree(destination, until)
+        if destination in self.stubs:
+            router = self.stubs[destination]
+            return StubTree(self.graph, self.anchor(router), router, destination, self.key)
+        if destination in self.chain_of:
+            chain, index = self.chain_of[destination]
+            routers = self.chains[chain][0]
+            return ChainTree(self.graph, self.chains[chain], index, self.anchor(routers[0]),
+                             self.anchor(routers[-1]), destination, self.key)
+        return super().tree(destination)
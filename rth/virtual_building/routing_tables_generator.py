@@ -1,3 +1,5 @@
+from rth.core.errors import UnreachableNetwork
+from rth.virtual_building.paths import PathEngine, UNREACHABLE
 from rth.virtual_building.utils import *
 
 
@@ -6,7 +8,12 @@ class RoutingTablesGenerator:
     #
     # DUNDERS
     #
-    def __init__(self, network_creator_instance, subnets, routers, links, hops, equitemporality=True):
+    def __init__(self, network_creator_instance, subnets, routers, links, hops, equitemporality=True, exits=None):
+        """
+        :param exits: the routers connected to internet and their weights, when there can be several of them: the
+            default route then leads to the nearest one, weights included. Format: {router_uid: weight, ...}
+        """
+
         self.ncinst = network_creator_instance
         # given basics
         self.subnets = subnets
@@ -14,7 +21,13 @@ class RoutingTablesGenerator:
         self.equitemporality = equitemporality
         self.hops = hops
         self.links = links
-        self.master_router = get_master_router(self.routers)
+        if exits is None:
+            self.master_router = get_master_router(self.routers)
+            exits = {self.master_router: 0}
+        else:
+            self.master_router = min(exits)
+        # the next hops of every router towards the master router, from a single tree rooted at every exit
+        self.to_master = PathEngine.from_network_creator(network_creator_instance).tree_to_routers(exits)
 
     #
     # Getters
@@ -91,20 +104,16 @@ class RoutingTablesGenerator:
             }
             subnets_done.append(subnet)
 
-        # getting master route
-
-        # the subnetwork attached to the master router
-        master_attached = self.links['routers'][self.master_router]
-
-        # the subnetwork that leads to the master router
-        to_master_uid = self.build_paths_from_possibilites([self.master_router, router_id],
-                                                           master_attached, subnets_attached)
-
-        # now retrieving the IP of this router that points to the subnetwork leading to the master router
-        to_master_gateway, to_master_uid = self.try_router_connected_to_subnet(subnets_attached, to_master_uid)
-
-        if not to_master_gateway:
-            raise Exception("To-master router should have been found in at least one of the subnetworks")
+        # getting master route, the master router itself being its own gateway
+        if router_id in self.to_master.exits:
+            to_master_uid = next(iter(subnets_attached))
+            to_master_gateway = self.router_ip(self.subnets[to_master_uid]['instance'], router_id)
+        else:
+            hops = self.to_master.next_hops(router_id)
+            if not hops:
+                raise Exception(f"Router {router_id} should have a path to the master router")
+            next_router, to_master_uid = hops[0]
+            to_master_gateway = self.ncinst.get_ip_of_router_on_subnetwork(to_master_uid, next_router)
 
         to_master_interface = self.ncinst.get_ip_of_router_on_subnetwork(to_master_uid, router_id)
 
@@ -140,3 +149,246 @@ class RoutingTablesGenerator:
 
     def calculate_better_path_from_delays(self):
         raise NotImplementedError
+
+
+class TreesRoutingTablesGenerator:
+    """
+    Builds the hops and routing tables from the shortest path trees of a PathEngine instead of the ants' hops: one tree
+    per destination subnetwork gives the route of every router towards it, and the paths of every other subnetwork.
+    The default route comes from the tree rooted at the router connected to internet.
+
+    Equal-cost choices follow the tie-break key of the engine rather than the discovery order; the result is only
+    independent of the order of the input with the 'hash' key (see rth.virtual_building.paths.tie_break_key).
+    """
+
+    def __init__(self, network_creator_instance, engine, require_master=True, exits=None):
+        """
+        :param require_master: if False, a network without router connected to internet is accepted: its routers
+            then get no default route
+        :param exits: the routers connected to internet and their weights, when there can be several of them (see
+            RoutingTablesGenerator). Format: {router_uid: weight, ...}
+        """
+
+        self.ncinst = network_creator_instance
+        self.engine = engine
+        self.subnets = network_creator_instance.subnetworks
+        self.routers = network_creator_instance.routers
+        if exits is not None:
+            self.exits = exits
+        elif require_master or any(router.internet for router in self.routers.values()):
+            self.exits = {get_master_router(self.routers): 0}
+        else:
+            self.exits = {}
+
+        # filled by add_destinations: the paths towards each destination, and the route of each router to it
+        self.__tables, self.__paths, self.__routes = None, {}, [{} for _ in range(len(self.routers))]
+
+    def __route(self, router_id, hops):
+        if not hops:
+            # a router connected to nothing
+            return None
+        next_router, subnet = hops[0]
+        return {
+            'gateway': self.ncinst.get_ip_of_router_on_subnetwork(subnet, next_router),
+            'interface': self.ncinst.get_ip_of_router_on_subnetwork(subnet, router_id)
+        }
+
+    def generate(self):
+        """
+        :return: hops, routing_tables. Format: {(subnet_uid, subnet_uid): [router_uid, ...], ...},
+            [{cidr: {'gateway', 'interface'}, ...} for each router uid], in the order of get_routing_table
+        :raises UnreachableNetwork: if a subnetwork cannot be reached from the router connected to internet
+        """
+
+        self.add_destinations(self.engine.destinations())
+        return self.result()
+
+    def add_destinations(self, destinations):
+        """
+        Builds the trees of some destinations only, so that the generation can be split in batches; `result` gives
+        the hops and routing tables once every destination has been added.
+
+        :param destinations: subnetwork uids
+        :raises UnreachableNetwork: if a subnetwork cannot be reached from the router connected to internet
+        """
+
+        if self.__tables is None:
+            self.__tables = self.__default_routes()
+
+        subnets_count, routers_count = len(self.subnets), len(self.routers)
+        for destination in destinations:
+            tree = self.engine.tree(destination)
+            self.__paths[destination] = [tree.path(start) if start != destination else None
+                                         for start in range(subnets_count)]
+
+            for router in range(routers_count):
+                route = self.__route(router, tree.next_hops(router))
+                if route is not None:
+                    self.__routes[router][destination] = route
+
+    def result(self):
+        """
+        :return: hops, routing_tables, as `generate`, from the destinations added so far
+        """
+
+        if self.__tables is None:
+            self.__tables = self.__default_routes()
+
+        subnets_count, paths, routes = len(self.subnets), self.__paths, self.__routes
+        # back in the order of the uids, whatever the order of the trees
+        hops = {(start, end): paths[end][start] for start in range(subnets_count) for end in range(subnets_count)
+                if start != end and end in paths}
+        for router, table in enumerate(self.__tables):
+            for destination in range(subnets_count):
+                cidr = self.subnets[destination]['instance'].cidr
+                if cidr not in table and destination in routes[router]:
+                    table[cidr] = routes[router][destination]
+
+        return hops, self.__tables
+
+    def __default_routes(self):
+        """
+        :return: the routing tables with the routes of the connected subnetworks and the default route only
+        """
+
+        # the default route, and the connectivity check
+        to_master = self.engine.tree_to_routers(self.exits)
+        unreachable = [s for s in range(len(self.subnets)) if to_master.subnet_distances[s] == UNREACHABLE] \
+            if self.exits else []
+        if unreachable:
+            inst = self.subnets[unreachable[0]]['instance']
+            raise UnreachableNetwork(inst.name, inst.cidr, len(unreachable))
+
+        routing_tables = []
+        for router in range(len(self.routers)):
+            table = {}
+            for subnet in self.routers[router].connected_networks:
+                ip = self.ncinst.get_ip_of_router_on_subnetwork(subnet, router)
+                table[self.subnets[subnet]['instance'].cidr] = {'gateway': ip, 'interface': ip}
+
+            if router in to_master.exits:
+                if table:
+                    table['0.0.0.0/0'] = dict(next(iter(table.values())))
+            else:
+                route = self.__route(router, to_master.next_hops(router))
+                if route is not None:
+                    table['0.0.0.0/0'] = route
+            routing_tables.append(table)
+        return routing_tables
+
+
+class AreasRoutingTablesGenerator:
+    """
+    Builds the routing tables of a network split in areas (see rth.virtual_building.areas.Hierarchy). A router gets a
+    route to every subnetwork of its own areas, from shortest path trees searched inside each area, and a route to the
+    summary of each other area, leading to the backbone: the work and the size of the tables follow the size and the
+    number of the areas rather than the size of the network.
+
+    The hops are only given between subnetworks of a same area.
+    """
+
+    def __init__(self, network_creator_instance, hierarchy, key, exits=None):
+        """
+        :param exits: the routers connected to internet and their weights, when there can be several of them (see
+            RoutingTablesGenerator). Format: {router_uid: weight, ...}
+        """
+
+        self.ncinst = network_creator_instance
+        self.hierarchy = hierarchy
+        self.key = key
+        self.subnets = network_creator_instance.subnetworks
+        self.routers = network_creator_instance.routers
+        self.exits = exits if exits is not None else {get_master_router(self.routers): 0}
+
+    def __route(self, router_id, hops):
+        if not hops:
+            return None
+        next_router, subnet = min(hops, key=lambda hop: self.key(*hop))
+        return {
+            'gateway': self.ncinst.get_ip_of_router_on_subnetwork(subnet, next_router),
+            'interface': self.ncinst.get_ip_of_router_on_subnetwork(subnet, router_id)
+        }
+
+    def __check(self, to_internet):
+        for name, area in self.hierarchy.areas.items():
+            if not area.is_connected():
+                raise ValueError(f"The subnetworks of the area '{name}' are not connected through its routers")
+
+        unreachable = []
+        for name, area in self.hierarchy.areas.items():
+            distances = to_internet[name]
+            unreachable.extend(area.subnets[s] for s in range(len(area.subnets))
+                               if all(distances[r] == UNREACHABLE for r in area.graph.routers_of(s)))
+        if unreachable:
+            unreachable.sort()
+            inst = self.subnets[unreachable[0]]['instance']
+            raise UnreachableNetwork(inst.name, inst.cidr, len(unreachable))
+
+    def generate(self):
+        """
+        :return: hops, routing_tables, in the formats of TreesRoutingTablesGenerator.generate
+        :raises UnreachableNetwork: if a subnetwork cannot be reached from the router connected to internet
+        :raises ValueError: if the subnetworks of an area are not connected through its own routers
+        """
+
+        from rth.core.ipv4 import summarize
+        from rth.virtual_building.paths import PathEngine
+
+        hierarchy = self.hierarchy
+        routers_count = len(self.routers)
+
+        to_internet = hierarchy.distances_to(self.exits)
+        self.__check(to_internet)
+
+        routing_tables = []
+        for router in range(routers_count):
+            table = {}
+            for subnet in self.routers[router].connected_networks:
+                ip = self.ncinst.get_ip_of_router_on_subnetwork(subnet, router)
+                table[self.subnets[subnet]['instance'].cidr] = {'gateway': ip, 'interface': ip}
+
+            if router in self.exits and hierarchy.router_areas[router] and \
+                    hierarchy.distance(router, to_internet) == self.exits[router]:
+                if table:
+                    table['0.0.0.0/0'] = dict(next(iter(table.values())))
+            elif hierarchy.router_areas[router]:
+                route = self.__route(router, hierarchy.next_hops(router, to_internet))
+                if route is not None:
+                    table['0.0.0.0/0'] = route
+            routing_tables.append(table)
+
+        # inside the areas
+        hops, routes = {}, [{} for _ in range(routers_count)]
+        for area in hierarchy.areas.values():
+            engine = PathEngine(area.graph, lambda r, s, area=area: self.key(area.routers[r], area.subnets[s]))
+            for destination in engine.destinations():
+                tree = engine.tree(destination)
+                end = area.subnets[destination]
+                for start in range(len(area.subnets)):
+                    if start != destination:
+                        path = tree.path(start)
+                        hops[(area.subnets[start], end)] = [area.routers[r] for r in path] if path else path
+                for router in range(len(area.routers)):
+                    next_hops = tree.next_hops(router)
+                    if next_hops:
+                        routes[area.routers[router]][end] = self.__route(
+                            area.routers[router], [(area.routers[r], area.subnets[s]) for r, s in next_hops])
+
+        for router in range(routers_count):
+            table = routing_tables[router]
+            for destination in sorted(routes[router]):
+                table.setdefault(self.subnets[destination]['instance'].cidr, routes[router][destination])
+
+        # towards the other areas
+        for name, area in hierarchy.areas.items():
+            summary = summarize(self.subnets[s]['instance'].cidr for s in area.subnets)
+            to_area = hierarchy.distances_to(hierarchy.backbone_routers(name), exclude=name)
+            for router in range(routers_count):
+                if not hierarchy.router_areas[router] or name in hierarchy.router_areas[router]:
+                    continue
+                route = self.__route(router, hierarchy.next_hops(router, to_area))
+                if route is not None:
+                    for cidr in summary:
+                        routing_tables[router][cidr] = dict(route)
+
+        return dict(sorted(hops.items())), routing_tables
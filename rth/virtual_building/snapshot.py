@@ -0,0 +1,210 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from rth.core.errors import SnapshotError
+from rth.core.ipv4 import ip_to_int, parse_cidr
+from rth.virtual_building.graph import NetworkGraph
+
+
+SNAPSHOT_MAGIC = b'RTHSNAP\0'
+SNAPSHOT_VERSION = 1
+
+# magic, version, flags, subnets count, routers count, connections count, sections count
+HEADER = struct.Struct('<8sIIIIII')
+# offset, size in bytes
+SECTION = struct.Struct('<QQ')
+
+# every section, in file order, with its array typecode
+SECTIONS = (
+    ('subnet_ips', 'I'),
+    ('subnet_masks', 'B'),
+    ('router_flags', 'B'),
+    ('subnet_offsets', 'I'),
+    ('subnet_routers', 'I'),
+    ('subnet_router_ips', 'I'),
+    ('router_offsets', 'I'),
+    ('router_subnets', 'I'),
+    ('router_subnet_ips', 'I'),
+    ('names_offsets', 'I'),
+    ('names', 'B'),
+)
+
+FLAG_EQUITEMPORALITY = 1
+ROUTER_INTERNET = 1
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def save_snapshot(network_creator, path):
+    """
+    Saves a built virtual network in the binary snapshot format.
+
+    The file is a header, a table of sections then the sections themselves: little-endian arrays aligned on 8 bytes,
+    so they can be used in place once the file is memory-mapped. The adjacency is stored in CSR form (see
+    NetworkGraph), with the IP of the router on each connection; names are a single UTF-8 blob and its offsets.
+
+    :param network_creator: the NetworkCreator instance, with its routers connected
+    :param path: where to write the snapshot
+    """
+
+    nc = network_creator
+    graph = NetworkGraph.from_network_creator(nc)
+
+    data = {
+        'subnet_ips': array('I'),
+        'subnet_masks': array('B'),
+        'router_flags': array('B'),
+        'subnet_offsets': graph.subnet_offsets,
+        'subnet_routers': graph.subnet_routers,
+        'subnet_router_ips': array('I'),
+        'router_offsets': graph.router_offsets,
+        'router_subnets': graph.router_subnets,
+        'router_subnet_ips': array('I'),
+        'names_offsets': array('I', [0]),
+        'names': bytearray(),
+    }
+
+    def add_name(name):
+        data['names'].extend(str(name).encode('utf-8'))
+        data['names_offsets'].append(len(data['names']))
+
+    for uid in range(len(nc.subnetworks)):
+        network = nc.subnetworks[uid]['instance']
+        ip, mask_length = parse_cidr(network.cidr)
+        data['subnet_ips'].append(ip)
+        data['subnet_masks'].append(mask_length)
+        data['subnet_router_ips'].extend(ip_to_int(str(network.routers[r])) for r in network.routers)
+        add_name(network.name)
+
+    for uid in range(len(nc.routers)):
+        router = nc.routers[uid]
+        data['router_flags'].append(ROUTER_INTERNET if router.internet else 0)
+        data['router_subnet_ips'].extend(ip_to_int(str(router.connected_networks[s]))
+                                         for s in router.connected_networks)
+        add_name(router.name)
+
+    # layout
+    offset = _align(HEADER.size + SECTION.size * len(SECTIONS))
+    layout = []
+    for name, _ in SECTIONS:
+        size = len(data[name]) * data[name].itemsize if isinstance(data[name], array) else len(data[name])
+        layout.append((offset, size))
+        offset = _align(offset + size)
+
+    flags = FLAG_EQUITEMPORALITY if nc.equitemporality else 0
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, graph.subnets_count, graph.routers_count,
+                            len(graph.subnet_routers), len(SECTIONS)))
+        for section in layout:
+            f.write(SECTION.pack(*section))
+
+        for (name, _), (offset, size) in zip(SECTIONS, layout):
+            f.write(b'\0' * (offset - f.tell()))
+            values = data[name]
+            if isinstance(values, array) and sys.byteorder != 'little':
+                values = array(values.typecode, values)
+                values.byteswap()
+            f.write(bytes(values))
+
+
+class Snapshot:
+    """
+    A memory-mapped snapshot of a virtual network, as written by save_snapshot.
+
+    Arrays are memoryviews over the mapped file (copies on big-endian machines), so loading is independent of the
+    network size until the data is actually read.
+
+    :ivar graph: the NetworkGraph of the snapshot
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__file = open(path, 'rb')
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.__file.close()
+            raise SnapshotError(path, "empty file")
+        self.__view = memoryview(self.__map)
+        self.__arrays = []
+
+        try:
+            self.__read()
+        except Exception:
+            self.close()
+            raise
+
+    def __read(self):
+        view = self.__view
+        if len(view) < HEADER.size:
+            raise SnapshotError(self.path, "truncated header")
+
+        magic, version, flags, subnets, routers, connections, sections = HEADER.unpack_from(view, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError(self.path, "not a RTH snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(self.path, f"unsupported version {version} (expected {SNAPSHOT_VERSION})")
+        if sections != len(SECTIONS):
+            raise SnapshotError(self.path, "unexpected sections count")
+        if len(view) < HEADER.size + sections * SECTION.size:
+            raise SnapshotError(self.path, "truncated sections table")
+
+        self.version = version
+        self.equitemporality = bool(flags & FLAG_EQUITEMPORALITY)
+        self.subnets_count, self.routers_count, self.connections_count = subnets, routers, connections
+
+        for i, (name, typecode) in enumerate(SECTIONS):
+            offset, size = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+            if offset + size > len(view):
+                raise SnapshotError(self.path, f"truncated section {name}")
+            section = view[offset:offset + size].cast(typecode)
+            if typecode != 'B' and sys.byteorder != 'little':
+                section = array(typecode, section.tobytes())
+                section.byteswap()
+            self.__arrays.append(section)
+            setattr(self, name, section)
+
+        self.graph = NetworkGraph(self.subnet_offsets, self.subnet_routers, self.router_offsets,
+                                  self.router_subnets)
+
+    #
+    # Getters
+    #
+    def name(self, index):
+        return bytes(self.names[self.names_offsets[index]:self.names_offsets[index + 1]]).decode('utf-8')
+
+    def subnets_names(self):
+        return [self.name(uid) for uid in range(self.subnets_count)]
+
+    def routers_names(self):
+        return [self.name(self.subnets_count + uid) for uid in range(self.routers_count)]
+
+    def to_network_creator(self):
+        from rth.virtual_building.network_creator import NetworkCreator
+        return NetworkCreator.from_snapshot(self)
+
+    #
+    # Closing
+    #
+    def close(self):
+        for section in self.__arrays:
+            if isinstance(section, memoryview):
+                section.release()
+        self.__arrays = []
+        self.__view.release()
+        self.__map.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def load_snapshot(path):
+    return Snapshot(path)
@@ -24,6 +24,20 @@ def get_master_router(routers):
         return masters[0]
 
 
+def get_master_routers(routers):
+    """
+        Get every router connected to internet, when several exits are allowed
+
+        :return masters: the uids of the master routers
+        :raises MasterRouterError: when no master is found
+        """
+
+    masters = [i for i in range(len(routers)) if routers[i].internet is True]
+    if not masters:
+        raise MasterRouterError(True)
+    return masters
+
+
 def smaller_of_list(given):
     if len(given) == 1:
         # only one path found
@@ -92,6 +92,13 @@ def setup_package():
         install_requires=[
             "nettools",
         ],
+        extras_require={
+            'yaml': ["pyyaml"],
+            'traffic': ["numpy"],
+        },
+        entry_points={
+            'console_scripts': ['rth = rth.cli:main'],
+        },
 
         classifiers=[
             'Development Status :: 5 - Production/Stable',
@@ -1,6 +1,7 @@
 import unittest
 from rth.core.dispatcher import Dispatcher
 from rth.core.errors import UnreachableNetwork, MasterRouterError
+from rth.core.tracing import RingBufferTracer, PROCESS_START, PROCESS_END, PAIR_DONE
 import unittest.mock as m
 
 
@@ -315,6 +316,46 @@ class MyTestCase(unittest.TestCase):
         e, a = self.prepare_run("multiple_paths")
         self.assertEqual(e, a)
 
+    #
+    # Tracing
+    #
+    def test_ring_buffer_tracer(self):
+        test = self.networks["multiple_choices_routers"]
+        tracer = RingBufferTracer()
+        inst = Dispatcher(tracer=tracer)
+        inst.execute(test['subnets'], test['routers'], test['links'])
+        self.assertEqual(test["expected_hops"], inst.hops)
+
+        events = [event for event, _ in tracer.events]
+        # one sweep plus one process per ordered pair of subnetworks
+        self.assertEqual(1 + 6, events.count(PROCESS_START))
+        self.assertEqual(events.count(PROCESS_START), events.count(PROCESS_END))
+        self.assertEqual(6, events.count(PAIR_DONE))
+
+        pairs = {data['pair']: data['paths'] for event, data in tracer.events if event == PAIR_DONE}
+        self.assertEqual([[1, 2]], pairs[(1, 2)])
+
+    def test_ring_buffer_tracer_capacity(self):
+        test = self.networks["basic"]
+        tracer = RingBufferTracer(capacity=10)
+        inst = Dispatcher(tracer=tracer)
+        inst.execute(test['subnets'], test['routers'], test['links'])
+
+        self.assertEqual(10, len(tracer.events))
+        self.assertEqual(PAIR_DONE, tracer.events[-1][0])
+
+    def test_tracer_replay(self):
+        test = self.networks["multiple_choices_networks"]
+        tracer = RingBufferTracer()
+        inst = Dispatcher(tracer=tracer)
+        inst.execute(test['subnets'], test['routers'], test['links'])
+
+        lines = []
+        tracer.replay(lines.append)
+        self.assertEqual("----- PROCESS START -----", lines[0])
+        self.assertIn("----- PROCESS END -----", lines)
+        self.assertTrue(any(line.startswith("│ Starting new round") for line in lines))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from rth.core.dispatcher import Dispatcher
+from rth.core.ipv4 import summarize
+from rth.core.verifier import verify_routing_tables
+
+
+class AreasTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.subnetworks = {
+            'A1': "10.0.0.0/24",
+            'A2': "10.0.1.0/24",
+            'B1': "10.1.0.0/24",
+            'B2': "10.1.1.0/24"
+        }
+        self.routers = {"ra": None, "border": None, "rb": None, "gw": True}
+        self.links = {
+            "ra": {'A1': "10.0.0.1", 'A2': "10.0.1.1"},
+            "border": {'A2': "10.0.1.2", 'B1': "10.1.0.2"},
+            "rb": {'B1': "10.1.0.1", 'B2': "10.1.1.1"},
+            "gw": {'B2': "10.1.1.254"}
+        }
+
+        self.inst = Dispatcher(areas={'A1': 'a', 'A2': 'a', 'B1': 'b', 'B2': 'b'})
+        self.inst.execute(self.subnetworks, self.routers, self.links)
+        self.tables = self.inst.formatted_raw_routing_tables
+
+    def test_summary_routes(self):
+        self.assertEqual({
+            "10.0.0.0/24": {'gateway': "10.0.0.1", 'interface': "10.0.0.1"},
+            "10.0.1.0/24": {'gateway': "10.0.1.1", 'interface': "10.0.1.1"},
+            "0.0.0.0/0": {'gateway': "10.0.1.2", 'interface': "10.0.1.1"},
+            "10.1.0.0/23": {'gateway': "10.0.1.2", 'interface': "10.0.1.1"}
+        }, self.tables["ra"])
+        self.assertEqual({'gateway': "10.1.1.1", 'interface': "10.1.1.254"}, self.tables["gw"]["10.0.0.0/23"])
+
+        # the border router is in both areas
+        self.assertEqual(["10.0.1.0/24", "10.1.0.0/24", "0.0.0.0/0", "10.0.0.0/24", "10.1.1.0/24"],
+                         list(self.tables["border"]))
+        self.assertFalse(verify_routing_tables(self.tables))
+
+    def test_hops_inside_areas(self):
+        self.assertEqual({(0, 1), (1, 0), (2, 3), (3, 2)}, set(self.inst.hops))
+
+    def test_automatic_areas(self):
+        subnetworks = {f"S{i}": f"10.0.{i}.0/24" for i in range(12)}
+        links = {f"R{i}": {f"S{i}": None, f"S{i + 1}": None} for i in range(11)}
+        links["R11"] = {"S0": None, "S6": None}
+        links["gw"] = {"S11": None}
+        routers = {name: name == "gw" or None for name in links}
+
+        inst = Dispatcher(areas=4)
+        inst.execute(subnetworks, routers, links)
+        self.assertFalse(verify_routing_tables(inst.formatted_raw_routing_tables))
+        self.assertLess(len(inst.formatted_raw_routing_tables["R3"]), len(subnetworks))
+
+    def test_errors(self):
+        self.assertRaises(ValueError, lambda: Dispatcher(areas=4, ecmp=True))
+        self.assertRaises(ValueError, lambda: Dispatcher(areas={'A1': 'a'}).execute(self.subnetworks, self.routers,
+                                                                                    self.links))
+        # A1 and B1 are not linked by a router of their area
+        self.assertRaises(ValueError, lambda: Dispatcher(areas={'A1': 'a', 'A2': 'b', 'B1': 'a', 'B2': 'b'})
+                          .execute(self.subnetworks, self.routers, self.links))
+
+    def test_summarize(self):
+        self.assertEqual(["10.0.0.0/22"], summarize(["10.0.1.0/24", "10.0.0.0/24", "10.0.2.0/25", "10.0.2.128/25",
+                                                     "10.0.3.0/24"]))
+        self.assertEqual(["10.0.1.0/24", "10.0.2.0/24"], summarize(["10.0.1.0/24", "10.0.2.0/24"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
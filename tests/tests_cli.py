@@ -0,0 +1,111 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock as m
+from rth.cli import main
+from rth.core.inputs import iter_json_documents, iter_topologies
+
+
+class CliTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.topology = {
+            'name': "basic",
+            'subnetworks': {
+                'A': "10.0.0.0/24",
+                'B': "192.168.0.0/24",
+                'C': "192.168.1.0/24",
+                'D': "10.0.1.0/24"
+            },
+            'routers': {"1": None, "2": None, "3": None, "4": True},
+            'links': {
+                "1": {'B': None, 'C': None},
+                "2": {"A": None, "B": None},
+                "4": {'D': None},
+                "3": {"C": None, "D": None}
+            }
+        }
+        self.expected_router_4 = {
+            "10.0.1.0/24": {'gateway': '10.0.1.254', 'interface': '10.0.1.254'},
+            "0.0.0.0/0": {'gateway': '10.0.1.254', 'interface': '10.0.1.254'},
+            "192.168.0.0/24": {'gateway': '10.0.1.253', 'interface': '10.0.1.254'},
+            "192.168.1.0/24": {'gateway': '10.0.1.253', 'interface': '10.0.1.254'},
+            "10.0.0.0/24": {'gateway': '10.0.1.253', 'interface': '10.0.1.254'}
+        }
+
+    #
+    # Inputs
+    #
+    def test_json_documents_streaming(self):
+        text = json.dumps([self.topology, self.topology]) + "\n" + json.dumps(self.topology)
+        documents = list(iter_json_documents(io.StringIO(text), chunk_size=7))
+        self.assertEqual([self.topology] * 3, documents)
+
+    def test_large_json_document(self):
+        # a document far larger than the chunks is read in a logarithmic number of reads, not one per chunk
+        large = dict(self.topology, subnetworks={f"S{i}": f"10.{i // 256}.{i % 256}.0/24" for i in range(20000)})
+        text = json.dumps(large) + "\n" + json.dumps(self.topology) + " 12"
+        stream = io.StringIO(text)
+        reads = []
+        read = stream.read
+        stream.read = lambda size: reads.append(size) or read(size)
+
+        documents = list(iter_json_documents(stream, chunk_size=64))
+        self.assertEqual([large, self.topology, 12], documents)
+        self.assertLess(len(reads), 30)
+
+    def test_json_lines(self):
+        text = "\n".join(json.dumps(dict(self.topology, name=f"n{i}")) for i in range(5)) + "\n"
+        names = [t['name'] for t in iter_topologies(io.StringIO(text))]
+        self.assertEqual([f"n{i}" for i in range(5)], names)
+
+    def test_malformed_json(self):
+        self.assertRaises(ValueError, lambda: list(iter_json_documents(io.StringIO('[{"a": 1}, {"b"'))))
+
+    #
+    # Commands
+    #
+    def test_run_to_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "input.jsonl")
+            with open(source, mode="w") as f:
+                f.write(json.dumps(self.topology) + "\n")
+                f.write(json.dumps(dict(self.topology, name="other")) + "\n")
+
+            output = os.path.join(directory, "out")
+            self.assertEqual(0, main(['run', source, '--format', 'json', '--output-dir', output]))
+            self.assertEqual(["basic.json", "other.json"], sorted(os.listdir(output)))
+
+            with open(os.path.join(output, "basic.json")) as f:
+                document = json.load(f)
+            self.assertEqual("basic", document['name'])
+            self.assertEqual(self.expected_router_4, document['routing_tables']['4'])
+            self.assertIn({'from': 'A', 'to': 'D', 'routers': ['2', '1', '3']}, document['hops'])
+
+    def test_run_from_stdin(self):
+        broken = dict(self.topology, name="broken", links={"4": {'D': None}})
+        stdin = io.StringIO(json.dumps(self.topology) + json.dumps(broken))
+
+        with m.patch("sys.stdin", stdin), m.patch("sys.stdout", new_callable=io.StringIO) as stdout, \
+                m.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            self.assertEqual(1, main(['run', '--format', 'jsonl']))
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(1, len(lines))
+        self.assertEqual(self.expected_router_4, json.loads(lines[0])['routing_tables']['4'])
+        self.assertIn("topology broken", stderr.getvalue())
+
+    def test_validate(self):
+        wrong = dict(self.topology, subnetworks=dict(self.topology['subnetworks'], E="10.0.0.0/16"))
+        stdin = io.StringIO(json.dumps([self.topology, wrong]))
+
+        with m.patch("sys.stdin", stdin), m.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            self.assertEqual(1, main(['validate', '-']))
+
+        self.assertEqual(2, len(stderr.getvalue().splitlines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
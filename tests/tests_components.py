@@ -0,0 +1,94 @@
+import io
+import json
+import unittest
+import unittest.mock as m
+from array import array
+from rth.cli import main
+from rth.core.dispatcher import Dispatcher
+from rth.core.errors import UnreachableNetwork
+from rth.core.verifier import routing_islands, verify_routing_tables
+from rth.virtual_building.components import Components, DisjointSet
+from rth.virtual_building.graph import NetworkGraph
+
+
+class ComponentsTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # two islands: A - B with the internet, and C - D without
+        self.subnetworks = {
+            'A': "10.0.0.0/24",
+            'B': "10.0.1.0/24",
+            'C': "192.168.0.0/24",
+            'D': "192.168.1.0/24"
+        }
+        self.routers = {"1": None, "2": True, "3": None, "4": None}
+        self.links = {
+            "1": {'A': None, 'B': None},
+            "2": {'B': None},
+            "3": {'C': None, 'D': None},
+            "4": {'D': None}
+        }
+
+    def test_disjoint_set(self):
+        sets = DisjointSet(5)
+        sets.union(0, 1)
+        sets.union(3, 4)
+        sets.union(1, 4)
+        self.assertEqual(sets.find(0), sets.find(3))
+        self.assertNotEqual(sets.find(0), sets.find(2))
+
+    def test_components(self):
+        # subnets 0 - router 0 - subnet 1, subnet 2 - router 1, and router 2 connected to nothing
+        graph = NetworkGraph(array('I', [0, 1, 2, 3]), array('I', [0, 0, 1]), array('I', [0, 2, 3, 3]),
+                             array('I', [0, 1, 2]))
+        components = Components(graph)
+        self.assertEqual([0, 0, 1], list(components.subnets))
+        self.assertEqual([0, 1, 2], list(components.routers))
+        self.assertEqual(3, components.count)
+        self.assertEqual([2], components.subnets_of(1))
+
+    def test_every_unreachable_subnetwork(self):
+        inst = Dispatcher()
+        with self.assertRaises(UnreachableNetwork) as context:
+            inst.execute(self.subnetworks, self.routers, self.links)
+        self.assertEqual([('C', "192.168.0.0/24"), ('D', "192.168.1.0/24")], context.exception.unreachable)
+        self.assertIn("('C', 'D')", str(context.exception))
+
+    def test_lab(self):
+        for workers in (1, 2):
+            inst = Dispatcher(lab=True, workers=workers)
+            inst.execute(self.subnetworks, self.routers, self.links)
+            tables = inst.formatted_raw_routing_tables
+
+            self.assertEqual({(0, 1): [0], (1, 0): [0], (2, 3): [2], (3, 2): [2]}, inst.hops)
+            self.assertIn("0.0.0.0/0", tables["1"])
+            self.assertEqual({"192.168.1.0/24", "192.168.0.0/24"}, set(tables["4"]))
+            self.assertEqual({'gateway': "192.168.1.254", 'interface': "192.168.1.253"}, tables["4"]["192.168.0.0/24"])
+
+    def test_lab_verify(self):
+        inst = Dispatcher(lab=True)
+        inst.execute(self.subnetworks, self.routers, self.links)
+        tables = inst.formatted_raw_routing_tables
+
+        self.assertEqual([["1", "2"], ["3", "4"]], sorted(sorted(island) for island in routing_islands(tables)))
+        self.assertFalse(inst.verify_routing_tables())
+        # checked as a whole, the other island is a black hole
+        self.assertTrue(verify_routing_tables(tables).by_category('black_hole'))
+
+        topology = {'subnetworks': self.subnetworks, 'routers': self.routers, 'links': self.links}
+        with m.patch("sys.stdin", io.StringIO(json.dumps(topology))), \
+                m.patch("sys.stdout", new_callable=io.StringIO) as stdout, \
+                m.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            self.assertEqual(0, main(['run', '--lab', '--verify', '--format', 'jsonl']))
+        self.assertEqual("", stderr.getvalue())
+        self.assertEqual(1, len(stdout.getvalue().splitlines()))
+
+    def test_lab_single_island(self):
+        inst = Dispatcher(lab=True)
+        inst.execute({'C': "192.168.0.0/24", 'D': "192.168.1.0/24"}, {"3": None, "4": None},
+                     {"3": {'C': None, 'D': None}, "4": {'D': None}})
+        self.assertNotIn("0.0.0.0/0", inst.formatted_raw_routing_tables["3"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock as m
+from rth.cli import main
+from rth.core.diff import RoutingResult, RouteChange, diff_results, table_digest
+from rth.core.dispatcher import Dispatcher
+
+
+class DiffTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.topology = {
+            'subnetworks': {
+                'A': "10.0.0.0/24",
+                'B': "192.168.0.0/24",
+                'C': "192.168.1.0/24",
+                'D': "10.0.1.0/24"
+            },
+            'routers': {"1": None, "2": None, "3": None, "4": True},
+            'links': {
+                "1": {'B': None, 'C': None},
+                "2": {"A": None, "B": None},
+                "4": {'D': None},
+                "3": {"C": None, "D": None}
+            }
+        }
+        # a shortcut between A and D
+        self.edited = dict(self.topology, routers=dict(self.topology['routers'], **{"5": None}),
+                           links=dict(self.topology['links'], **{"5": {'A': None, 'D': None}}))
+
+    @staticmethod
+    def result(topology):
+        inst = Dispatcher()
+        inst.execute(topology['subnetworks'], topology['routers'], topology['links'])
+        return RoutingResult.from_dispatcher(inst)
+
+    def test_digest(self):
+        table = {"10.0.0.0/24": {'gateway': '10.0.0.254', 'interface': '10.0.0.254'},
+                 "0.0.0.0/0": {'gateway': '10.0.0.253', 'interface': '10.0.0.254'}}
+        self.assertEqual(table_digest(table), table_digest(dict(reversed(table.items()))))
+        self.assertNotEqual(table_digest(table), table_digest(dict(table, **{"0.0.0.0/0": table["10.0.0.0/24"]})))
+
+        # only the equal-cost next hops change
+        def with_hops(hops):
+            return dict(table, **{"0.0.0.0/0": dict(table["0.0.0.0/0"], nexthops=hops)})
+
+        hops = [{'gateway': '10.0.0.253', 'interface': '10.0.0.254'},
+                {'gateway': '10.0.0.3', 'interface': '10.0.0.254'}]
+        ecmp, moved = with_hops(hops), with_hops([hops[0], dict(hops[1], gateway='10.0.0.9')])
+        self.assertNotEqual(table_digest(table), table_digest(ecmp))
+        self.assertNotEqual(table_digest(ecmp), table_digest(moved))
+        self.assertEqual(table_digest(ecmp), table_digest(with_hops(hops[::-1])))
+
+        difference = diff_results(RoutingResult({"1": ecmp}), RoutingResult({"1": moved}))
+        self.assertEqual(["0.0.0.0/0"], [change.cidr for change in difference.changed["1"]])
+        text = io.StringIO()
+        difference.write_text(text)
+        self.assertIn("10.0.0.253 via 10.0.0.254 | 10.0.0.3 via 10.0.0.254 -> 10.0.0.253 via 10.0.0.254 | 10.0.0.9 via",
+                      text.getvalue())
+
+    def test_identical(self):
+        difference = diff_results(self.result(self.topology), self.result(self.topology))
+        self.assertFalse(difference)
+        self.assertEqual(4, difference.unchanged)
+
+    def test_changes(self):
+        difference = diff_results(self.result(self.topology), self.result(self.edited))
+
+        self.assertEqual(["5"], difference.added_routers)
+        self.assertEqual([], difference.removed_routers)
+        self.assertEqual(["2", "3", "4"], sorted(difference.changed))
+        self.assertEqual(1, difference.unchanged)
+
+        self.assertIn(RouteChange("10.0.1.0/24", {'gateway': '192.168.0.254', 'interface': '192.168.0.253'},
+                                  {'gateway': '10.0.0.253', 'interface': '10.0.0.254'}), difference.changed["2"])
+        self.assertEqual({("A", "D"): (["2", "1", "3"], ["5"])}, difference.explain("2", "10.0.1.0/24"))
+
+    def test_digests(self):
+        table = {"10.0.0.0/24": {'gateway': '10.0.0.254', 'interface': '10.0.0.254'}}
+        edited = {"10.0.0.0/24": {'gateway': '10.0.0.253', 'interface': '10.0.0.254'}}
+
+        # the digests are trusted when both sides have them
+        difference = diff_results(RoutingResult({"1": table}, digests={"1": "same"}),
+                                  RoutingResult({"1": edited}, digests={"1": "same"}))
+        self.assertFalse(difference)
+        difference = diff_results(RoutingResult({"1": table}, digests={"1": "old"}),
+                                  RoutingResult({"1": table}, digests={"1": "new"}))
+        self.assertFalse(difference.changed)
+
+        # otherwise the tables are compared
+        difference = diff_results(RoutingResult({"1": table}, digests={"1": "same"}), RoutingResult({"1": edited}))
+        self.assertEqual(["1"], list(difference.changed))
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as directory:
+            before, after = os.path.join(directory, "before.json"), os.path.join(directory, "after.json")
+            with open(before, mode="w") as f:
+                json.dump(self.topology, f)
+            with open(after, mode="w") as f:
+                json.dump(self.edited, f)
+
+            # a result document compared to a topology
+            document = os.path.join(directory, "out")
+            self.assertEqual(0, main(['run', before, '--format', 'json', '--output-dir', document]))
+            document = os.path.join(document, "0.json")
+            with open(document) as f:
+                digests = json.load(f)['digests']
+            self.assertEqual(table_digest(self.result(self.topology).tables["1"]), digests["1"])
+
+            with m.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                self.assertEqual(0, main(['diff', document, document]))
+            self.assertEqual("4 router(s) unchanged\n", stdout.getvalue())
+
+            with m.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                self.assertEqual(0, main(['diff', document, before]))
+            self.assertEqual("4 router(s) unchanged\n", stdout.getvalue())
+
+            with m.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                self.assertEqual(1, main(['diff', document, after, '--format', 'json']))
+            changes = json.loads(stdout.getvalue())
+            self.assertEqual(["5"], list(changes['added_routers']))
+            self.assertIn({'from': 'A', 'to': 'D', 'before': ['2', '1', '3'], 'after': ['5']},
+                          changes['changed_routers']["2"][1]['paths'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import argparse
+import time
+import unittest
+from rth.cli import exit_weight
+from rth.core.dispatcher import Dispatcher
+from rth.core.errors import MasterRouterError
+from rth.core.validation import validate_topology
+
+
+class ExitsTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # a line of subnetworks S0 to S5 linked by the routers 1 to 5, with an exit at each end
+        self.subnetworks = {f"S{i}": f"10.0.{i}.0/24" for i in range(6)}
+        self.routers = {"X1": True, "X2": True}
+        self.routers.update({str(i): None for i in range(1, 6)})
+        self.links = {"X1": {'S0': "10.0.0.254"}, "X2": {'S5': "10.0.5.254"}}
+        self.links.update({str(i): {f"S{i - 1}": f"10.0.{i - 1}.2", f"S{i}": f"10.0.{i}.1"} for i in range(1, 6)})
+
+        self.modes = ({}, {'tie_break': 'uid'}, {'areas': 2}, {'lab': True})
+
+    def default_routes(self, **options):
+        inst = Dispatcher(**options)
+        inst.execute(self.subnetworks, self.routers, self.links)
+        self.assertFalse(inst.verify_routing_tables())
+        return {name: table['0.0.0.0/0'] for name, table in inst.formatted_raw_routing_tables.items()}
+
+    def test_nearest_exit(self):
+        for mode in self.modes:
+            routes = self.default_routes(exits=True, **mode)
+            self.assertEqual({'gateway': '10.0.0.254', 'interface': '10.0.0.2'}, routes["1"], msg=mode)
+            self.assertEqual({'gateway': '10.0.1.1', 'interface': '10.0.1.2'}, routes["2"], msg=mode)
+            self.assertEqual({'gateway': '10.0.4.2', 'interface': '10.0.4.1'}, routes["4"], msg=mode)
+            self.assertEqual({'gateway': '10.0.5.254', 'interface': '10.0.5.1'}, routes["5"], msg=mode)
+            # both exits are their own gateway
+            self.assertEqual({'gateway': '10.0.0.254', 'interface': '10.0.0.254'}, routes["X1"], msg=mode)
+            self.assertEqual({'gateway': '10.0.5.254', 'interface': '10.0.5.254'}, routes["X2"], msg=mode)
+
+    def test_weights(self):
+        for mode in self.modes:
+            # router 4 is now closer to X1, weights included
+            routes = self.default_routes(exits={"X2": 3}, **mode)
+            self.assertEqual({'gateway': '10.0.3.1', 'interface': '10.0.3.2'}, routes["4"], msg=mode)
+            self.assertEqual({'gateway': '10.0.5.254', 'interface': '10.0.5.1'}, routes["5"], msg=mode)
+
+            # X2 itself sends its traffic to X1
+            routes = self.default_routes(exits={"X2": 10}, **mode)
+            self.assertEqual({'gateway': '10.0.5.1', 'interface': '10.0.5.254'}, routes["X2"], msg=mode)
+
+    def test_huge_weights(self):
+        # the levels between the other exit and the heavy one are skipped, not walked through one by one
+        start = time.perf_counter()
+        for weight in (10 ** 7, 2 ** 31 - 1):
+            for mode in ({}, {'tie_break': 'uid'}):
+                routes = self.default_routes(exits={"X2": weight}, **mode)
+                self.assertEqual({'gateway': '10.0.5.1', 'interface': '10.0.5.254'}, routes["X2"], msg=mode)
+        self.assertLess(time.perf_counter() - start, 1)
+
+        self.assertRaises(ValueError, lambda: Dispatcher(exits={"X2": 2 ** 31}))
+        self.assertRaises(ValueError, lambda: Dispatcher(exits={"X2": 2 ** 32}))
+        self.assertEqual(("X2", 2 ** 31 - 1), exit_weight(f"X2={2 ** 31 - 1}"))
+        self.assertRaises(argparse.ArgumentTypeError, lambda: exit_weight(f"X2={2 ** 32}"))
+
+    def test_ecmp(self):
+        inst = Dispatcher(ecmp=True, exits=True)
+        inst.execute(self.subnetworks, self.routers, self.links)
+        # router 3 is as close to both exits
+        names = inst.names()['routers']
+        self.assertEqual(["2", "4"], sorted(names[r] for r in inst.next_hops[(names.index("3"), None)]))
+        self.assertEqual(2, len(inst.formatted_raw_routing_tables["3"]["0.0.0.0/0"]['nexthops']))
+
+    def test_single_exit_by_default(self):
+        self.assertRaises(MasterRouterError, lambda: Dispatcher().execute(self.subnetworks, self.routers, self.links))
+        self.assertTrue(validate_topology(self.subnetworks, self.routers, self.links))
+        self.assertFalse(validate_topology(self.subnetworks, self.routers, self.links, multiple_exits=True))
+
+    def test_invalid_weights(self):
+        self.assertRaises(ValueError, lambda: Dispatcher(exits={"X1": -1}))
+        self.assertRaises(ValueError, lambda: Dispatcher(exits=["X1"]))
+        for weights in ({"1": 2}, {"X3": 2}):
+            inst = Dispatcher(tie_break='uid', exits=weights)
+            self.assertRaises(ValueError, lambda: inst.execute(self.subnetworks, self.routers, self.links))
+
+
+if __name__ == '__main__':
+    unittest.main()
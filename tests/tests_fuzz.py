@@ -0,0 +1,268 @@
+import json
+import os
+import random
+import unittest
+from rth.core.dispatcher import Dispatcher
+from rth.core.errors import InvalidTopology, MasterRouterError, UnreachableNetwork
+from rth.virtual_building.network_creator import NetworkCreator
+from rth.virtual_building.paths import PathEngine
+from rth.virtual_building.reduction import ReducedPathEngine
+from rth.virtual_building.routing_tables_generator import TreesRoutingTablesGenerator
+
+
+# RTH_FUZZ_SEEDS=500 python -m unittest tests.tests_fuzz runs a longer session
+SEEDS = int(os.environ.get('RTH_FUZZ_SEEDS', 50))
+FIRST_SEED = int(os.environ.get('RTH_FUZZ_SEED', 0))
+
+
+#
+# Topologies
+#
+def random_topology(seed, max_subnets=10):
+    """
+    A random valid topology: a spanning tree of the subnetworks through routers, extra links making loops and
+    multi-access subnetworks, and one router connected to internet.
+    """
+
+    rng = random.Random(seed)
+    count = rng.randint(2, max_subnets)
+    subnetworks = {f"S{i}": f"10.{i // 256}.{i % 256}.0/24" for i in range(count)}
+
+    links = {}
+    for i in range(1, count):
+        existing = [name for name, subnets in links.items() if f"S{rng.randrange(i)}" in subnets]
+        if existing and rng.random() < 0.3:
+            links[rng.choice(existing)][f"S{i}"] = None
+        else:
+            links[f"R{len(links)}"] = {f"S{rng.randrange(i)}": None, f"S{i}": None}
+    for _ in range(rng.randint(0, count)):
+        links.setdefault(f"R{rng.randrange(len(links) + 2)}", {})[f"S{rng.randrange(count)}"] = None
+    links["X"] = {f"S{rng.randrange(count)}": None}
+
+    routers = {name: True if name == "X" else None for name in links}
+    return {'subnetworks': subnetworks, 'routers': routers, 'links': links}
+
+
+def shuffled(topology, seed):
+    rng = random.Random(seed)
+
+    def shuffle(d):
+        items = list(d.items())
+        rng.shuffle(items)
+        return dict(items)
+
+    return {'subnetworks': shuffle(topology['subnetworks']), 'routers': shuffle(topology['routers']),
+            'links': {router: shuffle(subnets) for router, subnets in shuffle(topology['links']).items()}}
+
+
+def network_creator(topology):
+    nc = NetworkCreator()
+    for name, cidr in topology['subnetworks'].items():
+        ip, mask = cidr.split('/')
+        nc.create_network(ip, int(mask), name)
+    for name, internet in topology['routers'].items():
+        nc.create_router(internet_connection=bool(internet), name=name)
+    for name, subnets in topology['links'].items():
+        nc.connect_router_to_networks(name, subnets)
+    return nc
+
+
+def execute(topology, **options):
+    inst = Dispatcher(**options)
+    inst.execute(topology['subnetworks'], topology['routers'], topology['links'])
+    return inst
+
+
+def named_hops(inst):
+    names = inst.names()
+    return {(names['subnets'][s], names['subnets'][e]): [names['routers'][r] for r in path]
+            for (s, e), path in inst.hops.items()}
+
+
+def named_routes(inst):
+    """
+    :return: the routing tables with the name of the next router instead of the gateway, the addresses of the
+        interfaces depending on the order of the input. Format: {router_name: {cidr: router_name or None}}
+    """
+
+    tables = inst.formatted_raw_routing_tables
+    owners = {route['interface']: router for router, table in tables.items() for route in table.values()}
+    return {router: {cidr: owners.get(route['gateway']) if route['gateway'] != route['interface'] else None
+                     for cidr, route in table.items()}
+            for router, table in tables.items()}
+
+
+#
+# Differential checks
+#
+def differences(topology):
+    """
+    Runs every engine on the topology and compares what they have to agree on.
+
+    :return: the differences found, empty if the engines agree or if the topology is not a valid one
+    """
+
+    try:
+        reference = execute(topology, tie_break='uid')
+    except (InvalidTopology, MasterRouterError, UnreachableNetwork):
+        return []
+
+    found, runs = [], {'uid': reference}
+    for name, options in (('ants', {}), ('areas', {'areas': 3}), ('lab', {'lab': True})):
+        try:
+            runs[name] = execute(topology, **options)
+        except Exception as e:
+            found.append(f"{name}: {e!r}")
+    if found:
+        return found
+
+    for name, inst in runs.items():
+        for issue in inst.verify_routing_tables():
+            found.append(f"{name}: [{issue.category}] {issue.location}: {issue.message}")
+
+    # the ants and the path engine find shortest paths, even if not the same ones
+    lengths = {name: {pair: len(path) for pair, path in runs[name].hops.items()} for name in ('ants', 'uid')}
+    if lengths['ants'] != lengths['uid']:
+        found.append("ants and path engine hops have different lengths")
+    destinations = {name: {router: sorted(table) for router, table in runs[name].formatted_raw_routing_tables.items()}
+                    for name in ('ants', 'uid')}
+    if destinations['ants'] != destinations['uid']:
+        found.append("ants and path engine routing tables cover different prefixes")
+
+    # a single island runs the same engine
+    if runs['lab'].hops != reference.hops or \
+            runs['lab'].formatted_raw_routing_tables != reference.formatted_raw_routing_tables:
+        found.append("lab mode and path engine differ")
+
+    # the reduced engine derives the trees the plain engine searches
+    nc = network_creator(topology)
+    results = [TreesRoutingTablesGenerator(nc, engine_class.from_network_creator(nc, 'uid')).generate()
+               for engine_class in (PathEngine, ReducedPathEngine)]
+    if results[0] != results[1]:
+        found.append("reduced and plain path engines differ")
+
+    # the queries of some pairs only give the same paths as the whole execution
+    names = sorted(topology['subnetworks'])
+    sources, destinations = names[::2], names[len(names) // 2:]
+    expected = {pair: path for pair, path in named_hops(reference).items()
+                if pair[0] in sources and pair[1] in destinations}
+    queried = Dispatcher(tie_break='uid').query_hops(topology['subnetworks'], topology['routers'], topology['links'],
+                                                     sources=sources, destinations=destinations)
+    if queried != expected:
+        found.append("query_hops differs from the hops of the execution")
+    uids = {name: uid for uid, name in enumerate(reference.names()['subnets'])}
+    source_uids, destination_uids = [uids[name] for name in sources], [uids[name] for name in destinations]
+    paths = PathEngine.from_network_creator(nc, 'uid').paths(source_uids, destination_uids)
+    if paths != {(s, e): path for (s, e), path in reference.hops.items()
+                 if s in source_uids and e in destination_uids}:
+        found.append("PathEngine.paths differs from the hops of the execution")
+
+    # every equal-cost next hop leads to the destination
+    for name, options in (('ecmp', {'tie_break': 'uid', 'ecmp': True}), ('ants ecmp', {'ecmp': True})):
+        for issue in execute(topology, **options).verify_routing_tables():
+            found.append(f"{name}: [{issue.category}] {issue.location}: {issue.message}")
+
+    # with a second exit, every default route still leads out of the network
+    second_exit = dict(topology, routers=dict(topology['routers'], Y=True),
+                       links=dict(topology['links'], Y={names[-1]: None}))
+    for exits in (True, {'X': 2}):
+        try:
+            inst = execute(second_exit, tie_break='uid', exits=exits)
+        except Exception as e:
+            found.append(f"exits {exits}: {e!r}")
+            continue
+        for issue in inst.verify_routing_tables():
+            found.append(f"exits {exits}: [{issue.category}] {issue.location}: {issue.message}")
+
+    # the first of the k shortest paths is the hop
+    k_paths = execute(topology, tie_break='uid', k_paths=2).shortest_paths
+    if {pair: paths[0][0] for pair, paths in k_paths.items()} != reference.hops:
+        found.append("the first k shortest path differs from the hop")
+
+    # the 'hash' policy does not depend on the order of the input
+    hashed = [execute(t, tie_break='hash') for t in (topology, shuffled(topology, 1))]
+    if named_hops(hashed[0]) != named_hops(hashed[1]) or named_routes(hashed[0]) != named_routes(hashed[1]):
+        found.append("'hash' tie-break depends on the input order")
+
+    return found
+
+
+def shrink(topology, failing):
+    """
+    Greedily removes routers, subnetworks and links while the topology keeps failing
+
+    :param failing: a function telling if a topology still fails
+    :return: the smallest failing topology found
+    """
+
+    def topology_of(subnetworks, links):
+        # the routers left without a link are removed with it
+        links = {router: subnets for router, subnets in links.items() if subnets}
+        return {'subnetworks': subnetworks, 'links': links,
+                'routers': {router: internet for router, internet in topology['routers'].items() if router in links}}
+
+    def without_router(t, router):
+        return topology_of(dict(t['subnetworks']), {r: dict(s) for r, s in t['links'].items() if r != router})
+
+    def without_subnet(t, subnet):
+        links = {r: {s: ip for s, ip in subnets.items() if s != subnet} for r, subnets in t['links'].items()}
+        return topology_of({s: cidr for s, cidr in t['subnetworks'].items() if s != subnet}, links)
+
+    def without_link(t, router, subnet):
+        links = {r: dict(s) for r, s in t['links'].items()}
+        del links[router][subnet]
+        return topology_of(dict(t['subnetworks']), links)
+
+    def candidates(t):
+        for router in t['routers']:
+            yield without_router(t, router)
+        for subnet in t['subnetworks']:
+            yield without_subnet(t, subnet)
+        for router, subnets in t['links'].items():
+            for subnet in subnets:
+                yield without_link(t, router, subnet)
+
+    shrinking = True
+    while shrinking:
+        shrinking = False
+        for candidate in candidates(topology):
+            if failing(candidate):
+                topology, shrinking = candidate, True
+                break
+    return topology
+
+
+class FuzzTests(unittest.TestCase):
+
+    def test_engines_agree(self):
+        for seed in range(FIRST_SEED, FIRST_SEED + SEEDS):
+            topology = random_topology(seed)
+            found = differences(topology)
+            if found:
+                smallest = shrink(topology, lambda t: bool(differences(t)))
+                self.fail(f"seed {seed}: {'; '.join(found)}\nsmallest failing topology: {json.dumps(smallest)}")
+
+    def test_parallel_batch(self):
+        topologies = [random_topology(seed) for seed in range(FIRST_SEED, FIRST_SEED + 8)]
+        options = {'tie_break': 'uid', 'ecmp': True}
+        sequential = sorted(Dispatcher.execute_many(topologies, workers=1, **options), key=lambda r: r['index'])
+        parallel = sorted(Dispatcher.execute_many(topologies, workers=2, **options), key=lambda r: r['index'])
+        for before, after in zip(sequential, parallel):
+            self.assertIsNone(before['error'])
+            self.assertEqual((before['hops'], before['routing_tables']), (after['hops'], after['routing_tables']))
+
+    def test_shrink(self):
+        # fails as long as a router links S1 and S2
+        def failing(t):
+            return any('S1' in subnets and 'S2' in subnets for subnets in t['links'].values())
+
+        topology = random_topology(3)
+        topology['links']["R0"].update({'S1': None, 'S2': None})
+        smallest = shrink(topology, failing)
+        self.assertEqual({'S1', 'S2'}, set(smallest['subnetworks']))
+        self.assertEqual([{'S1': None, 'S2': None}], list(smallest['links'].values()))
+        self.assertEqual(set(smallest['links']), set(smallest['routers']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import unittest
+
+
+# the subsystems that short-lived programs only importing the dispatcher or the command line do not pay for
+HEAVY_MODULES = ('nettools', 'asyncio', 'concurrent.futures', 'json', 'hashlib', 'numpy',
+                 'rth.virtual_building.network_creator', 'rth.virtual_building.ants',
+                 'rth.virtual_building.routing_tables_generator', 'rth.virtual_building.snapshot')
+
+
+def import_times(statement):
+    """
+    Runs the statement in a fresh interpreter with `python -X importtime`
+
+    :return: the cumulative import time of every module imported, in microseconds. Format: {module: time, ...}
+    """
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, *sys.path]))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=root, env=env,
+                            capture_output=True, text=True, check=True)
+
+    times = {}
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if line.startswith('import time:') and len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+class ImportTimeTests(unittest.TestCase):
+
+    def assertLight(self, statement):
+        times = import_times(statement)
+        self.assertTrue(times)
+        heavy = [module for module in times
+                 if any(module == name or module.startswith(name + '.') for name in HEAVY_MODULES)]
+        self.assertEqual([], heavy, f"`{statement}` imports {', '.join(heavy)}")
+
+    def test_dispatcher(self):
+        self.assertLight("import rth.core.dispatcher; rth.core.dispatcher.Dispatcher(tie_break='hash')")
+
+    def test_cli(self):
+        self.assertLight("import rth.cli")
+
+    def test_validation(self):
+        self.assertLight("from rth.core.validation import validate_topology")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 from rth.virtual_building.network_creator import NetworkCreator
-from rth.core.errors import NameAlreadyExists, OverlappingError
+from rth.core.errors import NameAlreadyExists, OverlappingError, NoDelayAllowed
 from nettools.utils.ip_class import FourBytesLiteral
 from nettools.utils.utils import Utils
 
@@ -126,6 +126,19 @@ class NetworkCreatorTests(unittest.TestCase):
         self.assertRaises(OverlappingError, lambda: i.create_network('10.5.0.0', 16))
         self.assertRaises(OverlappingError, lambda: i.create_network('10.5.1.0', 19))
 
+    def test_network_no_overlap(self):
+        i = NetworkCreator()
+        i.create_network('10.5.1.0', 24)
+
+        # different masks, but distinct ranges
+        i.create_network('192.168.0.0', 28)
+        i.create_network('10.5.2.0', 30)
+        i.create_network('10.5.0.0', 24)
+        i.create_network('10.4.0.0', 16)
+
+        self.assertEqual(5, len(i.subnetworks))
+        self.assertRaises(OverlappingError, lambda: i.create_network('10.4.255.252', 30))
+
     def test_master_router_multiple_connections(self):
         i = NetworkCreator()
         network_1_id = i.create_network("10.5.1.0", 24)
@@ -144,6 +157,16 @@ class NetworkCreatorTests(unittest.TestCase):
                           )
                           )
 
+    def test_router_delay_uses_instance_equitemporality(self):
+        # the equitemporality of the Router comes from its own NetworkCreator, never from the class
+        self.assertRaises(NoDelayAllowed, lambda: NetworkCreator.Router(0, delay=5))
+
+        router = NetworkCreator.Router(0, delay=5, equitemporality=False)
+        self.assertEqual(5, router.delay)
+
+        self.assertFalse(hasattr(NetworkCreator, 'equitemporality'))
+        self.assertFalse(NetworkCreator(equitemporality=False).equitemporality)
+
 
 if __name__ == '__main__':
     unittest.main()
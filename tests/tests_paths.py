@@ -0,0 +1,302 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from array import array
+from rth.core.dispatcher import Dispatcher
+from rth.core.formatters import write_router_table
+from rth.virtual_building.graph import NetworkGraph
+from rth.virtual_building.kpaths import KShortestPaths
+from rth.virtual_building.network_creator import NetworkCreator
+from rth.virtual_building.paths import PathEngine, UNREACHABLE
+from rth.virtual_building.reduction import ReducedPathEngine
+
+
+class PathsTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # two equal-cost paths between A and D: 1 > 3 and 2 > 4
+        self.subnets = {
+            'A': "10.0.0.0/24",
+            'B': "10.0.1.0/24",
+            'C': "10.0.2.0/24",
+            'D': "10.0.3.0/24"
+        }
+        self.routers = {"1": None, "2": None, "3": None, "4": None, "5": True, "6": None}
+        self.links = {
+            "1": {'A': None, 'B': None},
+            "2": {'A': None, 'C': None},
+            "3": {'B': None, 'D': None},
+            "4": {'C': None, 'D': None},
+            "5": {'D': None},
+            "6": {'A': None}
+        }
+
+        self.inst = Dispatcher(ecmp=True)
+        self.inst.execute(self.subnets, self.routers, self.links)
+
+    def test_tree(self):
+        nc = NetworkCreator()
+        for name, cidr in self.subnets.items():
+            ip, mask = cidr.split('/')
+            nc.create_network(ip, int(mask), name)
+        for name, internet in self.routers.items():
+            nc.create_router(internet_connection=bool(internet), name=name)
+        for name, subnets in self.links.items():
+            nc.connect_router_to_networks(name, subnets)
+
+        engine = PathEngine.from_network_creator(nc)
+        tree = engine.tree(3)
+
+        self.assertEqual([2, 2, 1, 1, 1, 3], list(tree.router_distances))
+        self.assertEqual(((0, 0), (1, 0)), tree.next_hops(5))
+        self.assertEqual(((2, 1),), tree.next_hops(0))
+        self.assertEqual((), tree.next_hops(2))
+        self.assertEqual([0, 2], tree.path(0))
+
+        # towards router 5, which is connected to internet
+        tree = engine.tree_to_routers([4])
+        self.assertEqual([2, 2, 1, 1, 0, 3], list(tree.router_distances))
+        self.assertEqual(((4, 3),), tree.next_hops(2))
+
+    def test_unreachable(self):
+        # router 0 on subnets 0 and 1, router 1 alone on subnet 2
+        graph = NetworkGraph(array('I', [0, 1, 2, 3]), array('I', [0, 0, 1]), array('I', [0, 2, 3]),
+                             array('I', [0, 1, 2]))
+        tree = PathEngine(graph).tree(0)
+        self.assertEqual(UNREACHABLE, tree.router_distances[1])
+        self.assertIsNone(tree.path(2))
+
+    def test_reduced_engine(self):
+        # a chain going from router 1 back to itself through the routers 3, 2 and 0, the stubs 4 and 5 of router 1,
+        # and a ring of routers 4 and 5 over the subnets 6 and 7
+        connections = [(0, 0), (1, 0), (0, 1), (2, 1), (2, 2), (3, 2), (3, 3), (1, 3), (1, 4), (1, 5), (4, 6),
+                       (5, 6), (4, 7), (5, 7)]
+        subnets_count, routers_count = 8, 6
+        graph = NetworkGraph(
+            array('I', [0] + [sum(1 for _, s in connections if s <= uid) for uid in range(subnets_count)]),
+            array('I', [r for uid in range(subnets_count) for r, s in connections if s == uid]),
+            array('I', [0] + [sum(1 for r, _ in connections if r <= uid) for uid in range(routers_count)]),
+            array('I', [s for uid in range(routers_count) for r, s in connections if r == uid]))
+
+        reduced = ReducedPathEngine(graph, key=lambda router, subnet: router, cache_size=1)
+        self.assertEqual({4: 1, 5: 1}, reduced.stubs)
+        self.assertEqual([([1, 3, 2, 0, 1], [3, 2, 1, 0]), ([4, 5, 4], [6, 7])], reduced.chains)
+        self.assertEqual([4, 5, 3, 2, 1, 0, 6, 7], list(reduced.destinations()))
+
+        engine = PathEngine(graph, key=lambda router, subnet: router)
+        for destination in range(subnets_count):
+            tree, expected = reduced.tree(destination), engine.tree(destination)
+            self.assertEqual(list(expected.router_distances), list(tree.router_distances))
+            for router in range(routers_count):
+                self.assertEqual(expected.next_hops(router), tree.next_hops(router))
+            for start in range(subnets_count):
+                self.assertEqual(expected.path(start), tree.path(start))
+
+    def test_early_termination(self):
+        # a line of subnetworks 0 to 5, router i linking the subnetworks i and i + 1
+        graph = NetworkGraph(array('I', [0, 1, 3, 5, 7, 9, 10]), array('I', [0, 0, 1, 1, 2, 2, 3, 3, 4, 4]),
+                             array('I', [0, 2, 4, 6, 8, 10]), array('I', [0, 1, 1, 2, 2, 3, 3, 4, 4, 5]))
+        engine = PathEngine(graph)
+
+        tree = engine.tree(1, until=[2])
+        self.assertTrue(tree.partial)
+        self.assertEqual([1, 1, UNREACHABLE, UNREACHABLE, UNREACHABLE], list(tree.router_distances))
+        self.assertEqual([1], tree.path(2))
+        self.assertFalse(engine.tree(1).partial)
+
+        self.assertEqual({(4, 1): [3, 2, 1], (4, 5): [4]}, engine.paths(sources=[4], destinations=[1, 5]))
+        self.assertEqual({(s, e): engine.tree(e).path(s) for s in range(6) for e in range(6) if s != e},
+                         ReducedPathEngine(graph).paths())
+
+    def test_shared_routes(self):
+        # a line of subnetworks 0 to 5: the paths of every start cross the same routers, whose next hops are only
+        # derived once
+        graph = NetworkGraph(array('I', [0, 1, 3, 5, 7, 9, 10]), array('I', [0, 0, 1, 1, 2, 2, 3, 3, 4, 4]),
+                             array('I', [0, 2, 4, 6, 8, 10]), array('I', [0, 1, 1, 2, 2, 3, 3, 4, 4, 5]))
+        tree = PathEngine(graph).tree(0)
+        calls = []
+        subnets_of = graph.subnets_of
+        graph.subnets_of = lambda router: calls.append(router) or subnets_of(router)
+
+        self.assertEqual([[0], [1, 0], [2, 1, 0], [3, 2, 1, 0], [4, 3, 2, 1, 0]],
+                         [tree.path(start) for start in range(1, 6)])
+        self.assertEqual([0, 1, 2, 3, 4], sorted(calls))
+
+    def test_query_hops(self):
+        inst = Dispatcher(tie_break='gateway_ip')
+        inst.execute(self.subnets, self.routers, self.links)
+        hops, _ = self.named_result(inst)
+
+        for sources, destinations in ((['A'], None), (None, ['D']), (['B', 'C'], ['A', 'D'])):
+            expected = {(start, end): path for (start, end), path in hops.items()
+                        if (sources is None or start in sources) and (destinations is None or end in destinations)}
+            self.assertEqual(expected, Dispatcher(tie_break='gateway_ip').query_hops(
+                self.subnets, self.routers, self.links, sources, destinations))
+
+        self.assertRaises(ValueError, lambda: Dispatcher().query_hops(self.subnets, self.routers, self.links, ['E']))
+
+    def test_query_executed_network(self):
+        inst = Dispatcher(tie_break='gateway_ip')
+        self.assertRaises(ValueError, lambda: inst.query_hops(sources=['A']))
+        inst.execute(self.subnets, self.routers, self.links)
+        hops, _ = self.named_result(inst)
+
+        self.assertEqual({('A', 'D'): hops[('A', 'D')]}, inst.query_hops(sources=['A'], destinations=['D']))
+        self.assertEqual({pair: path for pair, path in hops.items() if pair[1] == 'B'},
+                         inst.query_hops(destinations=['B']))
+        self.assertRaises(ValueError, lambda: inst.query_hops(sources=['E']))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "network.snap")
+            inst.save_snapshot(path)
+            other = Dispatcher(tie_break='gateway_ip')
+            self.assertEqual({('C', 'B'): hops[('C', 'B')]}, other.query_hops(snapshot=path, sources=['C'],
+                                                                              destinations=['B']))
+        self.assertEqual({('B', 'C'): hops[('B', 'C')]}, other.query_hops(sources=['B'], destinations=['C']))
+
+    def test_query_timing(self):
+        # a chain of subnetworks: the network is built once, and a query on it only costs its trees
+        count = 2000
+        subnets = {f"S{i}": f"10.{i // 256}.{i % 256}.0/24" for i in range(count)}
+        routers = {f"R{i}": None for i in range(1, count)}
+        links = {f"R{i}": {f"S{i - 1}": None, f"S{i}": None} for i in range(1, count)}
+        routers["X"], links["X"] = True, {'S0': None}
+
+        inst = Dispatcher()
+        start = time.perf_counter()
+        self.assertEqual({('S10', 'S12'): ["R11", "R12"]}, inst.query_hops(subnets, routers, links, ['S10'], ['S12']))
+        built = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(20):
+            self.assertEqual({(f"S{i}", f"S{i + 2}"): [f"R{i + 1}", f"R{i + 2}"]},
+                             inst.query_hops(sources=[f"S{i}"], destinations=[f"S{i + 2}"]))
+        self.assertLess(time.perf_counter() - start, built)
+
+    def test_multipath_routes(self):
+        tables = self.inst.formatted_raw_routing_tables
+
+        self.assertEqual((0, 1), self.inst.next_hops[(5, 3)])
+        self.assertEqual([{'gateway': '10.0.0.254', 'interface': '10.0.0.252'},
+                          {'gateway': '10.0.0.253', 'interface': '10.0.0.252'}], tables["6"]["10.0.3.0/24"]['nexthops'])
+        self.assertEqual(2, len(tables["6"]["0.0.0.0/0"]['nexthops']))
+        self.assertNotIn('nexthops', tables["1"]["10.0.3.0/24"])
+
+        f = io.StringIO()
+        write_router_table(f, "6", tables["6"])
+        self.assertIn("+ 10.0.0.253 via 10.0.0.252", f.getvalue())
+
+    def test_default_route_to_master(self):
+        # routers 3 and 4 are connected to the master router's subnetwork
+        tables = self.inst.formatted_raw_routing_tables
+        self.assertEqual({'gateway': '10.0.3.252', 'interface': '10.0.3.254'}, tables["3"]["0.0.0.0/0"])
+        self.assertEqual({'gateway': '10.0.3.252', 'interface': '10.0.3.253'}, tables["4"]["0.0.0.0/0"])
+        self.assertEqual({'gateway': '10.0.3.252', 'interface': '10.0.3.252'}, tables["5"]["0.0.0.0/0"])
+
+    def test_multipath_disabled(self):
+        inst = Dispatcher()
+        inst.execute(self.subnets, self.routers, self.links)
+        self.assertIsNone(inst.next_hops)
+        self.assertNotIn('nexthops', inst.formatted_raw_routing_tables["6"]["10.0.3.0/24"])
+
+
+    #
+    # Tie-break
+    #
+    @staticmethod
+    def named_result(inst):
+        names = inst.names()
+        hops = {(names['subnets'][s], names['subnets'][e]): [names['routers'][r] for r in path]
+                for (s, e), path in inst.hops.items()}
+        return hops, inst.formatted_raw_routing_tables
+
+    def test_tie_break_ignores_input_order(self):
+        links = {
+            "1": {'A': "10.0.0.1", 'B': "10.0.1.1"},
+            "2": {'A': "10.0.0.2", 'C': "10.0.2.1"},
+            "3": {'B': "10.0.1.2", 'D': "10.0.3.1"},
+            "4": {'C': "10.0.2.2", 'D': "10.0.3.2"},
+            "5": {'D': "10.0.3.254"},
+            "6": {'A': "10.0.0.6"}
+        }
+
+        def reverse(d):
+            return dict(reversed(list(d.items())))
+
+        for policy in ('gateway_ip', 'hash'):
+            results = []
+            for subnets, routers, links_ in ((self.subnets, self.routers, links),
+                                             (reverse(self.subnets), reverse(self.routers),
+                                              {r: reverse(links[r]) for r in reverse(links)})):
+                inst = Dispatcher(tie_break=policy)
+                inst.execute(subnets, routers, links_)
+                results.append(self.named_result(inst))
+            self.assertEqual(results[0], results[1], msg=policy)
+
+        inst = Dispatcher(tie_break='gateway_ip')
+        inst.execute(self.subnets, self.routers, links)
+        self.assertEqual({'gateway': '10.0.0.1', 'interface': '10.0.0.6'},
+                         inst.formatted_raw_routing_tables["6"]["10.0.3.0/24"])
+
+    def test_tie_break_same_as_ants(self):
+        # without ties, the path engine finds the same hops and tables as the ants
+        routers = {"1": None, "3": None, "4": None, "5": True}
+        links = {"1": {'A': None, 'B': None}, "3": {'B': None, 'D': None}, "4": {'C': None, 'D': None},
+                 "5": {'D': None}}
+
+        inst = Dispatcher(tie_break='uid')
+        inst.execute(self.subnets, routers, links)
+        ants = Dispatcher()
+        ants.execute(self.subnets, routers, links)
+        self.assertEqual(ants.hops, inst.hops)
+        self.assertEqual(ants.formatted_raw_routing_tables, inst.formatted_raw_routing_tables)
+
+    #
+    # K shortest paths
+    #
+    def test_k_shortest_paths(self):
+        inst = Dispatcher(k_paths=3)
+        inst.execute(self.subnets, self.routers, self.links)
+
+        # only two loopless paths from A to D, the one of the hops first
+        self.assertEqual([([0, 2], [1]), ([1, 3], [2])], inst.shortest_paths[(0, 3)])
+        self.assertEqual([([0, 1], [0]), ([2, 3], [3])], inst.shortest_paths[(1, 2)])
+        self.assertEqual(12, len(inst.shortest_paths))
+
+        # routers 0 and 1 both link the subnets 0 and 1
+        engine = PathEngine(NetworkGraph(array('I', [0, 2, 4]), array('I', [0, 1, 0, 1]), array('I', [0, 2, 4]),
+                                         array('I', [0, 1, 0, 1])))
+        self.assertEqual([([0], []), ([1], [])], KShortestPaths(engine, 5).paths(0, 1))
+        self.assertEqual([([0], [])], KShortestPaths(engine, 1).paths(0, 1))
+
+    def test_k_shortest_paths_order(self):
+        # router 0 joins router 1 through the subnets 2 then 1: the first path is the one of the lowest subnet, as
+        # between the other equal-cost paths, so that k cuts the same ordered list
+        engine = PathEngine(NetworkGraph(array('I', [0, 1, 3, 5, 6]), array('I', [0, 0, 1, 0, 1, 1]),
+                                         array('I', [0, 3, 6]), array('I', [0, 2, 1, 1, 2, 3])),
+                            lambda router, subnet: router)
+        self.assertEqual([([0, 1], [1]), ([0, 1], [2])], KShortestPaths(engine, 3).paths(0, 3))
+        self.assertEqual([([0, 1], [1])], KShortestPaths(engine, 1).paths(0, 3))
+
+    def test_k_shortest_paths_of_some_pairs(self):
+        inst = Dispatcher(k_paths=3, k_paths_sources=['A'], k_paths_destinations=['C', 'D'])
+        inst.execute(self.subnets, self.routers, self.links)
+        every = Dispatcher(k_paths=3)
+        every.execute(self.subnets, self.routers, self.links)
+        self.assertEqual({pair: every.shortest_paths[pair] for pair in ((0, 2), (0, 3))}, inst.shortest_paths)
+
+        inst = Dispatcher(k_paths=3, k_paths_sources=['E'])
+        self.assertRaises(ValueError, lambda: inst.execute(self.subnets, self.routers, self.links))
+
+    def test_invalid_k_paths(self):
+        self.assertRaises(ValueError, lambda: Dispatcher(k_paths=0))
+        self.assertRaises(ValueError, lambda: KShortestPaths(PathEngine(None), 0))
+
+    def test_unknown_tie_break(self):
+        self.assertRaises(ValueError, lambda: Dispatcher(tie_break='random'))
+
+
+if __name__ == '__main__':
+    unittest.main()
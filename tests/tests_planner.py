@@ -0,0 +1,55 @@
+import unittest
+from rth.core.dispatcher import Dispatcher
+from rth.core.planner import BuddyAllocator, plan_subnetworks, prefix_for
+from rth.core.validation import validate_topology
+
+
+class PlannerTests(unittest.TestCase):
+
+    def test_prefix_for(self):
+        self.assertEqual(30, prefix_for(1))
+        self.assertEqual(30, prefix_for(2))
+        self.assertEqual(29, prefix_for(3))
+        self.assertEqual(24, prefix_for(254))
+        self.assertEqual(23, prefix_for(255))
+        self.assertRaises(ValueError, lambda: prefix_for(0))
+        self.assertRaises(ValueError, lambda: prefix_for(2 ** 32))
+
+    def test_buddies(self):
+        allocator = BuddyAllocator(["10.0.0.0/24"])
+        first, second = allocator.allocate(26), allocator.allocate(25)
+        # the /26 splits the /24, the /25 takes the upper half left free
+        self.assertEqual((0x0A000000, 0x0A000080), (first, second))
+        self.assertEqual(0x0A000040, allocator.allocate(26))
+        self.assertRaises(ValueError, lambda: allocator.allocate(30))
+
+        allocator.release(second, 25)
+        allocator.release(first, 26)
+        allocator.release(0x0A000040, 26)
+        self.assertEqual(0x0A000000, allocator.allocate(24))
+
+    def test_plan(self):
+        plan = plan_subnetworks({'A': 2, 'B': 100, 'C': 20, 'D': 2}, ["192.168.0.0/24", "10.0.0.0/30"])
+        # the largest networks are placed first, the smallest fitting block being taken
+        self.assertEqual({'A': "10.0.0.0/30", 'B': "192.168.0.0/25", 'C': "192.168.0.128/27",
+                          'D': "192.168.0.160/30"}, plan)
+        self.assertEqual(['A', 'B', 'C', 'D'], list(plan))
+
+        with self.assertRaises(ValueError) as context:
+            plan_subnetworks({'A': 2, 'B': 100, 'C': 20, 'D': 2}, ["192.168.0.0/25"])
+        self.assertIn('C (/27)', str(context.exception))
+        self.assertRaises(ValueError, lambda: BuddyAllocator(["10.0.0.0/8", "10.1.0.0/16"]))
+
+    def test_plan_is_executable(self):
+        subnetworks = plan_subnetworks({f"S{i}": 2 + i for i in range(40)}, ["172.16.0.0/20"])
+        self.assertFalse(validate_topology(subnetworks, {}, {}, check_master=False))
+
+        links = {f"R{i}": {f"S{i}": None, f"S{i + 1}": None} for i in range(39)}
+        links["X"] = {'S0': None}
+        inst = Dispatcher(tie_break='uid')
+        inst.execute(subnetworks, {name: name == "X" or None for name in links}, links)
+        self.assertFalse(inst.verify_routing_tables())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
+import asyncio
 import unittest
 from rth.core.dispatcher import Dispatcher
+from rth.core.errors import UnreachableNetwork
 
 
 class ProcessTests(unittest.TestCase):
@@ -343,6 +345,113 @@ class ProcessTests(unittest.TestCase):
             if self.debug_print:
                 print(f'Passed {n["name"]}')
 
+    def test_4_execute_again(self):
+        n = self.networks[1]
+        inst = n['instance']
+
+        # the same instance must be usable for another topology
+        other = self.networks[2]
+        inst.execute(other['subnets'], other['routers'], other['links'])
+        self.assertEqual(other['expected_network'], inst.network_raw_output())
+
+        inst.execute(n['subnets'], n['routers'], n['links'])
+        self.assertEqual(n['expected_network'], inst.network_raw_output())
+
+    def test_5_execute_many(self):
+        broken = self.networks[1].copy()
+        broken['links'] = {4: {'D': None}, 3: {"C": None, "D": None}}
+
+        topologies = [
+            {'name': "first", 'subnetworks': self.networks[1]['subnets'], 'routers': self.networks[1]['routers'],
+             'links': self.networks[1]['links']},
+            (self.networks[2]['subnets'], self.networks[2]['routers'], self.networks[2]['links']),
+            {'subnetworks': broken['subnets'], 'routers': broken['routers'], 'links': broken['links']},
+        ]
+
+        for workers in (1, 2):
+            results = {r['index']: r for r in Dispatcher.execute_many(iter(topologies), workers=workers)}
+            self.assertEqual([0, 1, 2], sorted(results))
+
+            self.assertEqual("first", results[0]['name'])
+            for index, number in ((0, 1), (1, 2)):
+                self.assertIsNone(results[index]['error'])
+                self.assertEqual(self.networks[number]['expected_hops'], results[index]['hops'])
+                for router in self.networks[number]['expected_result']:
+                    self.assertEqual(self.networks[number]['expected_result'][router],
+                                     results[index]['routing_tables'][str(router)])
+
+            self.assertEqual(UnreachableNetwork.__name__, results[2]['error']['type'])
+            self.assertIn("is unreachable from master router", results[2]['error']['message'])
+            self.assertIsNone(results[2]['routing_tables'])
+
+        # a topology that cannot be sent to a worker
+        topologies[1] = dict(topologies[0], name=lambda: None)
+        results = {r['index']: r for r in Dispatcher.execute_many(topologies, workers=2)}
+        self.assertIsNone(results[0]['error'])
+        self.assertIsNotNone(results[1]['error'])
+        self.assertEqual(UnreachableNetwork.__name__, results[2]['error']['type'])
+
+    def test_6_execute_async(self):
+        for number in self.networks:
+            n = self.networks[number]
+            inst = Dispatcher()
+            steps = []
+
+            asyncio.run(inst.execute_async(n['subnets'], n['routers'], n['links'], batch_size=3,
+                                           progress=lambda done, total: steps.append((done, total))))
+
+            self.assertEqual([(9, 12), (12, 12)], steps)
+            self.assertEqual((12, 12), inst.progress)
+            self.assertEqual(n['expected_hops'], inst.hops)
+            for router in n['expected_result']:
+                self.assertEqual(n['expected_result'][router], inst.formatted_raw_routing_tables[str(router)])
+
+    def test_7_execute_async_timeout(self):
+        n = self.networks[1]
+        inst = Dispatcher()
+
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(inst.execute_async(n['subnets'], n['routers'], n['links'], timeout=0))
+        self.assertIsNone(inst.network_raw_output())
+
+    def test_8_execute_async_path_engine(self):
+        for number in self.networks:
+            n = self.networks[number]
+            expected = Dispatcher(tie_break='hash', ecmp=True)
+            expected.execute(n['subnets'], n['routers'], n['links'])
+            inst = Dispatcher(tie_break='hash', ecmp=True)
+            steps = []
+
+            asyncio.run(inst.execute_async(n['subnets'], n['routers'], n['links'], batch_size=3,
+                                           progress=lambda done, total: steps.append((done, total))))
+
+            self.assertEqual([(9, 12), (12, 12)], steps)
+            self.assertEqual(expected.hops, inst.hops)
+            self.assertEqual(expected.formatted_raw_routing_tables, inst.formatted_raw_routing_tables)
+            self.assertEqual(expected.next_hops, inst.next_hops)
+
+    def test_9_execute_async_cancelled(self):
+        n = self.networks[1]
+        inst = Dispatcher(tie_break='hash')
+        steps = []
+
+        async def cancelled():
+            task = asyncio.current_task()
+
+            def progress(done, total):
+                steps.append((done, total))
+                task.cancel()
+
+            await inst.execute_async(n['subnets'], n['routers'], n['links'], batch_size=1, progress=progress)
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(cancelled())
+        # stopped after the first batch, before any result reached the instance
+        self.assertEqual([(3, 12)], steps)
+        self.assertIsNone(inst.hops)
+        self.assertIsNone(inst.formatted_raw_routing_tables)
+        self.assertIsNone(inst.network_raw_output())
+
 
 if __name__ == '__main__':
     unittest.main()
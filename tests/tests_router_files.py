@@ -0,0 +1,131 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock as m
+from rth.cli import main
+from rth.core.dispatcher import Dispatcher
+from rth.core.router_files import write_router_files, read_manifest, MANIFEST_NAME
+
+
+class RouterFilesTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.topology = {
+            'subnetworks': {
+                'A': "10.0.0.0/24",
+                'B': "192.168.0.0/24",
+                'C': "192.168.1.0/24",
+                'D': "10.0.1.0/24"
+            },
+            'routers': {"1": None, "2": None, "3": None, "4": True},
+            'links': {
+                "1": {'B': None, 'C': None},
+                "2": {"A": None, "B": None},
+                "4": {'D': None},
+                "3": {"C": None, "D": None}
+            }
+        }
+
+    @staticmethod
+    def tables(topology):
+        inst = Dispatcher()
+        inst.execute(topology['subnetworks'], topology['routers'], topology['links'])
+        return inst.formatted_raw_routing_tables
+
+    def test_only_changed_files(self):
+        tables = self.tables(self.topology)
+
+        with tempfile.TemporaryDirectory() as directory:
+            report = write_router_files(tables, directory)
+            self.assertEqual(["1", "2", "3", "4"], sorted(report['written']))
+            self.assertEqual(sorted(["1.txt", "2.txt", "3.txt", "4.txt", MANIFEST_NAME]), sorted(os.listdir(directory)))
+            with open(os.path.join(directory, "4.txt")) as f:
+                self.assertEqual("Router 4", f.readline().strip())
+
+            report = write_router_files(tables, directory)
+            self.assertEqual([], report['written'])
+            self.assertEqual(4, len(report['unchanged']))
+
+            # a new subnetwork on router 1: every table gets a route, router 3 disappears
+            edited = {
+                'subnetworks': dict(self.topology['subnetworks'], E="172.16.0.0/24"),
+                'routers': {"1": None, "2": None, "4": True},
+                'links': {"1": {'B': None, 'C': None, 'E': None}, "2": {"A": None, "B": None}, "4": {'C': None}},
+            }
+            del edited['subnetworks']['D']
+            report = write_router_files(self.tables(edited), directory)
+            self.assertEqual(["3"], report['removed'])
+            self.assertNotIn("3.txt", os.listdir(directory))
+            self.assertEqual(["1", "2", "4"], sorted(read_manifest(directory)['routers']))
+
+            # an unchanged table whose file has been deleted is written again
+            os.unlink(os.path.join(directory, "2.txt"))
+            self.assertEqual(["2"], write_router_files(self.tables(edited), directory)['written'])
+
+    def test_next_hops_change(self):
+        route = {'gateway': '10.0.1.3', 'interface': '10.0.1.1'}
+        tables = {"1": {"10.0.2.0/24": dict(route, nexthops=[route, {'gateway': '10.0.1.4', 'interface': '10.0.1.1'}])}}
+
+        with tempfile.TemporaryDirectory() as directory:
+            write_router_files(tables, directory, 'json')
+            tables["1"]["10.0.2.0/24"]['nexthops'][1] = {'gateway': '10.0.1.9', 'interface': '10.0.1.1'}
+            self.assertEqual(["1"], write_router_files(tables, directory, 'json')['written'])
+            with open(os.path.join(directory, "1.json")) as f:
+                self.assertEqual(tables["1"], json.load(f)['routing_table'])
+
+    @unittest.skipIf(os.name != 'posix', "POSIX permissions")
+    def test_permissions(self):
+        tables = self.tables(self.topology)
+        umask = os.umask(0o022)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                write_router_files(tables, directory)
+                self.assertEqual(0o644, os.stat(os.path.join(directory, "1.txt")).st_mode & 0o777)
+                self.assertEqual(0o644, os.stat(os.path.join(directory, MANIFEST_NAME)).st_mode & 0o777)
+
+                # a rewritten file keeps its permissions
+                os.chmod(os.path.join(directory, "1.txt"), 0o640)
+                os.unlink(os.path.join(directory, MANIFEST_NAME))
+                self.assertIn("1", write_router_files(tables, directory)['written'])
+                self.assertEqual(0o640, os.stat(os.path.join(directory, "1.txt")).st_mode & 0o777)
+                self.assertFalse([name for name in os.listdir(directory) if name.endswith('.tmp')])
+
+            # new files follow the umask
+            os.umask(0o077)
+            with tempfile.TemporaryDirectory() as directory:
+                write_router_files(tables, directory)
+                self.assertEqual(0o600, os.stat(os.path.join(directory, "1.txt")).st_mode & 0o777)
+        finally:
+            os.umask(umask)
+
+    def test_format_change_and_names(self):
+        tables = {"core/1": {"10.0.0.0/24": {'gateway': '10.0.0.254', 'interface': '10.0.0.254'}}}
+
+        with tempfile.TemporaryDirectory() as directory:
+            write_router_files(tables, directory)
+            report = write_router_files(tables, directory, 'json')
+            self.assertEqual(["core/1"], report['written'])
+
+            files = [name for name in os.listdir(directory) if name != MANIFEST_NAME]
+            self.assertEqual(1, len(files))
+            self.assertTrue(files[0].startswith("core_1-") and files[0].endswith(".json"))
+            with open(os.path.join(directory, files[0])) as f:
+                self.assertEqual(tables["core/1"], json.load(f)['routing_table'])
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "input.json")
+            with open(source, mode="w") as f:
+                json.dump(dict(self.topology, name="basic"), f)
+
+            output = os.path.join(directory, "out")
+            self.assertEqual(0, main(['run', source, '--per-router', '--output-dir', output]))
+            self.assertEqual(5, len(os.listdir(os.path.join(output, "basic"))))
+            with m.patch("sys.stderr", new_callable=io.StringIO):
+                self.assertEqual(2, main(['run', source, '--per-router']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock as m
+from rth.cli import build_parser, engine_options
+from rth.core.dispatcher import Dispatcher
+from rth.core.server import QueryEngine, QueryError, QueryServer, query
+
+
+class ServerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.topology = {
+            'subnetworks': {
+                'A': "10.0.0.0/24",
+                'B': "192.168.0.0/24",
+                'C': "192.168.1.0/24",
+                'D': "10.0.1.0/24"
+            },
+            'routers': {"1": None, "2": None, "3": None, "4": True},
+            'links': {
+                "1": {'B': None, 'C': None},
+                "2": {"A": None, "B": None},
+                "4": {'D': None},
+                "3": {"C": None, "D": None}
+            }
+        }
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, "network.json")
+        self.write_source(self.topology)
+        self.socket = os.path.join(self.directory.name, "rth.sock")
+
+        self.server = QueryServer(self.socket, self.source, poll_interval=0.05)
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05})
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def write_source(self, topology):
+        with open(self.source, mode="w") as f:
+            json.dump(topology, f)
+
+    def test_batch(self):
+        answer = query(self.socket, {'queries': [
+            {'op': 'lookup', 'router': "2", 'ip': "10.0.1.12"},
+            {'op': 'path', 'from': "A", 'to': "D"},
+            {'op': 'trace', 'router': "2", 'ip': "10.0.1.12"},
+            {'op': 'lookup', 'router': "5", 'ip': "10.0.1.12"},
+        ]})
+
+        lookup, path, trace, unknown = answer['results']
+        self.assertEqual("10.0.1.0/24", lookup['route'])
+        self.assertEqual(['2', '1', '3'], path['routers'])
+        self.assertEqual("delivered", trace['status'])
+        self.assertEqual(['2', '1', '3'], [hop['router'] for hop in trace['hops']])
+        self.assertFalse(unknown['ok'])
+
+    def test_bad_queries(self):
+        answer = query(self.socket, {'queries': [
+            {'op': 'lookup', 'router': "2", 'ip': ["10", "0", "1", "12"]},
+            {'op': 'trace', 'router': "2", 'ip': 10},
+            {'op': 'path', 'from': "A", 'to': "D"},
+        ]})
+        bad_list, bad_int, path = answer['results']
+        self.assertEqual((False, False), (bad_list['ok'], bad_int['ok']))
+        self.assertIn("not a valid IPv4", bad_int['error'])
+        self.assertTrue(path['ok'])
+
+        # an unexpected error is answered too, and the connection is kept
+        with m.patch("rth.core.server.QueryEngine.lookup", side_effect=RuntimeError("boom")):
+            answer = query(self.socket, {'op': 'lookup', 'router': "2", 'ip': "10.0.1.12"})
+        self.assertFalse(answer['ok'])
+        self.assertIn("boom", answer['error'])
+        self.assertTrue(query(self.socket, {'op': 'stats'})['ok'])
+
+    def test_path_between_islands(self):
+        inst = Dispatcher(lab=True)
+        inst.execute({'A': "10.0.0.0/24", 'B': "10.0.1.0/24", 'C': "192.168.0.0/24"},
+                     {"1": None, "2": True, "3": None},
+                     {"1": {'A': None, 'B': None}, "2": {'B': None}, "3": {'C': None}})
+        engine = QueryEngine(inst)
+
+        self.assertEqual(["1"], engine.path('A', 'B')['routers'])
+        with self.assertRaises(QueryError) as context:
+            engine.path('A', 'C')
+        self.assertEqual("No path between 'A' and 'C'", str(context.exception))
+
+    def test_engine_options(self):
+        source = os.path.join(self.directory.name, "diamond.json")
+        with open(source, mode="w") as f:
+            json.dump({
+                'subnetworks': {'A': "10.0.0.0/24", 'B': "10.0.1.0/24", 'C': "10.0.2.0/24", 'D': "10.0.3.0/24",
+                                'E': "10.0.4.0/24"},
+                'routers': {"1": None, "2": None, "3": None, "4": True, "5": None, "6": None},
+                'links': {"1": {'A': None, 'B': None}, "2": {'A': None, 'C': None}, "3": {'B': None, 'D': None},
+                          "6": {'C': None, 'D': None}, "4": {'D': None}, "5": {'A': None, 'E': None}}
+            }, f)
+
+        args = build_parser().parse_args(['serve', source, '--tie-break', 'hash', '--ecmp'])
+        engine = QueryEngine.load(source, **engine_options(args))
+        lookup = engine.lookup("5", "10.0.3.7")
+        self.assertEqual(2, len(lookup['nexthops']))
+        self.assertEqual(lookup['gateway'], lookup['nexthops'][0]['gateway'])
+        self.assertNotIn('nexthops', QueryEngine.load(source).lookup("5", "10.0.3.7"))
+
+    def test_default_route(self):
+        trace = query(self.socket, {'op': 'trace', 'router': "2", 'ip': "8.8.8.8"})
+        self.assertEqual("exited", trace['status'])
+        self.assertEqual("4", trace['hops'][-1]['router'])
+        self.assertEqual("0.0.0.0/0", trace['hops'][-1]['route'])
+
+    def test_hot_reload(self):
+        self.assertEqual(4, query(self.socket, {'op': 'stats'})['subnets'])
+
+        topology = dict(self.topology, subnetworks=dict(self.topology['subnetworks'], E="10.0.2.0/24"),
+                        links=dict(self.topology['links'], **{"3": {'C': None, 'D': None, 'E': None}}))
+        self.write_source(topology)
+        os.utime(self.source, ns=(time.time_ns() + 10 ** 9,) * 2)
+
+        deadline = time.monotonic() + 5
+        while query(self.socket, {'op': 'stats'})['subnets'] != 5 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(['2', '1', '3'], query(self.socket, {'op': 'path', 'from': "A", 'to': "E"})['routers'])
+
+        # a broken source keeps the previous one served
+        with m.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            self.write_source({'subnetworks': {}})
+            self.assertFalse(query(self.socket, {'op': 'reload'})['ok'])
+        self.assertIn("could not reload", stderr.getvalue())
+        self.assertEqual(5, query(self.socket, {'op': 'stats'})['subnets'])
+
+
+if __name__ == '__main__':
+    unittest.main()
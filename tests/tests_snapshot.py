@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from rth.core.dispatcher import Dispatcher
+from rth.core.errors import SnapshotError
+from rth.virtual_building.snapshot import load_snapshot, save_snapshot
+
+
+class SnapshotTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.subnets = {
+            'A': "10.0.0.0/24",
+            'B': "192.168.0.0/24",
+            'C': "192.168.1.0/24",
+            'D': "10.0.1.0/24"
+        }
+        self.routers = {1: None, 2: None, 3: None, 4: True}
+        self.links = {
+            1: {'B': "192.168.0.26", 'C': "192.168.1.250"},
+            2: {"A": "10.0.0.45", "B": "192.168.0.253"},
+            4: {'D': "10.0.1.254"},
+            3: {"C": "192.168.1.253", "D": None}
+        }
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "network.snap")
+
+        self.inst = Dispatcher()
+        self.inst.execute(self.subnets, self.routers, self.links)
+        self.inst.save_snapshot(self.path)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_snapshot_content(self):
+        with load_snapshot(self.path) as snapshot:
+            self.assertEqual(4, snapshot.subnets_count)
+            self.assertEqual(4, snapshot.routers_count)
+            self.assertEqual(7, snapshot.connections_count)
+            self.assertTrue(snapshot.equitemporality)
+
+            self.assertEqual(['A', 'B', 'C', 'D'], snapshot.subnets_names())
+            self.assertEqual(['1', '2', '3', '4'], snapshot.routers_names())
+            self.assertEqual([0, 0, 0, 1], list(snapshot.router_flags))
+
+            # CSR adjacency, in connection order
+            self.assertEqual([3, 2], list(snapshot.graph.routers_of(3)))
+            self.assertEqual([2, 3], list(snapshot.graph.subnets_of(2)))
+            self.assertEqual({'subnets': {0: [1], 1: [0, 1], 2: [0, 2], 3: [3, 2]},
+                              'routers': {0: [1, 2], 1: [0, 1], 2: [2, 3], 3: [3]}}, snapshot.graph.links())
+
+    def test_execute_snapshot(self):
+        inst = Dispatcher()
+        inst.execute_snapshot(self.path)
+
+        self.assertEqual(self.inst.network_raw_output(), inst.network_raw_output())
+        self.assertEqual(self.inst.hops, inst.hops)
+        self.assertEqual(self.inst.formatted_raw_routing_tables, inst.formatted_raw_routing_tables)
+
+        # a loaded snapshot can be executed several times
+        with load_snapshot(self.path) as snapshot:
+            for _ in range(2):
+                inst.execute_snapshot(snapshot)
+                self.assertEqual(self.inst.formatted_raw_routing_tables, inst.formatted_raw_routing_tables)
+
+    def test_snapshot_roundtrip(self):
+        other = os.path.join(self.directory.name, "copy.snap")
+        with load_snapshot(self.path) as snapshot:
+            save_snapshot(snapshot.to_network_creator(), other)
+
+        with open(self.path, 'rb') as a, open(other, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_wrong_snapshots(self):
+        wrong = os.path.join(self.directory.name, "wrong.snap")
+
+        with open(wrong, 'wb') as f:
+            f.write(b"definitely not a snapshot, but long enough for a header")
+        self.assertRaises(SnapshotError, lambda: load_snapshot(wrong))
+
+        with open(self.path, 'rb') as f:
+            data = bytearray(f.read())
+        with open(wrong, 'wb') as f:
+            f.write(data[:40])
+        self.assertRaises(SnapshotError, lambda: load_snapshot(wrong))
+
+        with open(wrong, 'wb') as f:
+            f.write(data[:-8])
+        self.assertRaises(SnapshotError, lambda: load_snapshot(wrong))
+
+        data[8] = 99
+        with open(wrong, 'wb') as f:
+            f.write(data)
+        self.assertRaises(SnapshotError, lambda: load_snapshot(wrong))
+
+
+if __name__ == '__main__':
+    unittest.main()
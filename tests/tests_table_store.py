@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from rth.core.errors import TableStoreError
+from rth.core.table_store import TableStore, write_table_store
+
+
+class TableStoreTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tables = {
+            'edge': {
+                "10.0.1.0/24": {'gateway': '10.0.1.254', 'interface': '10.0.1.254'},
+                "0.0.0.0/0": {'gateway': '10.0.1.254', 'interface': '10.0.1.254'},
+                "192.168.0.0/24": {'gateway': '10.0.1.253', 'interface': '10.0.1.254'},
+                "192.168.0.128/25": {'gateway': '10.0.1.252', 'interface': '10.0.1.254'},
+                "10.0.0.0/24": {'gateway': '10.0.1.253', 'interface': '10.0.1.254',
+                                'nexthops': [{'gateway': '10.0.1.253', 'interface': '10.0.1.254'},
+                                             {'gateway': '10.0.1.250', 'interface': '10.0.1.254'}]}
+            },
+            'core': {
+                "192.168.0.0/24": {'gateway': '192.168.0.253', 'interface': '192.168.0.253'},
+                "0.0.0.0/0": {'gateway': '192.168.0.26', 'interface': '192.168.0.253'}
+            },
+            'access': {}
+        }
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "tables.rtht")
+        write_table_store(self.tables, self.path)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_tables(self):
+        with TableStore(self.path) as store:
+            self.assertEqual(3, store.routers_count)
+            self.assertEqual(7, store.routes_count)
+            self.assertEqual(['access', 'core', 'edge'], list(store.routers()))
+            self.assertEqual([2, 1, 0], list(store.router_order))
+
+            for name in self.tables:
+                self.assertEqual(self.tables[name], store.table(name))
+
+            routes = list(store.routes('core'))
+            self.assertEqual((0, 0, 0xC0A8001A, 0xC0A800FD), routes[0])
+
+            self.assertIsNone(store.index_of('unknown'))
+            self.assertRaises(KeyError, lambda: store.table('unknown'))
+
+    def test_lookup(self):
+        with TableStore(self.path) as store:
+            self.assertEqual(("192.168.0.128/25", '10.0.1.252', '10.0.1.254'), store.lookup('edge', "192.168.0.200"))
+            self.assertEqual(("192.168.0.0/24", '10.0.1.253', '10.0.1.254'), store.lookup('edge', "192.168.0.12"))
+            self.assertEqual(("0.0.0.0/0", '10.0.1.254', '10.0.1.254'), store.lookup('edge', "8.8.8.8"))
+            self.assertIsNone(store.lookup('access', "8.8.8.8"))
+
+    def test_wrong_store(self):
+        wrong = os.path.join(self.directory.name, "wrong.rtht")
+        with open(wrong, 'wb') as f:
+            f.write(b"\0" * 256)
+        self.assertRaises(TableStoreError, lambda: TableStore(wrong))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from rth.core.dispatcher import Dispatcher
+
+
+class ThreadsTests(unittest.TestCase):
+    """
+    Runs many dispatchers at the same time in a thread pool, to make sure no state is shared between instances.
+    """
+
+    @staticmethod
+    def chain_topology(seed):
+        """
+        Builds a chain of subnetworks: router 0 (the master) is on the first subnetwork, then router i links
+        subnetworks i-1 and i. Names and addresses depend on the seed, so any leak between instances shows.
+        """
+
+        length = 2 + seed % 6
+        prefix = f"10.{seed // 250}.{seed % 250}"
+
+        subnets = {f"net{seed}-{i}": f"{prefix}.{i * 16}/28" for i in range(length)}
+        routers = {f"r{seed}-{i}": (True if i == 0 else None) for i in range(length)}
+        links = {f"r{seed}-0": {f"net{seed}-0": None}}
+        for i in range(1, length):
+            links[f"r{seed}-{i}"] = {f"net{seed}-{i - 1}": None, f"net{seed}-{i}": None}
+
+        hops = {}
+        for s in range(length):
+            for e in range(length):
+                if s < e:
+                    hops[(s, e)] = list(range(s + 1, e + 1))
+                elif s > e:
+                    hops[(s, e)] = list(range(s, e, -1))
+
+        return subnets, routers, links, hops
+
+    def run_topology(self, seed):
+        subnets, routers, links, hops = self.chain_topology(seed)
+        inst = Dispatcher()
+        inst.execute(subnets, routers, links)
+        return seed, inst, hops
+
+    def test_parallel_dispatchers(self):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(self.run_topology, range(300)))
+
+        self.assertEqual(300, len(results))
+        for seed, inst, hops in results:
+            self.assertEqual(hops, inst.hops, f"seed {seed}")
+
+            tables = inst.formatted_raw_routing_tables
+            self.assertEqual(sorted(f"r{seed}-{i}" for i in range(2 + seed % 6)), sorted(tables))
+
+            prefix = f"10.{seed // 250}.{seed % 250}"
+            for name in tables:
+                i = int(name.split('-')[1])
+                self.assertEqual(2 + seed % 6 + 1, len(tables[name]), f"seed {seed}, router {name}")
+                if i > 0:
+                    # default route always goes through the previous subnetwork of the chain
+                    route = tables[name]['0.0.0.0/0']
+                    self.assertTrue(route['interface'].startswith(prefix + "."), f"seed {seed}, router {name}")
+                    self.assertEqual(route['interface'], tables[name][f"{prefix}.{(i - 1) * 16}/28"]['interface'])
+
+
+if __name__ == '__main__':
+    unittest.main()
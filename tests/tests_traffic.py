@@ -0,0 +1,100 @@
+import unittest
+import unittest.mock as m
+from rth.core.dispatcher import Dispatcher
+from rth.core.traffic import TrafficModel
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TrafficTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # router 0 links E to A, then two equal-cost paths to D: 1 > 3 and 2 > 4
+        self.subnets = {
+            'E': "10.0.4.0/24",
+            'A': "10.0.0.0/24",
+            'B': "10.0.1.0/24",
+            'C': "10.0.2.0/24",
+            'D': "10.0.3.0/24"
+        }
+        self.routers = {"0": None, "1": None, "2": None, "3": None, "4": None, "X": True}
+        self.links = {
+            "0": {'E': None, 'A': None},
+            "1": {'A': None, 'B': None},
+            "2": {'A': None, 'C': None},
+            "3": {'B': None, 'D': None},
+            "4": {'C': None, 'D': None},
+            "X": {'D': None}
+        }
+
+        # 10 from E to D, 4 from A to E
+        self.demands = numpy.zeros((5, 5))
+        self.demands[0, 4] = 10
+        self.demands[1, 0] = 4
+
+    def loads(self, **options):
+        inst = Dispatcher(**options)
+        inst.execute(self.subnets, self.routers, self.links)
+        return inst.link_loads(self.demands)
+
+    @staticmethod
+    def interface(loads, router, subnet):
+        names = loads.names
+        i = loads.interfaces.index((names['routers'].index(router), names['subnets'].index(subnet)))
+        return loads.sent[i], loads.received[i]
+
+    def test_single_path(self):
+        loads = self.loads(tie_break='uid')
+        self.assertEqual([14, 10, 0, 10, 0, 0], list(loads.routers))
+        self.assertEqual((10, 4), self.interface(loads, "0", 'A'))
+        self.assertEqual((4, 10), self.interface(loads, "0", 'E'))
+        self.assertEqual((10, 0), self.interface(loads, "3", 'D'))
+        self.assertEqual([4, 10, 10, 0, 10], list(loads.subnets))
+        self.assertEqual(0, loads.dropped)
+
+    def test_multipath_split(self):
+        loads = self.loads(ecmp=True, tie_break='uid')
+        self.assertEqual([14, 5, 5, 5, 5, 0], list(loads.routers))
+        self.assertEqual((0, 5), self.interface(loads, "2", 'A'))
+        self.assertEqual((5, 0), self.interface(loads, "4", 'D'))
+
+    def test_summaries_and_hot_spots(self):
+        # E and A in one area, the others in another one: router 0 only has a summary route to D
+        areas = {'E': 'north', 'A': 'north', 'B': 'south', 'C': 'south', 'D': 'south'}
+        loads = self.loads(areas=areas)
+        self.assertEqual(10, loads.subnets[4])
+        self.assertEqual(0, loads.dropped)
+
+        spots = loads.hot_spots(2, capacities=8)
+        self.assertEqual(["0", "0"], [spot['router'] for spot in spots])
+        self.assertEqual(1.25, spots[0]['utilisation'])
+        self.assertEqual([{'router': "3", 'subnet': 'D', 'sent': 10.0, 'received': 0.0, 'utilisation': 0.5}],
+                         self.loads(tie_break='uid').hot_spots(capacities={("3", 'D'): 20}))
+
+    def test_model_kept_between_matrices(self):
+        inst = Dispatcher(tie_break='uid')
+        inst.execute(self.subnets, self.routers, self.links)
+        with m.patch("rth.core.traffic.TrafficModel", wraps=TrafficModel) as model:
+            first = inst.link_loads(self.demands)
+            second = inst.link_loads(self.demands * 2)
+            self.assertEqual(1, model.call_count)
+            self.assertEqual([2 * load for load in first.routers], list(second.routers))
+
+            # a new execution builds a new model
+            links = dict(self.links, **{"1": {'A': None}})
+            inst.execute(self.subnets, self.routers, links)
+            self.assertEqual([14, 0, 10, 0, 10, 0], list(inst.link_loads(self.demands).routers))
+            self.assertEqual(2, model.call_count)
+
+    def test_invalid_demands(self):
+        inst = Dispatcher()
+        inst.execute(self.subnets, self.routers, self.links)
+        self.assertRaises(ValueError, lambda: inst.link_loads(numpy.zeros((4, 5))))
+
+
+if __name__ == '__main__':
+    unittest.main()
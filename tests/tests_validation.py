@@ -0,0 +1,119 @@
+import unittest
+from rth.core.dispatcher import Dispatcher
+from rth.core.errors import InvalidTopology, WronglyFormedSubnetworksData, WronglyFormedLinksData
+from rth.core.ipv4 import ParsedIPs, ip_to_int, int_to_ip, parse_cidr, network_bounds
+from rth.core.validation import validate_topology
+
+
+class ValidationTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.subnets = {
+            'A': "10.0.0.0/24",
+            'B': "192.168.0.0/24",
+            'C': "192.168.1.0/24",
+            'D': "10.0.1.0/24"
+        }
+        self.routers = {
+            1: None,
+            2: None,
+            3: None,
+            4: True
+        }
+        self.links = {
+            1: {'B': None, 'C': None},
+            2: {"A": None, "B": None},
+            4: {'D': None},
+            3: {"C": None, "D": None}
+        }
+
+    #
+    # IPv4 helpers
+    #
+    def test_ipv4_parsing(self):
+        self.assertEqual(0x0A000001, ip_to_int("10.0.0.1"))
+        self.assertEqual("192.168.1.254", int_to_ip(ip_to_int("192.168.1.254")))
+        self.assertEqual((ip_to_int("10.5.1.128"), 28), parse_cidr("10.5.1.128/28"))
+        self.assertEqual((ip_to_int("10.5.0.0"), ip_to_int("10.5.255.255")),
+                         network_bounds(ip_to_int("10.5.1.3"), 16))
+
+        # the literals the fast path does not know are still checked the slow way
+        self.assertEqual(0x0A000001, ip_to_int("010.000.0.001"))
+        self.assertEqual((0x0A000000, 24), parse_cidr("10.0.0.0/024"))
+        self.assertEqual(0x0A000001, ParsedIPs()["10.0.0.1"])
+
+        for wrong in ("10.0.0", "10.0.0.256", "a.b.c.d", "10.0.0.-1", "0010.0.0.1", "10.0.0.1 ", "10..0.1"):
+            self.assertRaises(ValueError, lambda: ip_to_int(wrong))
+        for wrong in ("10.0.0.0", "10.0.0.0/33", "10.0.0.0/x", "10.0.0.0/", "10.0.0.0/24/1", "10.0.0/24", None):
+            self.assertRaises(ValueError, lambda: parse_cidr(wrong))
+
+    #
+    # Reports
+    #
+    def test_valid_topology(self):
+        report = validate_topology(self.subnets, self.routers, self.links)
+        self.assertFalse(report)
+        self.assertEqual(0, len(report))
+
+    def test_every_error_reported(self):
+        self.subnets['E'] = "10.0.0.128/25"
+        self.subnets['F'] = "10.0.300.0/24"
+        self.routers[5] = "yes"
+        self.links[2]['A'] = "10.0.0.0"
+        self.links[1]['Z'] = None
+        self.links[6] = {'B': None}
+        self.links[3]['C'] = "192.168.1.254"
+        self.links[4]['C'] = None
+
+        report = validate_topology(self.subnets, self.routers, self.links)
+        locations = [(issue.category, issue.location) for issue in report]
+
+        self.assertEqual([
+            ('subnetworks', 'F'),
+            ('subnetworks', 'E'),
+            ('routers', '5'),
+            ('links', '1 -> Z'),
+            ('links', '2 -> A'),
+            ('links', '4'),
+            ('links', '3 -> C'),
+            ('links', '6'),
+        ], locations)
+        self.assertEqual(2, len(report.by_category('subnetworks')))
+        # 192.168.1.254 was automatically given to router 1 before
+        self.assertIn("already attributed to router '1'", report.issues[-2].message)
+
+    def test_master_checks(self):
+        self.routers[4] = None
+        report = validate_topology(self.subnets, self.routers, self.links)
+        self.assertEqual([('routers', '-')], [(i.category, i.location) for i in report])
+
+        self.assertFalse(validate_topology(self.subnets, self.routers, self.links, check_master=False))
+
+    def test_wrong_types(self):
+        report = validate_topology([], None, "links")
+        self.assertEqual(['subnetworks', 'routers', 'links'], [i.category for i in report])
+
+    def test_dispatcher_raises_report(self):
+        self.links[2]['A'] = "10.0.1.1"
+        self.links[3]['Unknown'] = None
+
+        with self.assertRaises(InvalidTopology) as context:
+            Dispatcher().execute(self.subnets, self.routers, self.links)
+
+        self.assertEqual(2, len(context.exception.report))
+        self.assertTrue(str(context.exception).startswith("2 error(s) found in the given data:"))
+
+    def test_legacy_exceptions(self):
+        # the callers catching the exceptions raised before the reports still catch them
+        self.links[3]['Unknown'] = None
+        self.assertRaises(WronglyFormedLinksData, lambda: Dispatcher().execute(self.subnets, self.routers, self.links))
+
+        self.subnets['E'] = "10.0.0/24"
+        with self.assertRaises(WronglyFormedSubnetworksData) as context:
+            Dispatcher().execute(self.subnets, self.routers, self.links)
+        self.assertIsInstance(context.exception, InvalidTopology)
+        self.assertEqual(2, len(context.exception.report))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import copy
+import unittest
+from rth.core.dispatcher import Dispatcher
+from rth.core.verifier import verify_routing_tables
+
+
+class VerifierTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        subnetworks = {
+            'A': "10.0.0.0/24",
+            'B': "192.168.0.0/24",
+            'C': "192.168.1.0/24",
+            'D': "10.0.1.0/24"
+        }
+        routers = {"1": None, "2": None, "3": None, "4": True}
+        links = {
+            "1": {'B': None, 'C': None},
+            "2": {"A": None, "B": None},
+            "4": {'D': None},
+            "3": {"C": None, "D": None}
+        }
+
+        self.inst = Dispatcher()
+        self.inst.execute(subnetworks, routers, links)
+        self.tables = self.inst.formatted_raw_routing_tables
+
+    def test_generated_tables(self):
+        self.assertFalse(self.inst.verify_routing_tables())
+        self.assertFalse(verify_routing_tables(self.tables, workers=2, chunk_size=1))
+
+    def test_loop(self):
+        tables = copy.deepcopy(self.tables)
+        # router 1 sends A back to router 3, which sends it to router 1
+        tables["1"]["10.0.0.0/24"] = {'gateway': '192.168.1.253', 'interface': '192.168.1.254'}
+
+        report = verify_routing_tables(tables)
+        self.assertEqual(1, len(report))
+        issue = report.issues[0]
+        self.assertEqual(('loop', "10.0.0.0/24"), (issue.category, issue.location))
+        self.assertIn("1 > 3 > 1", issue.message)
+
+    def test_black_holes(self):
+        tables = copy.deepcopy(self.tables)
+        del tables["1"]["10.0.1.0/24"]
+        del tables["1"]["0.0.0.0/0"]
+        tables["3"]["192.168.0.0/24"] = {'gateway': '10.0.1.1', 'interface': '10.0.1.253'}
+
+        report = verify_routing_tables(tables, workers=2, chunk_size=1)
+        holes = {(issue.location, issue.message) for issue in report.by_category('black_hole')}
+        self.assertEqual({
+            ("10.0.1.0/24", "router 1: no route, 2 router(s) affected"),
+            ("0.0.0.0/0", "router 1: no route, 2 router(s) affected"),
+            ("192.168.0.0/24", "router 3: the gateway is not the interface of any router, 2 router(s) affected"),
+        }, holes)
+
+    def test_multipath_next_hops(self):
+        # router 5 on A reaches D through 1 > 3 or 2 > 4
+        subnetworks = {'A': "10.0.0.0/24", 'B': "10.0.1.0/24", 'C': "10.0.2.0/24", 'D': "10.0.3.0/24"}
+        routers = {"1": None, "2": None, "3": None, "4": None, "5": None, "X": True}
+        links = {"1": {'A': None, 'B': None}, "2": {'A': None, 'C': None}, "3": {'B': None, 'D': None},
+                 "4": {'C': None, 'D': None}, "5": {'A': None}, "X": {'D': None}}
+        inst = Dispatcher(ecmp=True, tie_break='uid')
+        inst.execute(subnetworks, routers, links)
+        self.assertFalse(inst.verify_routing_tables())
+
+        # the alternate next hop of router 5 is no router
+        tables = copy.deepcopy(inst.formatted_raw_routing_tables)
+        route = tables["5"]["10.0.3.0/24"]
+        self.assertEqual(2, len(route['nexthops']))
+        route['nexthops'][1]['gateway'] = "10.0.0.100"
+        report = verify_routing_tables(tables)
+        self.assertEqual([('black_hole', "10.0.3.0/24",
+                           "router 5: the gateway is not the interface of any router, 1 router(s) affected")],
+                         [(issue.category, issue.location, issue.message) for issue in report])
+
+        # the alternate next hop of router 1 goes back to router 5
+        tables = copy.deepcopy(inst.formatted_raw_routing_tables)
+        interface = tables["1"]["10.0.0.0/24"]['interface']
+        tables["1"]["10.0.3.0/24"]['nexthops'] = [dict(tables["1"]["10.0.3.0/24"]),
+                                                  {'gateway': route['interface'], 'interface': interface}]
+        report = verify_routing_tables(tables)
+        self.assertEqual(['loop'], [issue.category for issue in report])
+        self.assertIn("1 > 5 > 1", report.issues[0].message)
+
+
+if __name__ == '__main__':
+    unittest.main()